@@ -0,0 +1,33 @@
+"""Add score version and pillar scores to matches
+
+Revision ID: 3f1a9c2d7b41
+Revises: ba29106e0759
+Create Date: 2026-10-19 09:12:40.118204
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+# revision identifiers, used by Alembic.
+revision: str = '3f1a9c2d7b41'
+down_revision: Union[str, Sequence[str], None] = 'ba29106e0759'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Existing scores were all produced by the original 0.40/0.30/0.20/0.10 weights (version 1).
+    op.add_column('matches', sa.Column('score_version', sa.Integer(), server_default='1', nullable=False))
+    op.add_column('matches', sa.Column('pillar_scores', postgresql.ARRAY(sa.Float()), nullable=True))
+    op.create_index('ix_matches_score_version', 'matches', ['score_version'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_matches_score_version', table_name='matches')
+    op.drop_column('matches', 'pillar_scores')
+    op.drop_column('matches', 'score_version')
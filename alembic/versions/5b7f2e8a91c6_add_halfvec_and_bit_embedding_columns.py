@@ -0,0 +1,38 @@
+"""Add halfvec and binary-quantized embedding columns to profiles
+
+Revision ID: 5b7f2e8a91c6
+Revises: c27d9e5f3a18
+Create Date: 2026-10-19 12:40:17.926314
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from pgvector.sqlalchemy import HALFVEC, BIT
+
+
+# revision identifiers, used by Alembic.
+revision: str = '5b7f2e8a91c6'
+down_revision: Union[str, Sequence[str], None] = 'c27d9e5f3a18'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # halfvec and binary_quantize need pgvector >= 0.7.
+    op.add_column('profiles', sa.Column('embedding_half', HALFVEC(384), nullable=True))
+    op.add_column('profiles', sa.Column('embedding_bits', BIT(384), nullable=True))
+    op.execute("""
+        UPDATE profiles
+        SET embedding_half = embedding::halfvec(384),
+            embedding_bits = binary_quantize(embedding)::bit(384)
+        WHERE embedding IS NOT NULL
+    """)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('profiles', 'embedding_bits')
+    op.drop_column('profiles', 'embedding_half')
@@ -0,0 +1,30 @@
+"""Add profiles.updated_at and app_users.matches_version
+
+Revision ID: 7d3b95e2c4f0
+Revises: e4a6c1f08d27
+Create Date: 2026-10-19 17:21:05.634198
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '7d3b95e2c4f0'
+down_revision: Union[str, Sequence[str], None] = 'e4a6c1f08d27'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('profiles', sa.Column('updated_at', sa.DateTime(), server_default=sa.text('now()'), nullable=True))
+    op.add_column('app_users', sa.Column('matches_version', sa.Integer(), server_default='1', nullable=False))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('app_users', 'matches_version')
+    op.drop_column('profiles', 'updated_at')
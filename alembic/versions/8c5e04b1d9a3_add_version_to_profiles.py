@@ -0,0 +1,28 @@
+"""Add content version to profiles
+
+Revision ID: 8c5e04b1d9a3
+Revises: 3f1a9c2d7b41
+Create Date: 2026-10-19 10:03:55.402781
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '8c5e04b1d9a3'
+down_revision: Union[str, Sequence[str], None] = '3f1a9c2d7b41'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('profiles', sa.Column('version', sa.Integer(), server_default='1', nullable=False))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('profiles', 'version')
@@ -0,0 +1,33 @@
+"""Add match_refresh_requests table
+
+Revision ID: a5c8e2f17d43
+Revises: d7a2c5e91f36
+Create Date: 2026-10-19 21:03:52.117460
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a5c8e2f17d43'
+down_revision: Union[str, Sequence[str], None] = 'd7a2c5e91f36'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('match_refresh_requests',
+    sa.Column('user_id', sa.String(length=32), nullable=False),
+    sa.Column('requested_at', sa.DateTime(timezone=False), server_default=sa.text('now()'), nullable=True),
+    sa.ForeignKeyConstraint(['user_id'], ['app_users.user_id'], ),
+    sa.PrimaryKeyConstraint('user_id')
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table('match_refresh_requests')
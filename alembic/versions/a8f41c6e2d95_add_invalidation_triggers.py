@@ -0,0 +1,84 @@
+"""Add LISTEN/NOTIFY cache invalidation triggers
+
+Revision ID: a8f41c6e2d95
+Revises: 7d3b95e2c4f0
+Create Date: 2026-10-19 19:02:47.118532
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a8f41c6e2d95'
+down_revision: Union[str, Sequence[str], None] = '7d3b95e2c4f0'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# Must match app.invalidation.CHANNEL. Payloads are "<kind>" or "<kind>:<key>".
+CHANNEL = 'coffee_invalidation'
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Row triggers only touch the key column: to_jsonb(NEW) would serialize
+    # the embeddings of every row a bulk update touches.
+    op.execute(f"""
+        CREATE OR REPLACE FUNCTION notify_profile_change() RETURNS trigger AS $$
+        BEGIN
+            IF TG_OP = 'DELETE' THEN
+                PERFORM pg_notify('{CHANNEL}', 'profile:' || OLD.user_id);
+            ELSE
+                PERFORM pg_notify('{CHANNEL}', 'profile:' || NEW.user_id);
+            END IF;
+            RETURN NULL;
+        END
+        $$ LANGUAGE plpgsql
+    """)
+    op.execute(f"""
+        CREATE OR REPLACE FUNCTION notify_matches_change() RETURNS trigger AS $$
+        BEGIN
+            PERFORM pg_notify('{CHANNEL}', 'matches:' || NEW.user_id);
+            RETURN NULL;
+        END
+        $$ LANGUAGE plpgsql
+    """)
+    op.execute(f"""
+        CREATE OR REPLACE FUNCTION notify_taxonomy_change() RETURNS trigger AS $$
+        BEGIN
+            PERFORM pg_notify('{CHANNEL}', 'taxonomy');
+            RETURN NULL;
+        END
+        $$ LANGUAGE plpgsql
+    """)
+    # Inserts are not notified: nothing can have cached a profile that didn't exist.
+    op.execute("""
+        CREATE TRIGGER profiles_notify_update AFTER UPDATE ON profiles
+        FOR EACH ROW WHEN (OLD.version IS DISTINCT FROM NEW.version)
+        EXECUTE FUNCTION notify_profile_change()
+    """)
+    op.execute("""
+        CREATE TRIGGER profiles_notify_delete AFTER DELETE ON profiles
+        FOR EACH ROW EXECUTE FUNCTION notify_profile_change()
+    """)
+    op.execute("""
+        CREATE TRIGGER app_users_notify_matches AFTER UPDATE OF matches_version ON app_users
+        FOR EACH ROW WHEN (OLD.matches_version IS DISTINCT FROM NEW.matches_version)
+        EXECUTE FUNCTION notify_matches_change()
+    """)
+    op.execute("""
+        CREATE TRIGGER interest_taxonomy_notify AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON interest_taxonomy
+        FOR EACH STATEMENT EXECUTE FUNCTION notify_taxonomy_change()
+    """)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.execute("DROP TRIGGER IF EXISTS interest_taxonomy_notify ON interest_taxonomy")
+    op.execute("DROP TRIGGER IF EXISTS app_users_notify_matches ON app_users")
+    op.execute("DROP TRIGGER IF EXISTS profiles_notify_delete ON profiles")
+    op.execute("DROP TRIGGER IF EXISTS profiles_notify_update ON profiles")
+    op.execute("DROP FUNCTION IF EXISTS notify_taxonomy_change()")
+    op.execute("DROP FUNCTION IF EXISTS notify_matches_change()")
+    op.execute("DROP FUNCTION IF EXISTS notify_profile_change()")
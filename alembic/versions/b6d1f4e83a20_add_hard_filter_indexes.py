@@ -0,0 +1,36 @@
+"""Add profile_data indexes for the hard match filters
+
+Revision ID: b6d1f4e83a20
+Revises: f2b8d6a3c951
+Create Date: 2026-10-19 18:41:07.552918
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b6d1f4e83a20'
+down_revision: Union[str, Sequence[str], None] = 'f2b8d6a3c951'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Expression indexes only match queries using the identical expression;
+    # keep these in sync with app/hard_filters.py.
+    op.create_index('ix_profiles_meeting_style', 'profiles', [sa.text("(profile_data ->> 'meeting_style')")], unique=False)
+    op.create_index('ix_profiles_social_intent', 'profiles', [sa.text("(profile_data ->> 'social_intent')")], unique=False)
+    # GIN (jsonb_ops) supports ?| for the shared_day filter.
+    op.create_index('ix_profiles_availability_days', 'profiles', [sa.text("(profile_data -> 'availability' -> 'days')")],
+                    unique=False, postgresql_using='gin')
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_profiles_availability_days', table_name='profiles')
+    op.drop_index('ix_profiles_social_intent', table_name='profiles')
+    op.drop_index('ix_profiles_meeting_style', table_name='profiles')
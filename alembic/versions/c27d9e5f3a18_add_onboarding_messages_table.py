@@ -0,0 +1,39 @@
+"""Add onboarding messages table
+
+Revision ID: c27d9e5f3a18
+Revises: 8c5e04b1d9a3
+Create Date: 2026-10-19 11:26:08.553120
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+# revision identifiers, used by Alembic.
+revision: str = 'c27d9e5f3a18'
+down_revision: Union[str, Sequence[str], None] = '8c5e04b1d9a3'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('onboarding_messages',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('thread_id', sa.String(), nullable=False),
+    sa.Column('role', sa.String(length=20), nullable=False),
+    sa.Column('content', sa.Text(), nullable=True),
+    sa.Column('tool_calls', postgresql.JSONB(astext_type=sa.Text()), nullable=True),
+    sa.Column('tool_call_id', sa.String(), nullable=True),
+    sa.Column('created_at', sa.DateTime(), server_default=sa.text('now()'), nullable=True),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_onboarding_messages_thread_id'), 'onboarding_messages', ['thread_id'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index(op.f('ix_onboarding_messages_thread_id'), table_name='onboarding_messages')
+    op.drop_table('onboarding_messages')
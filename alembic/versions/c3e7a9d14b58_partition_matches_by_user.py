@@ -0,0 +1,100 @@
+"""Hash-partition matches by user_id and add match_exclusions
+
+Revision ID: c3e7a9d14b58
+Revises: a8f41c6e2d95
+Create Date: 2026-10-19 19:41:12.503871
+
+Rewrites every match row, so run it in a maintenance window on large
+tables. Indexes are built after the copy, once per partition.
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c3e7a9d14b58'
+down_revision: Union[str, Sequence[str], None] = 'a8f41c6e2d95'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# Must match app.models.MATCH_PARTITIONS.
+PARTITIONS = 16
+COLUMNS = "id, user_id, match_id, score, status, score_version, pillar_scores, created_at, updated_at"
+
+CREATE_MATCHES_SQL = """
+    CREATE TABLE {name} (
+        id INTEGER NOT NULL DEFAULT nextval('matches_id_seq'),
+        user_id VARCHAR(32) NOT NULL REFERENCES users (user_id),
+        match_id VARCHAR(32) NOT NULL REFERENCES users (user_id),
+        score FLOAT NOT NULL,
+        status VARCHAR(20) NOT NULL,
+        score_version INTEGER NOT NULL DEFAULT 1,
+        pillar_scores FLOAT[],
+        created_at TIMESTAMP WITHOUT TIME ZONE DEFAULT now(),
+        updated_at TIMESTAMP WITHOUT TIME ZONE DEFAULT now()
+    ){partitioning}
+"""
+
+
+def _swap_in(new_table: str):
+    """Replaces matches with `new_table`, keeping the id sequence."""
+    op.execute("ALTER SEQUENCE matches_id_seq OWNED BY NONE")
+    op.execute("DROP TABLE matches")
+    op.execute(f"ALTER TABLE {new_table} RENAME TO matches")
+    op.execute("ALTER SEQUENCE matches_id_seq OWNED BY matches.id")
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.execute(CREATE_MATCHES_SQL.format(name="matches_partitioned", partitioning=" PARTITION BY HASH (user_id)"))
+    for remainder in range(PARTITIONS):
+        op.execute(f"CREATE TABLE matches_p{remainder} PARTITION OF matches_partitioned "
+                   f"FOR VALUES WITH (MODULUS {PARTITIONS}, REMAINDER {remainder})")
+    op.execute(f"INSERT INTO matches_partitioned ({COLUMNS}) SELECT {COLUMNS} FROM matches")
+    _swap_in("matches_partitioned")
+
+    op.execute("ALTER TABLE matches ADD CONSTRAINT matches_pkey PRIMARY KEY (id, user_id)")
+    op.execute("ALTER TABLE matches ADD CONSTRAINT unique_match_pair UNIQUE (user_id, match_id)")
+    op.execute("CREATE INDEX ix_matches_id ON matches (id)")
+    op.execute("CREATE INDEX ix_matches_score_version ON matches (score_version)")
+    op.execute("""
+        CREATE INDEX ix_matches_suggested_feed ON matches (user_id, score DESC)
+        INCLUDE (id, match_id, score_version, pillar_scores) WHERE status = 'suggested'
+    """)
+    op.execute("""
+        CREATE INDEX ix_matches_active_feed ON matches (user_id, updated_at DESC)
+        INCLUDE (id, match_id, score, score_version, pillar_scores) WHERE status = 'active'
+    """)
+    op.execute("CREATE INDEX ix_matches_listing ON matches (match_id) WHERE status IN ('suggested', 'active')")
+    op.execute("CREATE INDEX ix_matches_passed_updated_at ON matches (updated_at) WHERE status = 'passed'")
+    op.execute("ANALYZE matches")
+
+    op.execute("""
+        CREATE TABLE match_exclusions (
+            user_id VARCHAR(32) NOT NULL PRIMARY KEY REFERENCES users (user_id),
+            match_ids VARCHAR(32)[] NOT NULL DEFAULT '{}',
+            updated_at TIMESTAMP WITHOUT TIME ZONE DEFAULT now()
+        )
+    """)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.execute(CREATE_MATCHES_SQL.format(name="matches_unpartitioned", partitioning=""))
+    op.execute(f"INSERT INTO matches_unpartitioned ({COLUMNS}) SELECT {COLUMNS} FROM matches")
+    # Compacted passes become 'passed' rows again.
+    op.execute("""
+        INSERT INTO matches_unpartitioned (user_id, match_id, score, status)
+        SELECT e.user_id, excluded.match_id, 0.0, 'passed'
+        FROM match_exclusions e CROSS JOIN LATERAL unnest(e.match_ids) AS excluded(match_id)
+        WHERE NOT EXISTS (
+            SELECT 1 FROM matches_unpartitioned m WHERE m.user_id = e.user_id AND m.match_id = excluded.match_id
+        )
+    """)
+    op.execute("DROP TABLE match_exclusions")
+    _swap_in("matches_unpartitioned")
+    op.execute("ALTER TABLE matches ADD CONSTRAINT matches_pkey PRIMARY KEY (id)")
+    op.execute("ALTER TABLE matches ADD CONSTRAINT unique_match_pair UNIQUE (user_id, match_id)")
+    op.execute("CREATE INDEX ix_matches_id ON matches (id)")
+    op.execute("CREATE INDEX ix_matches_score_version ON matches (score_version)")
@@ -0,0 +1,65 @@
+"""Add SQL match pillar score functions
+
+Revision ID: d7a2c5e91f36
+Revises: b6d1f4e83a20
+Create Date: 2026-10-19 20:12:38.904117
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd7a2c5e91f36'
+down_revision: Union[str, Sequence[str], None] = 'b6d1f4e83a20'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# Same as models.MATCH_SCORE_FUNCTIONS (used by MATCH_DB_SCORING).
+MATCH_SCORE_FUNCTIONS = """
+    CREATE OR REPLACE FUNCTION match_json_array(value jsonb) RETURNS jsonb
+    LANGUAGE sql IMMUTABLE PARALLEL SAFE AS $$
+        SELECT CASE WHEN jsonb_typeof(value) = 'array' THEN value ELSE '[]'::jsonb END
+    $$;
+
+    -- calculate_interest_score: Jaccard similarity of the two id sets.
+    CREATE OR REPLACE FUNCTION match_interest_score(a jsonb, b jsonb) RETURNS double precision
+    LANGUAGE sql IMMUTABLE PARALLEL SAFE AS $$
+        SELECT coalesce(
+            (SELECT count(*) FROM (
+                SELECT jsonb_array_elements(match_json_array(a))
+                INTERSECT SELECT jsonb_array_elements(match_json_array(b))
+            ) shared)::double precision
+            / nullif((SELECT count(*) FROM (
+                SELECT jsonb_array_elements(match_json_array(a))
+                UNION SELECT jsonb_array_elements(match_json_array(b))
+            ) combined), 0),
+            0)
+    $$;
+
+    -- calculate_availability_score: 0.5 for a shared day, 0.5 for a shared time slot.
+    CREATE OR REPLACE FUNCTION match_availability_score(a jsonb, b jsonb) RETURNS double precision
+    LANGUAGE sql IMMUTABLE PARALLEL SAFE AS $$
+        SELECT CASE WHEN coalesce(a, '{}') IN ('{}', 'null') OR coalesce(b, '{}') IN ('{}', 'null') THEN 0::double precision
+        ELSE 0.5::double precision * (EXISTS (
+            SELECT jsonb_array_elements(match_json_array(a -> 'days'))
+            INTERSECT SELECT jsonb_array_elements(match_json_array(b -> 'days'))
+        ))::int + 0.5::double precision * (EXISTS (
+            SELECT jsonb_array_elements(match_json_array(a -> 'time_slots'))
+            INTERSECT SELECT jsonb_array_elements(match_json_array(b -> 'time_slots'))
+        ))::int END
+    $$
+"""
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.execute(MATCH_SCORE_FUNCTIONS)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.execute("DROP FUNCTION IF EXISTS match_availability_score(jsonb, jsonb)")
+    op.execute("DROP FUNCTION IF EXISTS match_interest_score(jsonb, jsonb)")
+    op.execute("DROP FUNCTION IF EXISTS match_json_array(jsonb)")
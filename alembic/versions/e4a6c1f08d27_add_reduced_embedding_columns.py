@@ -0,0 +1,35 @@
+"""Add PCA-reduced embedding columns to profiles
+
+Revision ID: e4a6c1f08d27
+Revises: 5b7f2e8a91c6
+Create Date: 2026-10-19 15:02:44.180263
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from pgvector.sqlalchemy import Vector
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e4a6c1f08d27'
+down_revision: Union[str, Sequence[str], None] = '5b7f2e8a91c6'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Dimension-less: the reduced size depends on the fitted projection.
+    # Rows are filled by scripts/backfill_reduced_embeddings.py.
+    op.add_column('profiles', sa.Column('embedding_reduced', Vector(), nullable=True))
+    op.add_column('profiles', sa.Column('embedding_projection', sa.String(length=64), nullable=True))
+    op.create_index(op.f('ix_profiles_embedding_projection'), 'profiles', ['embedding_projection'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index(op.f('ix_profiles_embedding_projection'), table_name='profiles')
+    op.drop_column('profiles', 'embedding_projection')
+    op.drop_column('profiles', 'embedding_reduced')
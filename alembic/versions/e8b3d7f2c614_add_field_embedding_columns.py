@@ -0,0 +1,38 @@
+"""Add per-field embedding columns to profiles
+
+Revision ID: e8b3d7f2c614
+Revises: a5c8e2f17d43
+Create Date: 2026-10-19 21:47:15.338902
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from pgvector.sqlalchemy import Vector
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e8b3d7f2c614'
+down_revision: Union[str, Sequence[str], None] = 'a5c8e2f17d43'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Filled on save with EMBEDDING_MODE=fields, or for every profile by
+    # scripts/recompute_embeddings.py --all.
+    op.add_column('profiles', sa.Column('embedding_vibe', Vector(384), nullable=True))
+    op.add_column('profiles', sa.Column('embedding_interests', Vector(384), nullable=True))
+    op.add_column('profiles', sa.Column('embedding_intent', Vector(384), nullable=True))
+    op.add_column('profiles', sa.Column('field_text_keys', postgresql.JSONB(astext_type=sa.Text()), nullable=True))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('profiles', 'field_text_keys')
+    op.drop_column('profiles', 'embedding_intent')
+    op.drop_column('profiles', 'embedding_interests')
+    op.drop_column('profiles', 'embedding_vibe')
@@ -0,0 +1,100 @@
+"""Add integer uid surrogate keys to app_users, profiles and matches
+
+Revision ID: f2b8d6a3c951
+Revises: c3e7a9d14b58
+Create Date: 2026-10-19 20:05:33.219457
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f2b8d6a3c951'
+down_revision: Union[str, Sequence[str], None] = 'c3e7a9d14b58'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# Kept in sync with app.models.FILL_UIDS_FUNCTION.
+FILL_UIDS_SQL = """
+    CREATE OR REPLACE FUNCTION fill_uids() RETURNS trigger AS $$
+    BEGIN
+        IF NEW.uid IS NULL THEN
+            SELECT uid INTO NEW.uid FROM app_users WHERE user_id = NEW.user_id;
+        END IF;
+        -- Partition triggers report the partition's name (matches_p3...).
+        IF starts_with(TG_TABLE_NAME, 'matches') THEN
+            IF NEW.match_uid IS NULL THEN
+                SELECT uid INTO NEW.match_uid FROM app_users WHERE user_id = NEW.match_id;
+            END IF;
+        END IF;
+        RETURN NEW;
+    END
+    $$ LANGUAGE plpgsql
+"""
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Dense uids in user_id order, then new users continue the sequence.
+    op.execute("CREATE SEQUENCE app_users_uid_seq")
+    op.execute("ALTER TABLE app_users ADD COLUMN uid INTEGER")
+    op.execute("""
+        UPDATE app_users a SET uid = numbered.n
+        FROM (SELECT user_id, row_number() OVER (ORDER BY user_id) AS n FROM app_users) numbered
+        WHERE a.user_id = numbered.user_id
+    """)
+    op.execute("SELECT setval('app_users_uid_seq', (SELECT coalesce(max(uid), 0) + 1 FROM app_users), false)")
+    op.execute("ALTER TABLE app_users ALTER COLUMN uid SET DEFAULT nextval('app_users_uid_seq')")
+    op.execute("ALTER TABLE app_users ALTER COLUMN uid SET NOT NULL")
+    op.execute("ALTER SEQUENCE app_users_uid_seq OWNED BY app_users.uid")
+    op.execute("ALTER TABLE app_users ADD CONSTRAINT app_users_uid_key UNIQUE (uid)")
+
+    op.execute("ALTER TABLE profiles ADD COLUMN uid INTEGER REFERENCES app_users (uid)")
+    op.execute("UPDATE profiles p SET uid = a.uid FROM app_users a WHERE a.user_id = p.user_id")
+    op.execute("ALTER TABLE profiles ADD CONSTRAINT profiles_uid_key UNIQUE (uid)")
+
+    op.execute("ALTER TABLE matches ADD COLUMN uid INTEGER REFERENCES app_users (uid)")
+    op.execute("ALTER TABLE matches ADD COLUMN match_uid INTEGER REFERENCES app_users (uid)")
+    op.execute("""
+        UPDATE matches m SET uid = a.uid, match_uid = b.uid
+        FROM app_users a, app_users b
+        WHERE a.user_id = m.user_id AND b.user_id = m.match_id
+    """)
+    # Feed rows joined to profiles by uid.
+    op.execute("CREATE INDEX ix_matches_match_uid ON matches (match_uid)")
+
+    op.execute("ALTER TABLE match_exclusions ADD COLUMN match_uids INTEGER[] NOT NULL DEFAULT '{}'")
+    op.execute("""
+        UPDATE match_exclusions e SET match_uids = ARRAY(
+            SELECT a.uid FROM unnest(e.match_ids) AS excluded(user_id) JOIN app_users a ON a.user_id = excluded.user_id
+        )
+    """)
+    op.execute("ALTER TABLE match_exclusions DROP COLUMN match_ids")
+
+    op.execute(FILL_UIDS_SQL)
+    op.execute("CREATE TRIGGER profiles_fill_uids BEFORE INSERT ON profiles FOR EACH ROW EXECUTE FUNCTION fill_uids()")
+    op.execute("CREATE TRIGGER matches_fill_uids BEFORE INSERT ON matches FOR EACH ROW EXECUTE FUNCTION fill_uids()")
+    op.execute("ANALYZE app_users")
+    op.execute("ANALYZE profiles")
+    op.execute("ANALYZE matches")
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.execute("DROP TRIGGER IF EXISTS matches_fill_uids ON matches")
+    op.execute("DROP TRIGGER IF EXISTS profiles_fill_uids ON profiles")
+    op.execute("DROP FUNCTION IF EXISTS fill_uids()")
+    op.execute("ALTER TABLE match_exclusions ADD COLUMN match_ids VARCHAR(32)[] NOT NULL DEFAULT '{}'")
+    op.execute("""
+        UPDATE match_exclusions e SET match_ids = ARRAY(
+            SELECT a.user_id FROM unnest(e.match_uids) AS excluded(uid) JOIN app_users a ON a.uid = excluded.uid
+        )
+    """)
+    op.execute("ALTER TABLE match_exclusions DROP COLUMN match_uids")
+    op.execute("DROP INDEX IF EXISTS ix_matches_match_uid")
+    op.execute("ALTER TABLE matches DROP COLUMN match_uid")
+    op.execute("ALTER TABLE matches DROP COLUMN uid")
+    op.execute("ALTER TABLE profiles DROP COLUMN uid")
+    op.execute("ALTER TABLE app_users DROP COLUMN uid")
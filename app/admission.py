@@ -0,0 +1,169 @@
+import asyncio
+import logging
+import math
+import os
+import time
+from collections import OrderedDict, defaultdict, deque
+from contextlib import asynccontextmanager
+from fastapi import HTTPException
+from . import metrics
+
+logger = logging.getLogger(__name__)
+
+OPENAI_MAX_CONCURRENCY = int(os.environ.get("OPENAI_MAX_CONCURRENCY", "16"))
+OPENAI_MIN_CONCURRENCY = int(os.environ.get("OPENAI_MIN_CONCURRENCY", "2"))
+OPENAI_PER_USER_LIMIT = int(os.environ.get("OPENAI_PER_USER_LIMIT", "2"))
+OPENAI_MAX_QUEUE_WAIT = float(os.environ.get("OPENAI_MAX_QUEUE_WAIT", "20"))
+OPENAI_MAX_QUEUE = int(os.environ.get("OPENAI_MAX_QUEUE", "200"))
+# Back off when fewer than this fraction of the upstream request budget remains.
+RATE_LIMIT_LOW_WATERMARK = 0.05
+
+
+class AdmissionGate:
+    """
+    Bounded, fair concurrency gate in front of OpenAI-bound work.
+
+    - At most `limit` turns hold a slot at once; the rest wait in per-user
+      FIFO queues served round-robin, so one chatty user can't starve others.
+    - A user may have at most `per_user_limit` turns running or queued (429).
+    - Waiting longer than `max_wait`, or a full queue, is answered with 503;
+      both carry a Retry-After estimated from recent turn durations.
+    - `limit` adapts (AIMD) to upstream signals: it halves on a 429 from
+      OpenAI, shrinks when x-ratelimit-remaining-requests runs low and grows
+      back by one slot per `limit` successful responses.
+    """
+
+    def __init__(self, max_concurrency: int = OPENAI_MAX_CONCURRENCY, min_concurrency: int = OPENAI_MIN_CONCURRENCY,
+                 per_user_limit: int = OPENAI_PER_USER_LIMIT, max_wait: float = OPENAI_MAX_QUEUE_WAIT,
+                 max_queue: int = OPENAI_MAX_QUEUE):
+        self.max_concurrency = max_concurrency
+        self.min_concurrency = min(min_concurrency, max_concurrency)
+        self.per_user_limit = per_user_limit
+        self.max_wait = max_wait
+        self.max_queue = max_queue
+        self.limit = max_concurrency
+        self.active = 0
+        self.queued = 0
+        self._queues = OrderedDict()
+        self._per_user = defaultdict(int)
+        self._successes = 0
+        self._avg_hold_seconds = 5.0
+        self._loop = None
+        metrics.OPENAI_CONCURRENCY_LIMIT.set(self.limit)
+
+    def _retry_after(self) -> int:
+        backlog = (self.queued + 1) / max(1, self.limit)
+        return max(1, min(60, math.ceil(backlog * self._avg_hold_seconds)))
+
+    def _reject(self, status_code: int, reason: str, detail: str):
+        metrics.OPENAI_ADMISSION_REJECTED.labels(reason=reason).inc()
+        raise HTTPException(status_code=status_code, detail=detail, headers={"Retry-After": str(self._retry_after())})
+
+    def _dispatch(self):
+        while self.active < self.limit and self._queues:
+            user_id, waiters = next(iter(self._queues.items()))
+            future = waiters.popleft()
+            if waiters:
+                self._queues.move_to_end(user_id)
+            else:
+                del self._queues[user_id]
+            if future.done():
+                continue
+            self.queued -= 1
+            self.active += 1
+            future.set_result(None)
+        metrics.OPENAI_INFLIGHT.set(self.active)
+
+    async def acquire(self, user_id: str):
+        self._loop = asyncio.get_running_loop()
+        if self._per_user.get(user_id, 0) >= self.per_user_limit:
+            self._reject(429, "per_user", "Too many onboarding messages in progress. Please wait for the previous reply.")
+        if self.active < self.limit and not self._queues:
+            self._per_user[user_id] += 1
+            self.active += 1
+            metrics.OPENAI_INFLIGHT.set(self.active)
+            metrics.OPENAI_QUEUE_WAIT_SECONDS.observe(0.0)
+            return
+        if self.queued >= self.max_queue:
+            self._reject(503, "queue_full", "The assistant is busy right now. Please try again shortly.")
+
+        self._per_user[user_id] += 1
+        future = self._loop.create_future()
+        self._queues.setdefault(user_id, deque()).append(future)
+        self.queued += 1
+        start = time.perf_counter()
+        try:
+            await asyncio.wait_for(asyncio.shield(future), timeout=self.max_wait)
+        except (asyncio.TimeoutError, asyncio.CancelledError) as e:
+            if future.done() and not future.cancelled():
+                # Granted just as we gave up: hand the slot back.
+                self.active -= 1
+                self._dispatch()
+            else:
+                future.cancel()
+                self.queued -= 1
+            self._leave(user_id)
+            metrics.OPENAI_QUEUE_WAIT_SECONDS.observe(time.perf_counter() - start)
+            if isinstance(e, asyncio.TimeoutError):
+                self._reject(503, "queue_timeout", "The assistant is busy right now. Please try again shortly.")
+            raise
+        metrics.OPENAI_QUEUE_WAIT_SECONDS.observe(time.perf_counter() - start)
+
+    def _leave(self, user_id: str):
+        # Zero entries are dropped so _per_user only holds users in flight.
+        self._per_user[user_id] -= 1
+        if self._per_user[user_id] <= 0:
+            del self._per_user[user_id]
+
+    def release(self, user_id: str, held_seconds: float):
+        self._avg_hold_seconds = 0.9 * self._avg_hold_seconds + 0.1 * held_seconds
+        self._leave(user_id)
+        self.active -= 1
+        self._dispatch()
+
+    @asynccontextmanager
+    async def slot(self, user_id: str):
+        await self.acquire(user_id)
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.release(user_id, time.perf_counter() - start)
+
+    def _set_limit(self, limit: int):
+        limit = max(self.min_concurrency, min(self.max_concurrency, limit))
+        if limit != self.limit:
+            logger.info("OpenAI concurrency limit %d -> %d", self.limit, limit)
+            self.limit = limit
+            metrics.OPENAI_CONCURRENCY_LIMIT.set(limit)
+            self._dispatch()
+
+    def _on_upstream_response(self, status_code: int, remaining: int | None, budget: int | None):
+        if status_code == 429:
+            self._successes = 0
+            self._set_limit(self.limit // 2)
+        elif remaining is not None and budget and remaining < budget * RATE_LIMIT_LOW_WATERMARK:
+            self._successes = 0
+            self._set_limit(self.limit - 1)
+        elif status_code < 400:
+            self._successes += 1
+            if self._successes >= self.limit:
+                self._successes = 0
+                self._set_limit(self.limit + 1)
+
+    def observe_response(self, response):
+        """
+        httpx response hook for the OpenAI client. Runs on the worker thread
+        making the call, so the adjustment is handed to the event loop.
+        """
+        def header_int(name):
+            try:
+                return int(response.headers[name])
+            except (KeyError, ValueError):
+                return None
+        args = (response.status_code, header_int("x-ratelimit-remaining-requests"), header_int("x-ratelimit-limit-requests"))
+        if self._loop is not None and not self._loop.is_closed():
+            self._loop.call_soon_threadsafe(self._on_upstream_response, *args)
+
+
+gate = AdmissionGate()
@@ -1,13 +1,62 @@
+import json
+import logging
+import os
+from collections import namedtuple
 from typing import List
-from sqlalchemy.orm import Session
-from . import models
+from sqlalchemy import Integer, String, Text, all_, any_, bindparam, cast, func, text, update
+from sqlalchemy.dialects.postgresql import ARRAY
+from sqlalchemy.orm import Session, load_only
+from sqlalchemy.orm.attributes import set_committed_value
+from . import database, models
 from sentence_transformers import SentenceTransformer
-from . import matching
+from . import db_scoring, field_embeddings, hard_filters, invalidation, matching, metrics, parallel_scoring, profiling, projection
+from .uidset import UidSet
+from .pair_cache import pair_scores
 import numpy as np
 from sentence_transformers import SentenceTransformer
 
+logger = logging.getLogger(__name__)
+
 embedding_model = None
 
+MATCH_TOP_K = int(os.environ.get("MATCH_TOP_K", "10"))
+
+# "float32": only profiles.embedding. "dual": also write embedding_half and
+# embedding_bits (transition), still read float32. "halfvec": write and
+# read the half-precision column only.
+EMBEDDING_STORAGE = os.environ.get("EMBEDDING_STORAGE", "float32").lower()
+if EMBEDDING_STORAGE not in ("float32", "dual", "halfvec"):
+    raise ValueError(f"Unknown EMBEDDING_STORAGE '{EMBEDDING_STORAGE}'!")
+# "combined": one embedding of a sentence built from the whole profile.
+# "fields": per-field embeddings combined with FIELD_EMBEDDING_WEIGHTS (see
+# app/field_embeddings.py); switching needs scripts/recompute_embeddings.py --all.
+EMBEDDING_MODE = os.environ.get("EMBEDDING_MODE", "combined").lower()
+if EMBEDDING_MODE not in ("combined", "fields"):
+    raise ValueError(f"Unknown EMBEDDING_MODE '{EMBEDDING_MODE}'!")
+# If > 0 (and bits are stored), only the N candidates closest in Hamming
+# distance are fetched and scored. Trades recall for scan time.
+EMBEDDING_PREFILTER_LIMIT = int(os.environ.get("EMBEDDING_PREFILTER_LIMIT", "0"))
+# Which embedding the matcher scores: the stored one, or the PCA-reduced copy.
+SCORING_EMBEDDING = "reduced" if projection.MATCH_USE_PROJECTION else EMBEDDING_STORAGE
+
+# "advisory": refreshes of one user are serialized across workers with a
+# Postgres advisory lock; requests arriving while one runs are coalesced
+# into a single rerun. "off": every request refreshes immediately.
+MATCH_REFRESH_LOCK = os.environ.get("MATCH_REFRESH_LOCK", "advisory").lower()
+if MATCH_REFRESH_LOCK not in ("advisory", "off"):
+    raise ValueError(f"Unknown MATCH_REFRESH_LOCK '{MATCH_REFRESH_LOCK}'!")
+
+# profile_data keys other users may see (the match feeds and PublicProfileResponse).
+PUBLIC_PROFILE_FIELDS = ("vibe_summary", "interests", "social_intent", "personality_type")
+
+# Match columns the feeds read; all stored in the covering feed indexes.
+MATCH_FEED_COLUMNS = (
+    models.Match.id, models.Match.user_id, models.Match.match_id,
+    models.Match.score, models.Match.score_version, models.Match.pillar_scores,
+)
+
+CandidateProfile = namedtuple("CandidateProfile", ["user_id", "profile_data", "embedding", "version", "uid"], defaults=(None,))
+
 def load_embedding_model():
     """Loads the SBERT model into the global variable."""
     global embedding_model
@@ -15,30 +64,166 @@ def load_embedding_model():
         model_name = 'sentence-transformers/all-MiniLM-L6-v2'
         embedding_model = SentenceTransformer(model_name)
         
+# Cached taxonomy names, only trusted while the invalidation bus is listening.
+_taxonomy_cache = {"names": None, "generation": 0}
+
+def _invalidate_taxonomy(_key=None):
+    _taxonomy_cache["names"] = None
+    _taxonomy_cache["generation"] += 1
+
+invalidation.register("taxonomy", _invalidate_taxonomy, resync=_invalidate_taxonomy)
+invalidation.register("profile", pair_scores.invalidate_user, resync=pair_scores.clear)
+
 def get_interest_taxonomy(db: Session):
     """Fetches the official list of canonical interests from the database."""
+    cached = _taxonomy_cache["names"]
+    if cached is not None and invalidation.listening():
+        return cached
+    generation = _taxonomy_cache["generation"]
     interests = db.query(models.InterestTaxonomy).order_by(models.InterestTaxonomy.id).all()
-    return [interest.name for interest in interests]
+    names = [interest.name for interest in interests]
+    # Don't store a result an invalidation raced past while we were reading.
+    if invalidation.listening() and generation == _taxonomy_cache["generation"]:
+        _taxonomy_cache["names"] = names
+    return names
+
+def profile_embedding_text(profile_data: dict) -> str:
+    """The text a profile's embedding is computed from."""
+    vibe = profile_data.get('vibe_summary', '')
+    interests = ", ".join(profile_data.get('interests', []))
+    goal = profile_data.get('social_intent', '')
+    personality = profile_data.get('personality_type', '')
+    return f"This person is {personality}. Their goal is {goal}. They are interested in {interests}. In their own words: {vibe}"
 
 def generate_profile_embedding(profile_data: dict) -> list[float]:
     """
     Generates a representative embedding for a user profile.
-    MODIFIED FOR DEBUGGING: This will now raise exceptions instead of returning None.
+    Raises on failure instead of returning None.
     """
-    print("\n--- [DEBUG] Inside generate_profile_embedding ---")
     try:
-        vibe = profile_data.get('vibe_summary', '')
-        interests = ", ".join(profile_data.get('interests', []))
-        goal = profile_data.get('social_intent', '')
-        personality = profile_data.get('personality_type', '')
-        combined_text = f"This person is {personality}. Their goal is {goal}. They are interested in {interests}. In their own words: {vibe}"
-        print(f"[DEBUG] Combined text: '{combined_text}'")
-        embedding = embedding_model.encode(combined_text)
-        print("[DEBUG] Embedding generated successfully.")
+        if EMBEDDING_MODE == "fields":
+            embedding = field_embeddings.combine(generate_field_embeddings(profile_data).vectors)
+            return embedding.tolist() if embedding is not None else None
+        with profiling.phase("embedding_text"):
+            combined_text = profile_embedding_text(profile_data)
+        logger.debug("Combined text: %r", combined_text)
+        with profiling.phase("embedding_encode"):
+            embedding = embedding_model.encode(combined_text)
         return embedding.tolist()
-    except Exception as e:
-        print(f" [DEBUG] FATAL ERROR during embedding generation. Re-raising exception.")
-        raise e
+    except Exception:
+        logger.exception("Embedding generation failed")
+        raise
+
+def _encode_texts(texts: list[str], batch_size: int = 64) -> np.ndarray:
+    return embedding_model.encode(texts, batch_size=batch_size, convert_to_numpy=True)
+
+def stored_field_embeddings(profile) -> field_embeddings.FieldEmbeddings | None:
+    """The field embeddings saved on an ORM Profile, if it has any."""
+    if profile is None or not profile.field_text_keys:
+        return None
+    vectors = {field: _as_vector(getattr(profile, f"embedding_{field}")) for field in field_embeddings.FIELDS}
+    return field_embeddings.FieldEmbeddings(vectors, profile.field_text_keys)
+
+def generate_field_embeddings(profile_data: dict, previous=None) -> field_embeddings.FieldEmbeddings:
+    """
+    Per-field embeddings of a profile; fields whose text is unchanged since
+    `previous` (an ORM Profile) are reused instead of re-encoded.
+    """
+    with profiling.phase("embedding_encode"):
+        return field_embeddings.encode_fields(profile_data, _encode_texts, previous=stored_field_embeddings(previous))
+
+def generate_profile_embeddings(profiles: list[dict], batch_size: int = 64) -> np.ndarray:
+    """Encodes many profiles in batched SBERT forward passes; returns an (n, 384) array."""
+    if EMBEDDING_MODE == "fields":
+        return combine_field_embeddings(generate_field_embeddings_many(profiles, batch_size))
+    texts = [profile_embedding_text(profile_data) for profile_data in profiles]
+    return _encode_texts(texts, batch_size)
+
+def generate_field_embeddings_many(profiles: list[dict], batch_size: int = 64) -> list:
+    """Per-field embeddings of many profiles; each distinct field text is encoded once."""
+    return field_embeddings.encode_fields_many(profiles, lambda texts: _encode_texts(texts, batch_size))
+
+def combine_field_embeddings(fields: list, weights: dict | None = None) -> np.ndarray:
+    """Stacks FieldEmbeddings rows (missing fields as zeros) and combines them in one pass."""
+    matrices = {}
+    for field in field_embeddings.FIELDS:
+        present = [row.vectors[field] for row in fields if row.vectors[field] is not None]
+        if not present:
+            continue
+        matrix = np.zeros((len(fields), len(present[0])), dtype=np.float32)
+        for index, row in enumerate(fields):
+            if row.vectors[field] is not None:
+                matrix[index] = row.vectors[field]
+        matrices[field] = matrix
+    return field_embeddings.combine_many(matrices, weights)
+
+def profile_embedding_columns(profile_data: dict, previous=None) -> dict:
+    """
+    All embedding columns to write for `profile_data` under EMBEDDING_MODE;
+    empty if no embedding could be built. `previous` is the stored Profile
+    (field mode only re-encodes fields that changed since).
+    """
+    if EMBEDDING_MODE != "fields":
+        embedding = generate_profile_embedding(profile_data)
+        return embedding_columns(embedding) if embedding else {}
+    fields = generate_field_embeddings(profile_data, previous)
+    embedding = field_embeddings.combine(fields.vectors)
+    return embedding_columns(embedding, fields=fields) if embedding is not None else {}
+
+def embedding_columns(embedding, storage: str | None = None, fields=None) -> dict:
+    """
+    Maps a freshly generated embedding (and, in field mode, the
+    FieldEmbeddings it was combined from) onto the Profile columns to write.
+    """
+    storage = storage or EMBEDDING_STORAGE
+    columns = {}
+    if fields is not None:
+        for field in field_embeddings.FIELDS:
+            columns[f"embedding_{field}"] = fields.vectors[field]
+        columns["field_text_keys"] = fields.keys
+    if storage != "halfvec":
+        columns["embedding"] = embedding
+    if storage != "float32":
+        vector = np.asarray(embedding, dtype=np.float32)
+        columns["embedding_half"] = vector
+        columns["embedding_bits"] = vector > 0
+    active_projection = projection.get_active_projection()
+    if active_projection is not None:
+        columns["embedding_reduced"] = active_projection.project(embedding)
+        columns["embedding_projection"] = active_projection.version
+    return columns
+
+def embedding_column(storage: str | None = None):
+    """
+    The Profile column embeddings are read from: the stored full embedding
+    (per EMBEDDING_STORAGE) or, for storage="reduced", the PCA-reduced copy.
+    """
+    storage = storage or EMBEDDING_STORAGE
+    if storage == "reduced":
+        return models.Profile.embedding_reduced
+    if storage == "halfvec":
+        return models.Profile.embedding_half
+    return models.Profile.embedding
+
+def _as_vector(value):
+    if value is None:
+        return None
+    value = value.to_numpy() if hasattr(value, "to_numpy") else value
+    return np.asarray(value, dtype=np.float32)
+
+def scoring_view(profile, storage: str | None = None) -> CandidateProfile:
+    """
+    Wraps an ORM Profile as a CandidateProfile with a float32 numpy embedding.
+    A reduced embedding from another projection version is re-projected from
+    the full one, so the user always matches the candidates' dimensionality.
+    """
+    storage = storage or SCORING_EMBEDDING
+    if storage == "reduced" and profile.embedding_projection != projection.get_active_projection().version:
+        full = _as_vector(getattr(profile, embedding_column().key))
+        value = projection.get_active_projection().project(full) if full is not None else None
+    else:
+        value = _as_vector(getattr(profile, embedding_column(storage).key))
+    return CandidateProfile(profile.user_id, profile.profile_data, value, profile.version, profile.uid)
 
 def get_user(db: Session, user_id: str):
     """Finds a user by their primary key ID."""
@@ -65,27 +250,93 @@ def get_user_profile(db: Session, user_id: str):
     """Retrieves the profile for a given user_id."""
     return db.query(models.Profile).filter(models.Profile.user_id == user_id).first()
 
+def get_public_profile_data(db: Session, user_ids: list[str], fields=PUBLIC_PROFILE_FIELDS) -> dict[str, dict]:
+    """
+    Fetches only the given profile_data keys for many users in one query.
+    The projection happens in SQL, so the rest of each JSONB document never
+    leaves the database. Returns {user_id: {field: value}}.
+    """
+    if not user_ids:
+        return {}
+    rows = db.query(
+        models.Profile.user_id,
+        *(models.Profile.profile_data[field] for field in fields)
+    ).filter(
+        # One array parameter instead of an IN list: the statement text is
+        # the same for any number of ids.
+        models.Profile.user_id == any_(bindparam("user_ids", list(user_ids), type_=ARRAY(String)))
+    ).all()
+    return {row[0]: dict(zip(fields, row[1:])) for row in rows}
+
+def get_profile_version(db: Session, user_id: str) -> int | None:
+    """The profile's version counter, without loading the profile."""
+    return db.query(models.Profile.version).filter(models.Profile.user_id == user_id).scalar()
+
+def get_profile_versions(db: Session, user_ids: list[str]) -> dict[str, int]:
+    """{user_id: profile version} for the ids that have a profile."""
+    if not user_ids:
+        return {}
+    rows = db.query(models.Profile.user_id, models.Profile.version).filter(
+        models.Profile.user_id == any_(bindparam("user_ids", list(user_ids), type_=ARRAY(String)))
+    ).all()
+    return {row[0]: row[1] or 0 for row in rows}
+
+def get_matches_version(db: Session, user_id: str) -> int | None:
+    """The user's match-list version, without loading any matches."""
+    return db.query(models.AppUser.matches_version).filter(models.AppUser.user_id == user_id).scalar()
+
+def bump_matches_version(db: Session, user_ids: list[str]):
+    """Marks these users' match lists as changed. Committed by the caller."""
+    db.execute(
+        update(models.AppUser)
+        .where(models.AppUser.user_id == any_(bindparam("user_ids", list(user_ids), type_=ARRAY(String))))
+        .values(matches_version=models.AppUser.matches_version + 1)
+    )
+
+def bump_listing_matches_versions(db: Session, user_id: str):
+    """
+    Marks the match lists that show `user_id` as changed, since their
+    feeds embed this user's public profile. Committed by the caller.
+    """
+    listing = db.query(models.Match.user_id).filter(
+        models.Match.match_id == user_id,
+        models.Match.status.in_(("suggested", "active"))
+    )
+    db.execute(
+        update(models.AppUser)
+        .where(models.AppUser.user_id.in_(listing.scalar_subquery()))
+        .values(matches_version=models.AppUser.matches_version + 1)
+    )
+
 def save_user_profile(db: Session, user_id: str, profile_data: dict):
     """Creates or updates a user's profile, linking it to the AppUser."""
     db_profile = db.query(models.Profile).filter(models.Profile.user_id == user_id).first()
+    # Encoded before anything is written: the new profile_data, its
+    # embedding and the version bump commit together, so a match refresh
+    # never sees the new version with the old embedding.
+    with metrics.timed(metrics.PROFILE_EMBEDDING_SECONDS):
+        columns = profile_embedding_columns(profile_data, previous=db_profile)
 
     if db_profile:
         db_profile.profile_data = profile_data
+        db_profile.version = (db_profile.version or 0) + 1
+        bump_listing_matches_versions(db, user_id)
     else:
         db_profile = models.Profile(user_id=user_id, profile_data=profile_data)
         db.add(db_profile)
+    for column, value in columns.items():
+        setattr(db_profile, column, value)
+    database.notify_written(db, user_id)
     db.commit()
-    db.refresh(db_profile)
-    print("Generating profile embedding...")
-    profile_embedding = generate_profile_embedding(profile_data)
-    if profile_embedding:
-        db_profile.embedding = profile_embedding
-        db.commit()
-        print("  -> Successfully generated and saved profile embedding.")
+    database.mark_written(user_id)
+    pair_scores.invalidate_user(user_id)
+    if columns:
+        logger.debug("Saved profile embedding for %s", user_id)
     try:
-        refresh_user_matches(db, user_id)
-    except Exception as e:
-        print(f"Error refreshing matches: {e}")
+        with metrics.timed(metrics.MATCH_REFRESH_SECONDS):
+            refresh_user_matches(db, user_id)
+    except Exception:
+        logger.exception("Error refreshing matches for %s", user_id)
     return {"status": "success", "user_id": user_id}
 
 
@@ -107,74 +358,301 @@ def get_all_questions(db: Session):
         })
     return question_data
 
-def get_match_candidates(db: Session, current_user_id: str):
+def get_match_candidates(db: Session, current_user_id: str, storage: str | None = None, prefilter_bits=None, prefilter_limit: int = 0,
+                         updated_since=None, hard_filter_profile: dict | None = None):
     """
     Fetches all other users who have a completed profile to be considered as
     potential matches.
+
+    JSONB and vector columns are fetched as text and decoded here, so each
+    step shows up as its own phase when the request is profiled. With
+    `prefilter_bits` only the `prefilter_limit` candidates nearest in Hamming
+    distance to it are returned. `storage` picks the embedding column (see
+    embedding_column); "reduced" only returns rows of the active projection.
+    `updated_since` limits the result to profiles updated after that time
+    (see app/snapshots.py). With `hard_filter_profile` (the matched user's
+    profile_data) the enabled MATCH_HARD_FILTERS are applied in the query.
     """
+    storage = storage or SCORING_EMBEDDING
+    vector_column = embedding_column(storage)
     # Find all profiles that are not the current user's and have an embedding
-    candidates = db.query(models.Profile).filter(
-        models.Profile.user_id != current_user_id,
-        models.Profile.embedding.is_not(None)
-    ).all()
-    return candidates
+    with profiling.phase("candidate_query"):
+        query = db.query(
+            models.Profile.user_id,
+            cast(models.Profile.profile_data, Text),
+            cast(vector_column, Text),
+            models.Profile.version,
+            models.Profile.uid
+        ).filter(
+            models.Profile.user_id != current_user_id,
+            vector_column.is_not(None)
+        )
+        if storage == "reduced":
+            query = query.filter(models.Profile.embedding_projection == projection.get_active_projection().version)
+        if updated_since is not None:
+            query = query.filter(models.Profile.updated_at > updated_since)
+        if hard_filter_profile is not None:
+            query = query.filter(*hard_filters.sql_predicates(hard_filter_profile))
+        if prefilter_bits is not None and prefilter_limit > 0:
+            query = query.order_by(models.Profile.embedding_bits.hamming_distance(prefilter_bits)).limit(prefilter_limit)
+        rows = query.all()
+    with profiling.phase("jsonb_decode"):
+        profile_data = [json.loads(row[1]) if row[1] is not None else None for row in rows]
+    with profiling.phase("pgvector_parse"):
+        embeddings = [np.fromstring(row[2][1:-1], sep=',', dtype=np.float32) for row in rows]
+    return [
+        CandidateProfile(row[0], data, embedding, row[3], row[4])
+        for row, data, embedding in zip(rows, profile_data, embeddings)
+    ]
+
+REQUEST_REFRESH_SQL = text(
+    "INSERT INTO match_refresh_requests (user_id) VALUES (:user_id) ON CONFLICT (user_id) DO NOTHING"
+)
+PENDING_REFRESH_SQL = text("SELECT EXISTS (SELECT 1 FROM match_refresh_requests WHERE user_id = :user_id)")
+CONSUME_REFRESH_SQL = text("DELETE FROM match_refresh_requests WHERE user_id = :user_id RETURNING 1")
 
-def refresh_user_matches(db: Session, user_id:str):
+def refresh_user_matches(db: Session, user_id:str, candidates: list | None = None):
     """
     THE TRIGGER:
-    1. Calculates top 10 matches using the AI model.
+    1. Calculates top MATCH_TOP_K matches using the AI model.
     2. Updates the 'matches' table without deleting active chats.
+
+    Batch jobs can pass a preloaded `candidates` list (from
+    get_match_candidates) to avoid re-reading every profile per user.
+
+    With MATCH_REFRESH_LOCK=advisory at most one refresh per user runs at a
+    time (across workers) and at most one more is pending. The lock is a
+    transaction-level advisory lock on `db`'s own connection, taken at the
+    start of the refresh transaction and released by its commit, so a
+    refresh never needs a second pooled connection. A request that finds
+    the lock taken records itself in match_refresh_requests and returns at
+    once; the holder checks for requests after its commit and reruns, so
+    changes saved mid-refresh are picked up.
     """
-    print(f"--- Triggering Match Refresh for {user_id} ---")
-    user_profile = get_user_profile(db, user_id)
-    if user_profile is None:
-        print(f" REFRESH FAILED: User profile not found for {user_id}")
+    if MATCH_REFRESH_LOCK != "advisory":
+        metrics.MATCH_REFRESHES.labels(outcome="ran").inc()
+        _refresh_user_matches(db, user_id, candidates)
+        return
+    key = database.advisory_lock_key("refresh", user_id)
+    while True:
+        if not _try_refresh_lock(db, key):
+            db.execute(REQUEST_REFRESH_SQL, {"user_id": user_id})
+            db.commit()
+            # The holder may have committed and checked for requests just
+            # before ours landed; then the lock is free now.
+            if not _try_refresh_lock(db, key):
+                db.commit()
+                metrics.MATCH_REFRESHES.labels(outcome="coalesced").inc()
+                logger.debug("Match refresh for %s already running; coalesced", user_id)
+                return
+        # This run covers every request recorded so far.
+        db.execute(CONSUME_REFRESH_SQL, {"user_id": user_id})
+        metrics.MATCH_REFRESHES.labels(outcome="ran").inc()
+        try:
+            _refresh_user_matches(db, user_id, candidates)
+        finally:
+            # Releases the lock if the refresh returned without committing.
+            db.commit()
+        if not db.execute(PENDING_REFRESH_SQL, {"user_id": user_id}).scalar():
+            db.commit()
+            return
+
+def _try_refresh_lock(db: Session, key: int) -> bool:
+    """Tries the refresh lock in `db`'s current transaction; held until it commits or rolls back."""
+    return db.execute(text("SELECT pg_try_advisory_xact_lock(:key)"), {"key": key}).scalar()
+
+def _refresh_user_matches(db: Session, user_id: str, candidates: list | None = None):
+    logger.debug("Triggering match refresh for %s", user_id)
+    with profiling.phase("profile_lookup"):
+        db_profile = get_user_profile(db, user_id)
+    if db_profile is None:
+        logger.warning("Refresh failed: user profile not found for %s", user_id)
         return
 
+    user_profile = scoring_view(db_profile)
     if user_profile.embedding is None:
-        print(f" REFRESH FAILED: Embedding is None for {user_id}")
+        logger.warning("Refresh failed: embedding is None for %s", user_id)
+        return
+
+    if candidates is None and db_scoring.MATCH_DB_SCORING:
+        with profiling.phase("exclusions"):
+            excluded = get_excluded_uids(db, user_id)
+        with profiling.phase("db_scoring"):
+            top_k = db_rank_candidates(db, user_profile, excluded, limit=MATCH_TOP_K)
+        store_user_matches(db, user_id, top_k)
         return
 
     # 2. Get Candidates (Everyone else)
-    candidates = get_match_candidates(db, current_user_id=user_id)
-    print(f"   -> Found {len(candidates)} candidates to match against.")
+    population = candidates
+    if candidates is None:
+        prefilter = EMBEDDING_PREFILTER_LIMIT > 0 and EMBEDDING_STORAGE != "float32" and db_profile.embedding_bits is not None
+        if parallel_scoring.MATCH_SCORING_WORKERS > 0 and not prefilter:
+            # Unfiltered, so the scoring pool can reuse one published
+            # matrix across refreshes (see parallel_rank_candidates).
+            population = get_match_candidates(db, current_user_id="")
+        else:
+            candidates = get_match_candidates(
+                db, current_user_id=user_id,
+                prefilter_bits=db_profile.embedding_bits if prefilter else None,
+                prefilter_limit=EMBEDDING_PREFILTER_LIMIT,
+                hard_filter_profile=db_profile.profile_data
+            )
+    if population is not None and parallel_scoring.enabled(len(population)):
+        with profiling.phase("scoring"):
+            top_k = parallel_rank_candidates(db, user_profile, db_profile.profile_data, population, limit=MATCH_TOP_K)
+        store_user_matches(db, user_id, top_k)
+        return
+    if population is not None:
+        candidates = [
+            c for c in population
+            if c.user_id != user_id and hard_filters.allows(db_profile.profile_data, c.profile_data)
+        ]
+    with profiling.phase("exclusions"):
+        candidates = exclude_candidates(candidates, get_excluded_uids(db, user_id))
+    metrics.MATCH_CANDIDATES_SCORED.observe(len(candidates))
+    logger.debug("Found %d candidates to match against for %s", len(candidates), user_id)
     # 3. Calculate Scores (In Memory)
-    scored_candidates = []
-    for candidate in candidates:
-        try:
-            score = matching.calculate_final_match_score(user_profile, candidate)
-            scored_candidates.append((candidate.user_id, score))
-        except Exception as e:
-            print(f"   [Warning] Error scoring candidate {candidate.user_id}: {e}")
-            continue
-    scored_candidates.sort(key=lambda x: x[1], reverse=True)
-    top_10 = scored_candidates[:10]
+    hits, misses = pair_scores.hits, pair_scores.misses
+    with profiling.phase("scoring"):
+        top_k = matching.rank_candidates(user_profile, candidates, limit=MATCH_TOP_K, cache=pair_scores)
+    metrics.PAIR_SCORE_CACHE_LOOKUPS.labels(result="hit").inc(pair_scores.hits - hits)
+    metrics.PAIR_SCORE_CACHE_LOOKUPS.labels(result="miss").inc(pair_scores.misses - misses)
+    store_user_matches(db, user_id, top_k)
+
+def db_rank_candidates(db: Session, user_profile, excluded: UidSet | None = None, limit: int = MATCH_TOP_K,
+                       version: int | None = None, storage: str | None = None) -> list[tuple]:
+    """
+    matching.rank_candidates computed in Postgres (see app/db_scoring.py):
+    the same candidate set get_match_candidates would return (without the
+    Hamming prefilter), minus `excluded`, scored and cut to the top `limit`
+    in the query. Returns (user_id, score, PillarScores) tuples, best first.
+    """
+    storage = storage or SCORING_EMBEDDING
+    vector_column = embedding_column(storage)
+    pillars = db_scoring.pillar_columns(vector_column, user_profile, matching.calculate_location_score(None, None))
+    query = db.query(models.Profile.user_id, *pillars).filter(
+        models.Profile.user_id != user_profile.user_id,
+        vector_column.is_not(None),
+        *hard_filters.sql_predicates(user_profile.profile_data)
+    )
+    if storage == "reduced":
+        query = query.filter(models.Profile.embedding_projection == projection.get_active_projection().version)
+    if excluded is not None and len(excluded):
+        query = query.filter(func.coalesce(models.Profile.uid, -1) != all_(
+            bindparam("excluded_uids", excluded.uids.tolist(), type_=ARRAY(Integer))))
+    scored = query.subquery()
+    pillar_columns = [scored.c.interest, scored.c.availability, scored.c.location, scored.c.personality]
+    score = db_scoring.score_expression(pillar_columns, matching.get_scoring_weights(version))
+    rows = db.query(scored.c.user_id, score, *pillar_columns).order_by(score.desc()).limit(limit).all()
+    return [(row[0], row[1], matching.PillarScores(*row[2:])) for row in rows]
+
+def parallel_rank_candidates(db: Session, user_profile, profile_data: dict, population: list,
+                             limit: int = MATCH_TOP_K) -> list[tuple]:
+    """
+    matching.rank_candidates on the shared-memory process pool (vectorized,
+    sharded). `population` is the unfiltered candidate list: it is published
+    once and reused while unchanged (parallel_scoring.published), and the
+    user's hard filters and exclusions become a mask over it.
+    """
+    with parallel_scoring.published.use(population) as matrix:
+        filter_columns = matrix.derived("filter_columns", lambda: hard_filters.FilterColumns([c.profile_data for c in population]))
+        uids = matrix.derived("uids", lambda: candidate_uids(population))
+        with profiling.phase("exclusions"):
+            allowed = allowed_candidates(db, user_profile.user_id, profile_data, filter_columns, uids)
+        metrics.MATCH_CANDIDATES_SCORED.observe(int(allowed.sum()))
+        ranked = parallel_scoring.rank_users(
+            matrix, [user_profile], limit,
+            weights=matching.get_scoring_weights(),
+            location_score=matching.calculate_location_score(None, None),
+            allowed=allowed[None, :],
+        )[0]
+    return [(user_id, score, matching.PillarScores(*pillars)) for user_id, score, pillars in ranked]
+
+def get_compacted_exclusion_ids(db: Session, user_id: str) -> set[str]:
+    """User ids whose compacted 'passed' rows live in match_exclusions for `user_id`."""
+    rows = db.query(models.AppUser.user_id).join(
+        models.MatchExclusion, models.AppUser.uid == any_(models.MatchExclusion.match_uids)
+    ).filter(models.MatchExclusion.user_id == user_id).all()
+    return {row[0] for row in rows}
+
+def get_excluded_uids(db: Session, user_id: str) -> UidSet:
+    """
+    Uids that must not be suggested to `user_id`: everyone with an active,
+    passed or blocked row, plus the compacted passes.
+    """
+    rows = db.query(models.Match.match_uid).filter(
+        models.Match.user_id == user_id,
+        models.Match.status != "suggested",
+        models.Match.match_uid.is_not(None)
+    ).all()
+    compacted = db.query(models.MatchExclusion.match_uids).filter(models.MatchExclusion.user_id == user_id).scalar() or []
+    return UidSet([row[0] for row in rows] + list(compacted))
+
+def exclude_candidates(candidates: list, excluded: UidSet) -> list:
+    """Drops candidates whose uid is in `excluded`."""
+    if not len(excluded):
+        return candidates
+    members = excluded.members
+    return [c for c in candidates if c.uid not in members]
+
+def candidate_uids(candidates: list) -> np.ndarray:
+    """The candidates' uids as an int64 array (-1 where unknown, which no UidSet contains)."""
+    return np.array([-1 if c.uid is None else c.uid for c in candidates], dtype=np.int64)
+
+def allowed_candidates(db: Session, user_id: str, profile_data: dict, filter_columns: hard_filters.FilterColumns,
+                       uids: np.ndarray) -> np.ndarray:
+    """
+    The candidate filtering of _refresh_user_matches (hard filters, then
+    exclude_candidates) as a bool mask over a preloaded candidate list,
+    given its hard_filters.FilterColumns and candidate_uids.
+    """
+    allowed = hard_filters.mask(profile_data, filter_columns)
+    excluded = get_excluded_uids(db, user_id)
+    if len(excluded):
+        allowed &= ~excluded.contains(uids)
+    return allowed
+
+def store_user_matches(db: Session, user_id: str, top_k: list[tuple]):
+    """
+    Upserts a freshly ranked top-K (user_id, score, pillars) list as the
+    user's 'suggested' matches, keeping active/passed/blocked rows.
+    """
     try:
-        existing_records = db.query(models.Match).filter(models.Match.user_id == user_id).all()
-        existing_map = {m.match_id: m for m in existing_records}
-        top_10_ids = [x[0] for x in top_10]
-        for match_id, score in top_10:
-            if match_id in existing_map:
-                record = existing_map[match_id]
-                if record.status == 'suggested':
-                    record.score = score
-            else:
-                new_match = models.Match(
-                    user_id=user_id,
-                    match_id=match_id,
-                    score=score,
-                    status="suggested"
-                )
-                db.add(new_match)
-        for match_id, record in existing_map.items():
-            if match_id not in top_10_ids:
-                if record.status == 'suggested':
-                    db.delete(record)
-                # If status == 'active', WE KEEP IT
-        db.commit()
-        print(" Match Refresh Complete (Database Updated)")
-    except Exception as e:
-        print(f" Database Error during upsert: {e}")
+        with profiling.phase("upsert"):
+            existing_records = db.query(models.Match).filter(models.Match.user_id == user_id).all()
+            existing_map = {m.match_id: m for m in existing_records}
+            excluded = get_compacted_exclusion_ids(db, user_id)
+            top_k_ids = {x[0] for x in top_k}
+            for match_id, score, pillars in top_k:
+                if match_id in excluded:
+                    # Passed long ago and compacted: behaves like a 'passed' row.
+                    continue
+                if match_id in existing_map:
+                    record = existing_map[match_id]
+                    if record.status == 'suggested':
+                        record.score = score
+                        record.score_version = matching.ACTIVE_SCORE_VERSION
+                        record.pillar_scores = list(pillars)
+                else:
+                    new_match = models.Match(
+                        user_id=user_id,
+                        match_id=match_id,
+                        score=score,
+                        status="suggested",
+                        score_version=matching.ACTIVE_SCORE_VERSION,
+                        pillar_scores=list(pillars)
+                    )
+                    db.add(new_match)
+            for match_id, record in existing_map.items():
+                if match_id not in top_k_ids:
+                    if record.status == 'suggested':
+                        db.delete(record)
+                    # If status == 'active', WE KEEP IT
+            bump_matches_version(db, [user_id])
+            db.commit()
+        logger.debug("Match refresh complete for %s", user_id)
+    except Exception:
+        logger.exception("Database error during match upsert for %s", user_id)
         db.rollback()
 
 def update_match_status(db: Session, user_id: str, match_id: str, new_status: str):
@@ -197,13 +675,56 @@ def update_match_status(db: Session, user_id: str, match_id: str, new_status: st
                 user_id=user_id,
                 match_id=match_id,
                 score=0.0, 
-                status=new_status
+                status=new_status,
+                score_version=matching.ACTIVE_SCORE_VERSION
             )
             db.add(match_record)
         else:
             return None
     else:
         match_record.status = new_status
-        
+
+    bump_matches_version(db, [user_id])
+    database.notify_written(db, user_id)
     db.commit()
-    return match_record
\ No newline at end of file
+    database.mark_written(user_id)
+    return match_record
+
+def rescore_stale_matches(db: Session, records: list) -> list:
+    """
+    Lazily brings match rows scored under an older SCORING_VERSIONS entry up
+    to the active version by re-weighting their cached pillar scores. Rows
+    without cached pillars are left for scripts/rollout_score_version.py.
+    On a replica session the new scores are only applied in memory.
+    """
+    persist = not db.info.get("replica")
+    changed = False
+    for record in records:
+        if record.score_version != matching.ACTIVE_SCORE_VERSION and record.pillar_scores:
+            score = matching.combine_pillar_scores(record.pillar_scores)
+            if persist:
+                # Keep updated_at as-is: it orders the active chats list.
+                db.execute(
+                    update(models.Match)
+                    .where(models.Match.user_id == record.user_id, models.Match.id == record.id)
+                    .values(score=score, score_version=matching.ACTIVE_SCORE_VERSION, updated_at=models.Match.updated_at)
+                )
+                changed = True
+            set_committed_value(record, "score", score)
+            set_committed_value(record, "score_version", matching.ACTIVE_SCORE_VERSION)
+    if changed:
+        db.commit()
+    return records
+
+def get_suggested_match_records(db: Session, user_id: str, limit: int = 10):
+    """
+    Returns the user's best 'suggested' match rows under the active scoring
+    version, rescoring stale rows on the way.
+    """
+    records = db.query(models.Match).options(load_only(*MATCH_FEED_COLUMNS)).filter(
+        models.Match.user_id == user_id,
+        models.Match.status == "suggested"
+    ).order_by(models.Match.score.desc()).all()
+    rescore_stale_matches(db, records)
+    records.sort(key=lambda m: m.score, reverse=True)
+    return records[:limit]
@@ -1,16 +1,36 @@
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, text
 from sqlalchemy.orm import sessionmaker
 from sqlalchemy.ext.declarative import declarative_base
 import os
+import hashlib
+import logging
+import random
+import threading
+import time
 from dotenv import load_dotenv
 load_dotenv()
+from . import invalidation, metrics
+
+logger = logging.getLogger(__name__)
+
+def _normalize_url(url: str) -> str:
+    if url.startswith("postgres://"):
+        return url.replace("postgres://", "postgresql://", 1)
+    return url
 
 SQLALCHEMY_DATABASE_URL = os.environ.get("DATABASE_URL")
 if not SQLALCHEMY_DATABASE_URL:
     raise ValueError("DATABASE_URL environment variable is not set!")
+SQLALCHEMY_DATABASE_URL = _normalize_url(SQLALCHEMY_DATABASE_URL)
 
-if SQLALCHEMY_DATABASE_URL.startswith("postgres://"):
-    SQLALCHEMY_DATABASE_URL = SQLALCHEMY_DATABASE_URL.replace("postgres://", "postgresql://", 1)
+# Comma-separated replica URLs. Empty: every read goes to the primary.
+DATABASE_REPLICA_URLS = [_normalize_url(url.strip()) for url in os.environ.get("DATABASE_REPLICA_URLS", "").split(",") if url.strip()]
+# A replica further behind than this is skipped until it catches up.
+REPLICA_MAX_LAG_SECONDS = float(os.environ.get("REPLICA_MAX_LAG_SECONDS", "5"))
+# How long a replica's health/lag result is trusted before re-checking.
+REPLICA_CHECK_INTERVAL_SECONDS = float(os.environ.get("REPLICA_CHECK_INTERVAL_SECONDS", "5"))
+# After a write, that user's reads stay on the primary this long.
+READ_YOUR_WRITES_SECONDS = float(os.environ.get("READ_YOUR_WRITES_SECONDS", "10"))
 
 engine = create_engine(SQLALCHEMY_DATABASE_URL)
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
@@ -20,4 +40,106 @@ def get_db():
     try:
         yield db
     finally:
-        db.close()
\ No newline at end of file
+        db.close()
+
+# Zero when the replica has replayed everything it received (an idle
+# primary would otherwise look like growing lag), else the replay delay.
+REPLICA_LAG_SQL = text("""
+    SELECT CASE
+        WHEN NOT pg_is_in_recovery() OR pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0
+        ELSE COALESCE(EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()), 0)
+    END
+""")
+
+
+class Replica:
+    """A read replica with a cached health/lag check."""
+
+    def __init__(self, url: str):
+        self.engine = create_engine(url, pool_pre_ping=True)
+        self.sessions = sessionmaker(autocommit=False, autoflush=False, bind=self.engine, info={"replica": True})
+        self.name = self.engine.url.host or url
+        self.lag = None
+        self.checked_at = float("-inf")
+        self._lock = threading.Lock()
+
+    def usable(self) -> bool:
+        with self._lock:
+            if time.monotonic() - self.checked_at >= REPLICA_CHECK_INTERVAL_SECONDS:
+                self.checked_at = time.monotonic()
+                try:
+                    with self.engine.connect() as connection:
+                        self.lag = float(connection.execute(REPLICA_LAG_SQL).scalar())
+                except Exception as e:
+                    logger.warning("Replica %s failed its health check: %s", self.name, e)
+                    self.lag = None
+                metrics.REPLICA_LAG_SECONDS.labels(replica=self.name).set(-1 if self.lag is None else self.lag)
+            return self.lag is not None and self.lag <= REPLICA_MAX_LAG_SECONDS
+
+
+replicas = [Replica(url) for url in DATABASE_REPLICA_URLS]
+_recent_writers = {}
+_recent_writers_lock = threading.Lock()
+
+def mark_written(user_id: str):
+    """Pins `user_id`'s reads to the primary for READ_YOUR_WRITES_SECONDS."""
+    if not replicas:
+        return
+    with _recent_writers_lock:
+        _recent_writers[user_id] = time.monotonic() + READ_YOUR_WRITES_SECONDS
+        # Keep the map from growing without bound.
+        if len(_recent_writers) > 10000:
+            now = time.monotonic()
+            for stale in [u for u, until in _recent_writers.items() if until <= now]:
+                del _recent_writers[stale]
+
+WRITE_NOTIFICATION = "write"
+
+def notify_written(db, user_id: str):
+    """
+    Call inside a write the user made themselves (a profile save, a match
+    action), before the commit: other workers then pin `user_id` to the
+    primary too. The profile/matches triggers are not used for this, as
+    they also fire for fan-out bumps (listing versions, rematch_all,
+    backfills) that would pin everyone.
+    """
+    if replicas:
+        db.execute(text("SELECT pg_notify(:channel, :payload)"),
+                   {"channel": invalidation.CHANNEL, "payload": f"{WRITE_NOTIFICATION}:{user_id}"})
+
+def _on_remote_write(user_id: str | None):
+    if user_id is not None:
+        mark_written(user_id)
+
+if replicas:
+    # The user's own writes handled by other workers pin them here too.
+    invalidation.register(WRITE_NOTIFICATION, _on_remote_write)
+
+def _pinned_to_primary(user_id: str | None) -> bool:
+    if user_id is None:
+        return False
+    with _recent_writers_lock:
+        until = _recent_writers.get(user_id)
+    return until is not None and until > time.monotonic()
+
+def read_session(user_id: str | None = None):
+    """
+    A session for read-only work: on a healthy replica within
+    REPLICA_MAX_LAG_SECONDS, or on the primary when there is none, or when
+    `user_id` wrote recently. Replica sessions have info["replica"] set.
+    """
+    if replicas and not _pinned_to_primary(user_id):
+        usable = [replica for replica in replicas if replica.usable()]
+        if usable:
+            replica = random.choice(usable)
+            metrics.DB_READS.labels(target="replica").inc()
+            return replica.sessions()
+        metrics.DB_READS.labels(target="primary_fallback").inc()
+    else:
+        metrics.DB_READS.labels(target="primary").inc()
+    return SessionLocal()
+
+def advisory_lock_key(namespace: str, value: str) -> int:
+    """Maps a (namespace, id) pair onto a signed 64-bit Postgres advisory lock key."""
+    digest = hashlib.blake2b(f"{namespace}:{value}".encode(), digest_size=8).digest()
+    return int.from_bytes(digest, "big", signed=True)
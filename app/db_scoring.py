@@ -0,0 +1,56 @@
+"""
+Database-side match scoring.
+
+With MATCH_DB_SCORING, refresh_user_matches does not fetch candidates at
+all: the four pillars are computed per profile row in Postgres (pgvector
+cosine distance plus the match_*_score SQL functions created with the
+profiles table, see models.MATCH_SCORE_FUNCTIONS), weighted with the
+active scoring version and only the top-K rows come back.
+
+The expressions mirror app/matching.py: scores agree with
+calculate_final_match_score up to float32 rounding of the cosine
+(benchmarks/bench_db_scoring.py checks the difference). Candidates with
+equal scores may come back in a different order than the Python path.
+"""
+import os
+from sqlalchemy import Float, bindparam, func, literal
+from sqlalchemy.dialects.postgresql import JSONB
+from . import models
+
+MATCH_DB_SCORING = os.environ.get("MATCH_DB_SCORING", "false").lower() == "true"
+
+
+def pillar_columns(vector_column, user_profile, location_score: float) -> list:
+    """
+    Labeled (interest, availability, location, personality) expressions
+    scoring every profile row against `user_profile` (a CandidateProfile
+    whose embedding matches `vector_column`'s dimensionality).
+    """
+    user_data = user_profile.profile_data or {}
+    interest = func.match_interest_score(
+        bindparam("user_interest_ids", user_data.get("interest_ids", []), type_=JSONB),
+        models.Profile.profile_data["interest_ids"],
+        type_=Float)
+    availability = func.match_availability_score(
+        bindparam("user_availability", user_data.get("availability", {}), type_=JSONB),
+        models.Profile.profile_data["availability"],
+        type_=Float)
+    personality = func.greatest(0.0, 1.0 - vector_column.cosine_distance(user_profile.embedding), type_=Float)
+    return [
+        interest.label("interest"),
+        availability.label("availability"),
+        literal(location_score, Float).label("location"),
+        personality.label("personality"),
+    ]
+
+
+def score_expression(pillars: list, weights):
+    """
+    combine_pillar_scores in SQL: the weighted sum, added in the same order.
+    `pillars` should be columns of a subquery selecting pillar_columns, so
+    each pillar is computed once.
+    """
+    score = literal(0.0, Float)
+    for weight, pillar in zip(weights, pillars):
+        score = score + literal(weight, Float) * pillar
+    return score.label("score")
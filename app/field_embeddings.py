@@ -0,0 +1,177 @@
+"""
+Field-level profile embeddings (EMBEDDING_MODE=fields).
+
+Instead of encoding one sentence built from the whole profile, each field
+group is encoded on its own and the profile vector is their weighted,
+re-normalized sum:
+
+    vibe       the user's own words (vibe_summary)
+    interests  "They are interested in ..."
+    intent     personality type and social intent
+
+Field vectors are stored on the profile next to a short hash of the text
+they were encoded from, so a save re-encodes only the fields whose text
+changed, and FIELD_EMBEDDING_WEIGHTS can be retuned by recombining the
+stored vectors (scripts/recombine_embeddings.py) without a model pass.
+Encoded texts are also kept in an in-process LRU: many profiles share the
+same intent or interests text.
+
+This module only needs NumPy; the SBERT encode function is passed in.
+"""
+import hashlib
+import os
+import threading
+from collections import OrderedDict, namedtuple
+import numpy as np
+
+FIELDS = ("vibe", "interests", "intent")
+
+FieldEmbeddings = namedtuple("FieldEmbeddings", ["vectors", "keys"])
+
+
+def _parse_weights(value: str) -> dict:
+    weights = {}
+    for item in value.split(","):
+        field, _, weight = item.partition("=")
+        field = field.strip()
+        if field not in FIELDS:
+            raise ValueError(f"Unknown FIELD_EMBEDDING_WEIGHTS field '{field}'! Expected one of {FIELDS}.")
+        weights[field] = float(weight)
+    if any(weight < 0 for weight in weights.values()) or not any(weights.values()):
+        raise ValueError("FIELD_EMBEDDING_WEIGHTS must be non-negative and not all zero!")
+    return weights
+
+
+FIELD_EMBEDDING_WEIGHTS = _parse_weights(os.environ.get("FIELD_EMBEDDING_WEIGHTS", "vibe=0.5,interests=0.3,intent=0.2"))
+FIELD_EMBEDDING_CACHE_SIZE = int(os.environ.get("FIELD_EMBEDDING_CACHE_SIZE", "10000"))
+
+
+def field_texts(profile_data: dict) -> dict[str, str]:
+    """The text each field is encoded from; "" for fields the profile lacks."""
+    profile_data = profile_data or {}
+    interests = ", ".join(profile_data.get("interests", []))
+    personality = profile_data.get("personality_type", "")
+    goal = profile_data.get("social_intent", "")
+    intent = " ".join(part for part in (
+        f"This person is {personality}." if personality else "",
+        f"Their goal is {goal}." if goal else "",
+    ) if part)
+    return {
+        "vibe": profile_data.get("vibe_summary", "") or "",
+        "interests": f"They are interested in {interests}." if interests else "",
+        "intent": intent,
+    }
+
+
+def text_key(text: str) -> str:
+    return hashlib.blake2b(text.encode(), digest_size=8).hexdigest()
+
+
+class FieldVectorCache:
+    """Thread-safe LRU of encoded field vectors keyed by text_key."""
+
+    def __init__(self, max_entries: int = FIELD_EMBEDDING_CACHE_SIZE):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def encode(self, texts: list[str], encoder) -> list[np.ndarray]:
+        """
+        Vectors for `texts`, calling `encoder(list_of_texts) -> (m, d)` once
+        for the distinct texts that are not cached.
+        """
+        keys = [text_key(text) for text in texts]
+        found = {}
+        with self._lock:
+            for key in keys:
+                vector = self._entries.get(key)
+                if vector is not None:
+                    self._entries.move_to_end(key)
+                    found[key] = vector
+            missing = {key: text for key, text in zip(keys, texts) if key not in found}
+            self.hits += len(keys) - sum(1 for key in keys if key in missing)
+            self.misses += len(missing)
+        if missing:
+            encoded = np.asarray(encoder(list(missing.values())), dtype=np.float32)
+            with self._lock:
+                for key, vector in zip(missing, encoded):
+                    vector.setflags(write=False)
+                    found[key] = vector
+                    if self.max_entries > 0:
+                        self._entries[key] = vector
+                        self._entries.move_to_end(key)
+                while len(self._entries) > self.max_entries:
+                    self._entries.popitem(last=False)
+        return [found[key] for key in keys]
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+field_vectors = FieldVectorCache()
+
+
+def encode_fields(profile_data: dict, encoder, previous: FieldEmbeddings | None = None) -> FieldEmbeddings:
+    """
+    Field vectors for one profile. Fields whose text key matches `previous`
+    (the stored field embeddings) reuse its vector; the rest go through the
+    cache and at most one `encoder` call.
+    """
+    texts = field_texts(profile_data)
+    keys = {field: text_key(text) for field, text in texts.items() if text}
+    vectors = dict.fromkeys(FIELDS)
+    to_encode = []
+    for field, key in keys.items():
+        if previous is not None and previous.keys.get(field) == key and previous.vectors.get(field) is not None:
+            vectors[field] = np.asarray(previous.vectors[field], dtype=np.float32)
+        else:
+            to_encode.append(field)
+    for field, vector in zip(to_encode, field_vectors.encode([texts[field] for field in to_encode], encoder)):
+        vectors[field] = vector
+    return FieldEmbeddings(vectors, keys)
+
+
+def encode_fields_many(profiles: list[dict], encoder) -> list[FieldEmbeddings]:
+    """encode_fields for a batch: every distinct field text is encoded once, in one encoder call."""
+    texts = [field_texts(profile_data) for profile_data in profiles]
+    flat = [(index, field, text) for index, row in enumerate(texts) for field, text in row.items() if text]
+    encoded = field_vectors.encode([text for _, _, text in flat], encoder)
+    results = [FieldEmbeddings(dict.fromkeys(FIELDS), {}) for _ in profiles]
+    for (index, field, text), vector in zip(flat, encoded):
+        results[index].vectors[field] = vector
+        results[index].keys[field] = text_key(text)
+    return results
+
+
+def combine_many(matrices: dict, weights: dict | None = None) -> np.ndarray:
+    """
+    Profile vectors from per-field (n, d) matrices: the weighted sum of the
+    fields each row has (all-zero rows count as missing), L2-normalized.
+    Rows without any field come back as zeros.
+    """
+    weights = FIELD_EMBEDDING_WEIGHTS if weights is None else weights
+    combined = None
+    for field in FIELDS:
+        matrix = matrices.get(field)
+        weight = weights.get(field, 0.0)
+        if matrix is None or not weight:
+            continue
+        term = weight * np.asarray(matrix, dtype=np.float32)
+        combined = term if combined is None else combined + term
+    if combined is None:
+        raise ValueError("No weighted field vectors to combine!")
+    norms = np.linalg.norm(combined, axis=1, keepdims=True)
+    return np.divide(combined, norms, out=np.zeros_like(combined), where=norms > 0)
+
+
+def combine(vectors: dict, weights: dict | None = None) -> np.ndarray | None:
+    """combine_many for one profile's {field: vector or None}; None if nothing to combine."""
+    present = {field: np.asarray(vector, dtype=np.float32)[None, :] for field, vector in vectors.items() if vector is not None}
+    weights = FIELD_EMBEDDING_WEIGHTS if weights is None else weights
+    if not any(weights.get(field, 0.0) for field in present):
+        return None
+    combined = combine_many(present, weights)[0]
+    return combined if combined.any() else None
@@ -0,0 +1,170 @@
+"""
+Hard match filters: candidate rules that no score can outweigh.
+
+Each filter turns the matched user's profile_data into a SQL predicate on
+the candidates' profile_data (pushed into get_match_candidates, served by
+the expression and GIN indexes on profiles) and has a Python twin with
+identical semantics for candidate lists that were loaded up front. A
+third, vectorized twin masks FilterColumns (many candidates at once, for
+the scoring pool).
+
+    meeting_style  in-person and virtual users never meet; "either" or a
+                   missing style is compatible with everything
+    shared_day     at least one availability day in common (users without
+                   days are not filtered)
+    social_intent  same social_intent as the user (users without one are
+                   not filtered)
+"""
+import os
+import numpy as np
+from sqlalchemy import Text, literal_column, or_
+from sqlalchemy.dialects.postgresql import JSONB, array
+from . import models
+
+FLEXIBLE_MEETING_STYLE = "either"
+
+
+def _json_path(*keys, astext: bool = False):
+    """
+    profile_data -> key ... (->> for the last key with `astext`). Keys are
+    rendered as SQL literals, not bound parameters, so the expression is
+    identical to the one in the profiles indexes whatever the driver does
+    with parameters.
+    """
+    expression = models.Profile.profile_data
+    for index, key in enumerate(keys):
+        operator = "->>" if astext and index == len(keys) - 1 else "->"
+        expression = expression.op(operator, return_type=Text if operator == "->>" else JSONB)(literal_column(f"'{key}'"))
+    return expression
+
+
+def _meeting_style(profile_data: dict):
+    style = (profile_data or {}).get("meeting_style")
+    return None if style in (None, FLEXIBLE_MEETING_STYLE) else style
+
+
+def _days(profile_data: dict) -> list:
+    availability = (profile_data or {}).get("availability") or {}
+    return [day for day in availability.get("days") or [] if isinstance(day, str)]
+
+
+def _social_intent(profile_data: dict):
+    return (profile_data or {}).get("social_intent") or None
+
+
+class FilterColumns:
+    """The filtered profile_data fields of a candidate list as NumPy columns."""
+
+    def __init__(self, profiles: list[dict]):
+        self.styles, self.style_vocabulary = _codes([_meeting_style(p) for p in profiles])
+        self.intents, self.intent_vocabulary = _codes([_social_intent(p) for p in profiles])
+        days = [_days(p) for p in profiles]
+        self.day_vocabulary = {day: column for column, day in enumerate(sorted({d for row in days for d in row}))}
+        self.days = np.zeros((len(profiles), max(1, len(self.day_vocabulary))), dtype=bool)
+        for i, row in enumerate(days):
+            self.days[i, [self.day_vocabulary[day] for day in row]] = True
+
+    def __len__(self):
+        return len(self.styles)
+
+
+def _codes(values: list) -> tuple[np.ndarray, dict]:
+    """Integer codes per value (-1 for None) and the value -> code mapping."""
+    mapping = {}
+    codes = np.array([-1 if value is None else mapping.setdefault(value, len(mapping)) for value in values], dtype=np.int32)
+    return codes, mapping
+
+
+def meeting_style_sql(user_data: dict):
+    style = _meeting_style(user_data)
+    if style is None:
+        return None
+    column = _json_path("meeting_style", astext=True)
+    return or_(column.in_((style, FLEXIBLE_MEETING_STYLE)), column.is_(None))
+
+
+def meeting_style_allows(user_data: dict, candidate_data: dict) -> bool:
+    style, other = _meeting_style(user_data), _meeting_style(candidate_data)
+    return style is None or other is None or style == other
+
+
+def meeting_style_mask(user_data: dict, columns: FilterColumns):
+    style = _meeting_style(user_data)
+    if style is None:
+        return None
+    return (columns.styles == columns.style_vocabulary.get(style, -2)) | (columns.styles == -1)
+
+
+def shared_day_sql(user_data: dict):
+    days = _days(user_data)
+    if not days:
+        return None
+    return _json_path("availability", "days").has_any(array(days))
+
+
+def shared_day_allows(user_data: dict, candidate_data: dict) -> bool:
+    days = _days(user_data)
+    return not days or bool(set(days) & set(_days(candidate_data)))
+
+
+def shared_day_mask(user_data: dict, columns: FilterColumns):
+    days = _days(user_data)
+    if not days:
+        return None
+    return columns.days[:, [columns.day_vocabulary[day] for day in set(days) if day in columns.day_vocabulary]].any(axis=1)
+
+
+def social_intent_sql(user_data: dict):
+    intent = _social_intent(user_data)
+    if intent is None:
+        return None
+    return _json_path("social_intent", astext=True) == intent
+
+
+def social_intent_allows(user_data: dict, candidate_data: dict) -> bool:
+    intent = _social_intent(user_data)
+    return intent is None or _social_intent(candidate_data) == intent
+
+
+def social_intent_mask(user_data: dict, columns: FilterColumns):
+    intent = _social_intent(user_data)
+    if intent is None:
+        return None
+    return columns.intents == columns.intent_vocabulary.get(intent, -2)
+
+
+FILTERS = {
+    "meeting_style": (meeting_style_sql, meeting_style_allows, meeting_style_mask),
+    "shared_day": (shared_day_sql, shared_day_allows, shared_day_mask),
+    "social_intent": (social_intent_sql, social_intent_allows, social_intent_mask),
+}
+
+# Comma-separated names from FILTERS. Empty: no hard filtering.
+MATCH_HARD_FILTERS = [name.strip() for name in os.environ.get("MATCH_HARD_FILTERS", "").split(",") if name.strip()]
+for _name in MATCH_HARD_FILTERS:
+    if _name not in FILTERS:
+        raise ValueError(f"Unknown MATCH_HARD_FILTERS entry '{_name}'! Expected one of {sorted(FILTERS)}.")
+
+
+def sql_predicates(user_data: dict, names=None) -> list:
+    """The SQL predicates for the user's enabled filters (MATCH_HARD_FILTERS by default)."""
+    names = MATCH_HARD_FILTERS if names is None else names
+    predicates = (FILTERS[name][0](user_data) for name in names)
+    return [predicate for predicate in predicates if predicate is not None]
+
+
+def allows(user_data: dict, candidate_data: dict, names=None) -> bool:
+    """Python equivalent of sql_predicates for one candidate."""
+    names = MATCH_HARD_FILTERS if names is None else names
+    return all(FILTERS[name][1](user_data, candidate_data) for name in names)
+
+
+def mask(user_data: dict, columns: FilterColumns, names=None) -> np.ndarray:
+    """Vectorized allows: a bool array, True for each candidate in `columns` the user may see."""
+    names = MATCH_HARD_FILTERS if names is None else names
+    allowed = np.ones(len(columns), dtype=bool)
+    for name in names:
+        predicate = FILTERS[name][2](user_data, columns)
+        if predicate is not None:
+            allowed &= predicate
+    return allowed
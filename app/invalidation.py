@@ -0,0 +1,137 @@
+"""
+Cross-worker cache invalidation over Postgres LISTEN/NOTIFY.
+
+Triggers (app/models.py, alembic revision a8f41c6e2d95) publish on CHANNEL
+whenever a profile's content version changes or it is deleted
+("profile:<user_id>"), a user's match feed changes ("matches:<user_id>")
+or the interest taxonomy is written ("taxonomy"). Because the triggers
+sit in the database, writes from any worker or script are covered.
+
+Each worker runs one listener task (started in the app lifespan) on a
+dedicated connection and dispatches notifications to the handlers
+registered for their kind. Notifications sent while the listener is
+disconnected are lost, so every (re)connect calls each kind's resync
+handler, which must drop everything that kind caches. Caches that cannot
+tolerate staleness should only be used while listening() is true.
+"""
+import asyncio
+import logging
+import os
+from collections import defaultdict
+from . import metrics
+
+logger = logging.getLogger(__name__)
+
+CHANNEL = "coffee_invalidation"
+INVALIDATION_LISTEN = os.environ.get("INVALIDATION_LISTEN", "false").lower() == "true"
+# Without traffic, the connection is probed this often so a dead one is noticed.
+INVALIDATION_HEARTBEAT_SECONDS = float(os.environ.get("INVALIDATION_HEARTBEAT_SECONDS", "30"))
+RECONNECT_MAX_SECONDS = 30.0
+
+_handlers = defaultdict(list)
+_resync_handlers = defaultdict(list)
+_listening = False
+
+
+def register(kind: str, handler, resync=None):
+    """
+    Calls `handler(key)` for every notification of `kind` (key is None for
+    kinds without one) and `resync()` after every (re)connect.
+    """
+    _handlers[kind].append(handler)
+    if resync is not None:
+        _resync_handlers[kind].append(resync)
+
+
+def listening() -> bool:
+    """True while notifications are being received, i.e. caches can trust them."""
+    return _listening
+
+
+def dispatch(payload: str):
+    kind, _, key = payload.partition(":")
+    metrics.CACHE_INVALIDATIONS.labels(kind=kind).inc()
+    for handler in _handlers.get(kind, ()):
+        try:
+            handler(key or None)
+        except Exception:
+            logger.exception("Invalidation handler for %r failed", payload)
+
+
+def resync():
+    for kind, handlers in _resync_handlers.items():
+        for handler in handlers:
+            try:
+                handler()
+            except Exception:
+                logger.exception("Resync handler for %r failed", kind)
+
+
+def _set_listening(value: bool):
+    global _listening
+    _listening = value
+    metrics.INVALIDATION_LISTENER_CONNECTED.set(1 if value else 0)
+
+
+def _connect():
+    """A dedicated autocommit connection, detached from the engine's pool."""
+    from .database import engine
+    connection = engine.raw_connection()
+    connection.detach()
+    dbapi_connection = connection.dbapi_connection
+    dbapi_connection.autocommit = True
+    with dbapi_connection.cursor() as cursor:
+        cursor.execute(f"LISTEN {CHANNEL}")
+    return dbapi_connection
+
+
+async def _listen_once(loop, on_connect):
+    connection = await loop.run_in_executor(None, _connect)
+    on_connect()
+    readable = asyncio.Event()
+    loop.add_reader(connection.fileno(), readable.set)
+    try:
+        # LISTEN is active, so anything changed from here on is notified;
+        # whatever changed before (or while disconnected) is dropped now.
+        resync()
+        _set_listening(True)
+        logger.info("Listening for cache invalidations on %s", CHANNEL)
+        while True:
+            try:
+                await asyncio.wait_for(readable.wait(), INVALIDATION_HEARTBEAT_SECONDS)
+            except asyncio.TimeoutError:
+                with connection.cursor() as cursor:
+                    cursor.execute("SELECT 1")
+            readable.clear()
+            connection.poll()
+            while connection.notifies:
+                dispatch(connection.notifies.pop(0).payload)
+    finally:
+        _set_listening(False)
+        loop.remove_reader(connection.fileno())
+        connection.close()
+
+
+async def run_listener():
+    """Listens until cancelled, reconnecting with capped exponential backoff."""
+    loop = asyncio.get_running_loop()
+    delay = 1.0
+
+    def reset_backoff():
+        nonlocal delay
+        delay = 1.0
+
+    while True:
+        try:
+            await _listen_once(loop, reset_backoff)
+        except Exception as e:
+            logger.warning("Invalidation listener disconnected (%s); reconnecting in %.0fs", e, delay)
+            await asyncio.sleep(delay)
+            delay = min(RECONNECT_MAX_SECONDS, delay * 2)
+
+
+def start_listener() -> asyncio.Task | None:
+    """Starts the listener task when INVALIDATION_LISTEN is set."""
+    if not INVALIDATION_LISTEN:
+        return None
+    return asyncio.get_running_loop().create_task(run_listener(), name="invalidation-listener")
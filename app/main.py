@@ -1,40 +1,103 @@
 import os
 import time
 import json
+import hashlib
+import logging
+import zlib
+import orjson
 from contextlib import asynccontextmanager
-from fastapi import FastAPI, Depends, HTTPException, status
+from datetime import datetime
+from fastapi import FastAPI, Depends, HTTPException, Query, Request, Response, status
+from fastapi.responses import JSONResponse
+from fastapi.concurrency import run_in_threadpool
 from pydantic import BaseModel
-from sqlalchemy.orm import Session
-from openai import OpenAI
+from sqlalchemy.orm import Session, load_only
+from openai import OpenAI, DefaultHttpxClient
 from dotenv import load_dotenv
-from . import crud, security, models, matching
-from .database import get_db
+from . import crud, security, models, matching, metrics, profiling, onboarding, thread_locks, admission, parallel_scoring, invalidation
+from .database import get_db, read_session
 from .models import SharedUser 
 
 load_dotenv()
 
+logging.basicConfig(
+    level=os.environ.get("LOG_LEVEL", "INFO").upper(),
+    format="%(asctime)s %(levelname)s [%(name)s] %(message)s",
+)
+logger = logging.getLogger(__name__)
+
 @asynccontextmanager
 async def lifespan(app: FastAPI):
-    print("Application startup: Pre-loading ML models...")
+    logger.info("Application startup: Pre-loading ML models...")
     crud.load_embedding_model()
+    listener = invalidation.start_listener()
     yield
-    print("Application shutdown.")
+    if listener is not None:
+        listener.cancel()
+    parallel_scoring.shutdown_pool()
+    logger.info("Application shutdown.")
 
 app = FastAPI(lifespan=lifespan)
-client = OpenAI(api_key=os.environ.get("OPENAI_API_KEY"))
+client = OpenAI(
+    api_key=os.environ.get("OPENAI_API_KEY"),
+    http_client=DefaultHttpxClient(event_hooks={"response": [admission.gate.observe_response]}),
+)
 ASSISTANT_ID = "asst_SDSZf4hIWjeUso6efLvRFNHm"
+USER_BATCH_LIMIT = int(os.environ.get("USER_BATCH_LIMIT", "100"))
+USER_BATCH_MAX_AGE = int(os.environ.get("USER_BATCH_MAX_AGE", "60"))
 
 IS_DEV_MODE = os.environ.get("DEV_MODE", "false").lower() == "true"
 if IS_DEV_MODE:
-    print("--- WARNING: RUNNING IN DEV MODE - AUTHENTICATION IS BYPASSED ---")
+    logger.warning("--- RUNNING IN DEV MODE - AUTHENTICATION IS BYPASSED ---")
     auth_dependency = security.get_current_user_override
 else:
-    print("--- RUNNING IN PRODUCTION MODE - JWT AUTHENTICATION IS ENABLED ---")
+    logger.info("--- RUNNING IN PRODUCTION MODE - JWT AUTHENTICATION IS ENABLED ---")
     auth_dependency = security.get_current_user
 
+def get_read_db(current_user: SharedUser = Depends(auth_dependency)):
+    """Session for read-only endpoints: a replica unless the user wrote recently."""
+    db = read_session(current_user.user_id)
+    try:
+        yield db
+    finally:
+        db.close()
+
+@app.middleware("http")
+async def profile_sampled_requests(request: Request, call_next):
+    if not profiling.should_profile(request.headers.get(profiling.PROFILE_HEADER)):
+        return await call_next(request)
+    with profiling.profile_request(f"{request.method} {request.url.path}") as profile:
+        response = await call_next(request)
+    response.headers["Server-Timing"] = profile.server_timing()
+    return response
+
+@app.middleware("http")
+async def record_request_latency(request: Request, call_next):
+    start = time.perf_counter()
+    status_code = 500
+    try:
+        response = await call_next(request)
+        status_code = response.status_code
+        return response
+    finally:
+        route = request.scope.get("route")
+        metrics.HTTP_REQUEST_SECONDS.labels(
+            method=request.method,
+            route=route.path if route else "unmatched",
+            status=str(status_code),
+        ).observe(time.perf_counter() - start)
+
+class OrjsonResponse(JSONResponse):
+    """JSON response rendered with orjson (datetimes and numpy floats included)."""
+    def render(self, content) -> bytes:
+        return orjson.dumps(content, option=orjson.OPT_SERIALIZE_NUMPY)
+
 class ChatRequest(BaseModel):
     thread_id: str | None = None
     message: str
+    # Client-generated id, reused when a message is retried: a retry
+    # arriving while the original is in flight gets the original's reply.
+    message_id: str | None = None
 
 class PublicProfileResponse(BaseModel):
     user_id: str
@@ -50,121 +113,218 @@ class PublicProfileResponse(BaseModel):
 class MatchActionRequest(BaseModel):
     match_id: str
 
+class UserBatchRequest(BaseModel):
+    user_ids: list[str]
+
+class UserBatchResponse(BaseModel):
+    profiles: dict[str, PublicProfileResponse]
+
+class SuggestedMatch(BaseModel):
+    user_id: str
+    score: float
+    profile_data: PublicProfileResponse.ProfileDataSubset
+
+class ActiveMatch(SuggestedMatch):
+    last_active: datetime | None = None
+
+class SuggestedMatchesResponse(BaseModel):
+    matches: list[SuggestedMatch]
+
+class ActiveMatchesResponse(BaseModel):
+    matches: list[ActiveMatch]
+
+def profile_fields_param(
+    fields: str | None = Query(None, description="Comma-separated profile_data keys to return (default: all public keys).")
+) -> tuple[str, ...]:
+    if not fields:
+        return crud.PUBLIC_PROFILE_FIELDS
+    requested = tuple(dict.fromkeys(f.strip() for f in fields.split(",") if f.strip()))
+    unknown = [f for f in requested if f not in crud.PUBLIC_PROFILE_FIELDS]
+    if unknown:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Unknown profile fields: {', '.join(unknown)}. Allowed: {', '.join(crud.PUBLIC_PROFILE_FIELDS)}",
+        )
+    return requested
+
+def make_etag(*parts) -> str:
+    return '"' + "-".join(str(part) for part in parts) + '"'
+
+def is_not_modified(request: Request, etag: str) -> bool:
+    """True if the client's If-None-Match already names `etag`."""
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    tags = [tag.strip().removeprefix("W/") for tag in header.split(",")]
+    return "*" in tags or etag in tags
+
+def not_modified(etag: str) -> Response:
+    return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers={"ETag": etag})
+
+def matches_etag(db: Session, user_id: str, fields: tuple[str, ...]) -> str:
+    # The list version, the scoring version (lazy rescoring changes scores)
+    # and the projected fields together determine the feed's bytes.
+    fields_key = format(zlib.crc32(",".join(fields).encode()), "x")
+    return make_etag("m", crud.get_matches_version(db, user_id) or 0, matching.ACTIVE_SCORE_VERSION, fields_key)
+
+@app.get("/metrics", include_in_schema=False)
+async def get_metrics():
+    payload, content_type = metrics.render_latest()
+    return Response(content=payload, media_type=content_type)
+
 @app.post("/chat")
 async def handle_chat(
     request: ChatRequest,
     db: Session = Depends(get_db),
     current_user: SharedUser = Depends(auth_dependency)
 ):
-    thread_id = request.thread_id
-    if not thread_id:
-        thread = client.beta.threads.create()
-        thread_id = thread.id
-        crud.link_thread_to_user(db, user_id=current_user.user_id, thread_id=thread_id)
-        initial_message = f"Hi {current_user.name}! Let's get your profile set up. {request.message}"
-        client.beta.threads.messages.create(
-            thread_id=thread_id, role="user", content=initial_message
-        )
-    else:
-        client.beta.threads.messages.create(
-            thread_id=thread_id, role="user", content=request.message
+    timer = metrics.ChatTurnTimer()
+
+    def run_turn():
+        if onboarding.ONBOARDING_ENGINE == "completions":
+            return onboarding.run_completions_turn(
+                client, db, current_user, request.message, request.thread_id, timer
+            )
+        return onboarding.run_assistants_turn(
+            client, db, current_user, request.message, request.thread_id, ASSISTANT_ID, timer
         )
 
-    run = client.beta.threads.runs.create(
-        thread_id=thread_id, assistant_id=ASSISTANT_ID
-    )
+    async def admitted_turn():
+        # The OpenAI and DB calls are blocking, so run them off the event loop.
+        async with admission.gate.slot(current_user.user_id):
+            return await run_in_threadpool(profiling.threaded(run_turn))
 
-    while True:
-        run = client.beta.threads.runs.retrieve(thread_id=thread_id, run_id=run.id)
-        if run.status in ['queued', 'in_progress']:
-            time.sleep(1)
-            continue
-        if run.status == 'requires_action':
-            tool_outputs = []
-            for tool_call in run.required_action.submit_tool_outputs.tool_calls:
-                arguments = json.loads(tool_call.function.arguments)
-                output = {}
-                if tool_call.function.name == "get_all_questions":
-                    output = crud.get_all_questions(db)
-                elif tool_call.function.name == "get_interest_taxonomy":
-                    output = crud.get_interest_taxonomy(db)
-                elif tool_call.function.name == "save_final_profile":
-                    if 'profile_data' in arguments:
-                        app_user = crud.get_user_by_thread_id(db, thread_id=thread_id)
-                        if app_user:
-                            output = crud.save_user_profile(
-                                db, user_id=app_user.user_id, profile_data=arguments['profile_data']
-                            )
-                        else:
-                            output = {"status": "error", "message": "Could not find a user for this thread."}
-                    else:
-                        output = {"status": "error", "message": "The 'profile_data' argument was missing."}
-                tool_outputs.append({"tool_call_id": tool_call.id, "output": json.dumps(output)})
-            run = client.beta.threads.runs.submit_tool_outputs(
-                thread_id=thread_id, run_id=run.id, tool_outputs=tool_outputs
-            )
-            continue
-        if run.status == 'completed':
-            messages = client.beta.threads.messages.list(thread_id=thread_id)
-            assistant_message = messages.data[0].content[0].text.value
-            return {"response": assistant_message, "thread_id": thread_id}
-        if run.status in ['failed', 'cancelled', 'expired']:
-            raise HTTPException(status_code=500, detail=f"Run failed with status: {run.status}")
-        break
-    return {"detail": "An unexpected error occurred."}
+    try:
+        if not request.thread_id:
+            return await admitted_turn()
+        return await thread_locks.coordinator.run(request.thread_id, request.message_id, admitted_turn)
+    finally:
+        timer.finish()
 
+# Profile and match endpoints send an ETag derived from version counters.
+# A matching If-None-Match is answered with 304 after a one-column lookup,
+# before anything is loaded or serialized.
 @app.get("/api/profile", response_model=PublicProfileResponse)
 async def get_own_profile(
-    db: Session = Depends(get_db),
+    request: Request,
+    response: Response,
+    db: Session = Depends(get_read_db),
     current_user: SharedUser = Depends(auth_dependency)
 ):
-    profile = crud.get_user_profile(db, user_id=current_user.user_id)
-    if not profile:
+    version = crud.get_profile_version(db, current_user.user_id)
+    if version is None:
         raise HTTPException(status_code=404, detail="Profile not found. Please complete the onboarding chat first.")
+    etag = make_etag("p", version)
+    if is_not_modified(request, etag):
+        return not_modified(etag)
+    profile = crud.get_user_profile(db, user_id=current_user.user_id)
+    response.headers["ETag"] = etag
     return profile
 
+def batch_user_ids(user_ids: list[str]) -> list[str]:
+    user_ids = list(dict.fromkeys(user_id for user_id in user_ids if user_id))
+    if len(user_ids) > USER_BATCH_LIMIT:
+        raise HTTPException(status_code=400, detail=f"At most {USER_BATCH_LIMIT} user ids per request.")
+    return user_ids
+
+def user_batch_response(db: Session, user_ids: list[str], headers: dict | None = None) -> OrjsonResponse:
+    profiles = crud.get_public_profile_data(db, user_ids)
+    # Ids without a profile are simply absent from the result.
+    return OrjsonResponse(
+        {"profiles": {user_id: {"user_id": user_id, "profile_data": data} for user_id, data in profiles.items()}},
+        headers=headers,
+    )
+
+@app.get("/api/users/batch", response_model=UserBatchResponse, response_class=OrjsonResponse)
+async def get_user_profiles_batch(
+    request: Request,
+    ids: str = Query(..., description="Comma-separated user ids. Send them sorted so equal sets share one cacheable URL."),
+    db: Session = Depends(get_read_db),
+    current_user: SharedUser = Depends(auth_dependency)
+):
+    user_ids = batch_user_ids(ids.split(","))
+    # The ETag covers the (id, version) pairs, so it changes whenever one
+    # of the profiles is saved, appears or disappears.
+    versions = crud.get_profile_versions(db, user_ids)
+    pairs = ",".join(f"{user_id}:{versions[user_id]}" for user_id in sorted(versions))
+    etag = make_etag("b", len(versions), hashlib.blake2b(pairs.encode(), digest_size=8).hexdigest())
+    cache_control = f"private, max-age={USER_BATCH_MAX_AGE}"
+    if is_not_modified(request, etag):
+        response = not_modified(etag)
+        response.headers["Cache-Control"] = cache_control
+        return response
+    return user_batch_response(db, user_ids, headers={"ETag": etag, "Cache-Control": cache_control})
+
+# POST form for clients that cannot put the ids in a URL. POST responses
+# are not reused by HTTP caches, so it sends no caching headers.
+@app.post("/api/users/batch", response_model=UserBatchResponse, response_class=OrjsonResponse)
+async def post_user_profiles_batch(
+    request: UserBatchRequest,
+    db: Session = Depends(get_read_db),
+    current_user: SharedUser = Depends(auth_dependency)
+):
+    return user_batch_response(db, batch_user_ids(request.user_ids))
+
 @app.get("/api/users/{user_id}", response_model=PublicProfileResponse)
 async def get_user_profile_by_id(
     user_id: str,
-    db: Session = Depends(get_db),
+    request: Request,
+    response: Response,
+    db: Session = Depends(get_read_db),
     current_user: SharedUser = Depends(auth_dependency)
 ):
-    profile = crud.get_user_profile(db, user_id=user_id)
-    if not profile:
+    version = crud.get_profile_version(db, user_id)
+    if version is None:
         raise HTTPException(status_code=404, detail="Profile not found")
+    etag = make_etag("p", version)
+    if is_not_modified(request, etag):
+        return not_modified(etag)
+    profile = crud.get_user_profile(db, user_id=user_id)
+    response.headers["ETag"] = etag
     return profile
 
-@app.get("/api/matches/suggested")
+# The match feeds build plain dicts already shaped like their response
+# models and return them through orjson directly; the models document the
+# schema without a second validation and encoding pass per request.
+@app.get("/api/matches/suggested", response_model=SuggestedMatchesResponse, response_class=OrjsonResponse)
 async def get_suggested_matches(
-    db: Session = Depends(get_db),
+    request: Request,
+    fields: tuple[str, ...] = Depends(profile_fields_param),
+    db: Session = Depends(get_read_db),
     current_user: SharedUser = Depends(auth_dependency)
 ):
-    matches = db.query(models.Match).filter(
-        models.Match.user_id == current_user.user_id,
-        models.Match.status == "suggested"
-    ).order_by(models.Match.score.desc()).limit(10).all()
-    result = []
-    for m in matches:
-        profile = crud.get_user_profile(db, m.match_id)
-        if profile:
-            result.append({"user_id": m.match_id, "score": m.score, "profile_data": profile.profile_data})
-    return {"matches": result}
-
-@app.get("/api/matches/active")
+    etag = matches_etag(db, current_user.user_id, fields)
+    if is_not_modified(request, etag):
+        return not_modified(etag)
+    matches = crud.get_suggested_match_records(db, current_user.user_id, limit=10)
+    profiles = crud.get_public_profile_data(db, [m.match_id for m in matches], fields)
+    result = [
+        {"user_id": m.match_id, "score": m.score, "profile_data": profiles[m.match_id]}
+        for m in matches if m.match_id in profiles
+    ]
+    return OrjsonResponse({"matches": result}, headers={"ETag": etag})
+
+@app.get("/api/matches/active", response_model=ActiveMatchesResponse, response_class=OrjsonResponse)
 async def get_active_matches(
-    db: Session = Depends(get_db),
+    request: Request,
+    fields: tuple[str, ...] = Depends(profile_fields_param),
+    db: Session = Depends(get_read_db),
     current_user: SharedUser = Depends(auth_dependency)
 ):
-    matches = db.query(models.Match).filter(
+    etag = matches_etag(db, current_user.user_id, fields)
+    if is_not_modified(request, etag):
+        return not_modified(etag)
+    matches = db.query(models.Match).options(load_only(*crud.MATCH_FEED_COLUMNS, models.Match.updated_at)).filter(
         models.Match.user_id == current_user.user_id,
         models.Match.status == "active"
     ).order_by(models.Match.updated_at.desc()).all()
-    result = []
-    for m in matches:
-        profile = crud.get_user_profile(db, m.match_id)
-        if profile:
-            result.append({"user_id": m.match_id, "score": m.score, "last_active": m.updated_at, "profile_data": profile.profile_data})
-    return {"matches": result}
+    crud.rescore_stale_matches(db, matches)
+    profiles = crud.get_public_profile_data(db, [m.match_id for m in matches], fields)
+    result = [
+        {"user_id": m.match_id, "score": m.score, "last_active": m.updated_at, "profile_data": profiles[m.match_id]}
+        for m in matches if m.match_id in profiles
+    ]
+    return OrjsonResponse({"matches": result}, headers={"ETag": etag})
 
 @app.post("/api/matches/start-chat")
 async def start_chat(
@@ -1,6 +1,27 @@
+import logging
+import os
+from collections import namedtuple
 import numpy as np
 from sentence_transformers import SentenceTransformer,util
 
+logger = logging.getLogger(__name__)
+
+ScoringWeights = namedtuple("ScoringWeights", ["interest", "availability", "location", "personality"])
+PillarScores = namedtuple("PillarScores", ["interest", "availability", "location", "personality"])
+
+# Registry of versioned weight sets. Never edit a published version: add a
+# new one and roll it out with scripts/rollout_score_version.py.
+SCORING_VERSIONS = {
+    1: ScoringWeights(interest=0.40, availability=0.30, location=0.20, personality=0.10),
+}
+ACTIVE_SCORE_VERSION = int(os.environ.get("SCORE_VERSION", max(SCORING_VERSIONS)))
+if ACTIVE_SCORE_VERSION not in SCORING_VERSIONS:
+    raise ValueError(f"SCORE_VERSION={ACTIVE_SCORE_VERSION} is not a registered scoring version!")
+
+def get_scoring_weights(version: int | None = None) -> ScoringWeights:
+    """Returns the weight set for a scoring version (the active one by default)."""
+    return SCORING_VERSIONS[ACTIVE_SCORE_VERSION if version is None else version]
+
 
 def calculate_interest_score(user_a_intersts: list[int], user_b_intersts: list[int]) -> float:
     """
@@ -48,9 +69,11 @@ def calculate_personality_score(user_a_embedding: np.ndarray, user_b_embedding:
     cosine_score = util.cos_sim(user_a_embedding, user_b_embedding).item()
     return max(0, cosine_score)
 
-def calculate_final_match_score(profile_a, profile_b) -> float:
+def calculate_pillar_scores(profile_a, profile_b) -> PillarScores:
     """
-    Calculates the final weighted match score based on the four pillars.
+    Calculates the raw (unweighted) score of each of the four pillars.
+    These are what gets cached on match rows so they can be re-weighted
+    without reloading either profile.
     """
     interests_a = profile_a.profile_data.get('interest_ids', [])
     interests_b = profile_b.profile_data.get('interest_ids', [])
@@ -63,11 +86,44 @@ def calculate_final_match_score(profile_a, profile_b) -> float:
     location_score = calculate_location_score(None, None)
     personality_score = calculate_personality_score(profile_a.embedding, profile_b.embedding)
 
-    final_score = (
-        0.40 * interest_score +
-        0.30 * availability_score +
-        0.20 * location_score +
-        0.10 * personality_score
-    )
-    
-    return final_score
\ No newline at end of file
+    return PillarScores(interest_score, availability_score, location_score, personality_score)
+
+def combine_pillar_scores(pillars, version: int | None = None) -> float:
+    """Applies the weight set of a scoring version to raw pillar scores."""
+    weights = get_scoring_weights(version)
+    return sum(weight * pillar for weight, pillar in zip(weights, pillars))
+
+def calculate_final_match_score(profile_a, profile_b, version: int | None = None) -> float:
+    """
+    Calculates the final weighted match score based on the four pillars,
+    using the weights of the given scoring version (the active one by default).
+    """
+    return combine_pillar_scores(calculate_pillar_scores(profile_a, profile_b), version)
+
+def rank_candidates(user_profile, candidates, limit: int = 10, version: int | None = None, cache=None) -> list[tuple[str, float, PillarScores]]:
+    """
+    Scores every candidate against the user's profile and returns the
+    top `limit` (user_id, score, pillar_scores) tuples, best first.
+
+    If a PairScoreCache is given, pillar scores are looked up / stored by
+    (unordered pair, both profile versions) so each pair is computed once.
+    """
+    user_version = getattr(user_profile, "version", None) if cache is not None else None
+    scored_candidates = []
+    for candidate in candidates:
+        try:
+            candidate_version = getattr(candidate, "version", None) if user_version is not None else None
+            if candidate_version is not None:
+                key = cache.make_key(user_profile.user_id, user_version, candidate.user_id, candidate_version)
+                pillars = cache.get(key)
+                if pillars is None:
+                    pillars = calculate_pillar_scores(user_profile, candidate)
+                    cache.put(key, pillars)
+            else:
+                pillars = calculate_pillar_scores(user_profile, candidate)
+            scored_candidates.append((candidate.user_id, combine_pillar_scores(pillars, version), pillars))
+        except Exception as e:
+            logger.warning("Error scoring candidate %s: %s", candidate.user_id, e)
+            continue
+    scored_candidates.sort(key=lambda x: x[1], reverse=True)
+    return scored_candidates[:limit]
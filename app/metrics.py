@@ -0,0 +1,135 @@
+import time
+from contextlib import contextmanager
+from prometheus_client import Counter, Gauge, Histogram, CONTENT_TYPE_LATEST, generate_latest
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+
+HTTP_REQUEST_SECONDS = Histogram(
+    "coffee_http_request_duration_seconds",
+    "End-to-end request latency by route template.",
+    ["method", "route", "status"],
+    buckets=LATENCY_BUCKETS,
+)
+CHAT_OPENAI_WAIT_SECONDS = Histogram(
+    "coffee_chat_openai_wait_seconds",
+    "Time a /chat turn spends waiting on OpenAI (API calls plus run polling).",
+    buckets=LATENCY_BUCKETS,
+)
+CHAT_TOOL_CALL_SECONDS = Histogram(
+    "coffee_chat_tool_call_seconds",
+    "Time spent executing an assistant tool call locally.",
+    ["tool"],
+    buckets=LATENCY_BUCKETS,
+)
+CHAT_RUN_POLLS = Histogram(
+    "coffee_chat_run_polls",
+    "Number of runs.retrieve polls per /chat turn.",
+    buckets=(1, 2, 3, 5, 8, 13, 21, 34, 55),
+)
+CHAT_THREAD_LOCK_WAIT_SECONDS = Histogram(
+    "coffee_chat_thread_lock_wait_seconds",
+    "Time a /chat turn waited for earlier turns on the same thread.",
+    buckets=LATENCY_BUCKETS,
+)
+CHAT_TURNS_COALESCED = Counter(
+    "coffee_chat_turns_coalesced_total",
+    "Duplicate /chat messages answered from an in-flight turn instead of a new run.",
+)
+OPENAI_QUEUE_WAIT_SECONDS = Histogram(
+    "coffee_openai_queue_wait_seconds",
+    "Time a /chat turn waited in the admission queue for an OpenAI slot.",
+    buckets=(0, 0.01, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 20, 30),
+)
+OPENAI_ADMISSION_REJECTED = Counter(
+    "coffee_openai_admission_rejected_total",
+    "/chat turns rejected by admission control.",
+    ["reason"],
+)
+OPENAI_CONCURRENCY_LIMIT = Gauge(
+    "coffee_openai_concurrency_limit",
+    "Current adaptive limit on concurrent OpenAI-bound turns.",
+)
+OPENAI_INFLIGHT = Gauge(
+    "coffee_openai_inflight",
+    "OpenAI-bound turns currently holding an admission slot.",
+)
+PROFILE_EMBEDDING_SECONDS = Histogram(
+    "coffee_profile_embedding_seconds",
+    "Time to generate a profile embedding in save_user_profile.",
+    buckets=LATENCY_BUCKETS,
+)
+MATCH_REFRESH_SECONDS = Histogram(
+    "coffee_match_refresh_seconds",
+    "Time to refresh a user's matches in save_user_profile.",
+    buckets=LATENCY_BUCKETS,
+)
+MATCH_REFRESHES = Counter(
+    "coffee_match_refreshes_total",
+    "Match refresh requests by outcome: ran, or coalesced into a running one.",
+    ["outcome"],
+)
+MATCH_CANDIDATES_SCORED = Histogram(
+    "coffee_match_candidates_scored",
+    "Number of candidates scored per match refresh.",
+    buckets=(10, 100, 1000, 10000, 100000, 1000000),
+)
+PAIR_SCORE_CACHE_LOOKUPS = Counter(
+    "coffee_pair_score_cache_lookups_total",
+    "Pair score cache lookups during match refreshes.",
+    ["result"],
+)
+CACHE_INVALIDATIONS = Counter(
+    "coffee_cache_invalidations_total",
+    "Change notifications received on the invalidation bus.",
+    ["kind"],
+)
+DB_READS = Counter(
+    "coffee_db_reads_total",
+    "Read-only sessions handed out, by where they were routed.",
+    ["target"],
+)
+REPLICA_LAG_SECONDS = Gauge(
+    "coffee_db_replica_lag_seconds",
+    "Replication lag at the last health check (-1 if the check failed).",
+    ["replica"],
+)
+INVALIDATION_LISTENER_CONNECTED = Gauge(
+    "coffee_invalidation_listener_connected",
+    "1 while this worker is listening for change notifications.",
+)
+
+
+@contextmanager
+def timed(histogram, **labels):
+    """Observes the wall-clock duration of the block on `histogram`."""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        target = histogram.labels(**labels) if labels else histogram
+        target.observe(time.perf_counter() - start)
+
+
+class ChatTurnTimer:
+    """Accumulates OpenAI wait time and poll count across one /chat turn."""
+
+    def __init__(self):
+        self.openai_seconds = 0.0
+        self.polls = 0
+
+    @contextmanager
+    def openai(self):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.openai_seconds += time.perf_counter() - start
+
+    def finish(self):
+        CHAT_OPENAI_WAIT_SECONDS.observe(self.openai_seconds)
+        CHAT_RUN_POLLS.observe(self.polls)
+
+
+def render_latest() -> tuple[bytes, str]:
+    """Returns the current metrics in Prometheus text format and its content type."""
+    return generate_latest(), CONTENT_TYPE_LATEST
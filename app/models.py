@@ -1,9 +1,9 @@
-from sqlalchemy import Column, Integer, String, Text, ForeignKey, Boolean, DateTime, UniqueConstraint, Float
+from sqlalchemy import Column, Integer, String, Text, ForeignKey, Boolean, DateTime, UniqueConstraint, Float, Index, DDL, FetchedValue, Sequence, event, text
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 from .database import Base
-from pgvector.sqlalchemy import Vector
-from sqlalchemy.dialects.postgresql import JSONB
+from pgvector.sqlalchemy import Vector, HALFVEC, BIT
+from sqlalchemy.dialects.postgresql import JSONB, ARRAY
 
 class SharedUser(Base):
     __tablename__ = "users"
@@ -15,34 +15,198 @@ class SharedUser(Base):
     updatedAt = Column("updatedAt", DateTime(timezone=True))
     app_user = relationship("AppUser", back_populates="shared_info", uselist=False)
 
+app_users_uid_seq = Sequence("app_users_uid_seq")
+
 class AppUser(Base):
     __tablename__ = "app_users"
     
     user_id = Column(String(32), ForeignKey("users.user_id"), primary_key=True)
+    # Dense integer surrogate for joins and in-memory uid sets; the API
+    # keeps using the string user_id.
+    uid = Column(Integer, app_users_uid_seq, server_default=app_users_uid_seq.next_value(), unique=True, nullable=False)
     onboarding_thread_id = Column(String, nullable=True, unique=True)
+    # Bumped whenever this user's match lists may have changed; the match
+    # feeds use it as their ETag.
+    matches_version = Column(Integer, nullable=False, server_default="1", default=1)
     shared_info = relationship("SharedUser", back_populates="app_user")
-    profile = relationship("Profile", back_populates="app_user", uselist=False, cascade="all, delete-orphan")
+    profile = relationship("Profile", back_populates="app_user", uselist=False, cascade="all, delete-orphan",
+                           foreign_keys="Profile.user_id")
 
 class Profile(Base):
     __tablename__ = "profiles"
     user_id = Column(String(32), ForeignKey("app_users.user_id"), primary_key=True)
+    # Filled from app_users by the fill_uids trigger on insert.
+    uid = Column(Integer, ForeignKey("app_users.uid"), FetchedValue(), unique=True, nullable=True)
     profile_data = Column(JSONB)     
     embedding = Column(Vector(384), nullable=True)
-    app_user = relationship("AppUser", back_populates="profile")
+    # Optional compact copies (see EMBEDDING_STORAGE): half precision for
+    # scoring and a sign-bit quantization for coarse Hamming prefiltering.
+    embedding_half = Column(HALFVEC(384), nullable=True)
+    embedding_bits = Column(BIT(384), nullable=True)
+    # PCA-reduced copy (see app/projection.py) and the projection version
+    # that produced it; rows from another version are re-projected on read.
+    embedding_reduced = Column(Vector(), nullable=True)
+    embedding_projection = Column(String(64), nullable=True, index=True)
+    # Per-field embeddings (EMBEDDING_MODE=fields, see app/field_embeddings.py)
+    # and the text_key each was encoded from, by field name.
+    embedding_vibe = Column(Vector(384), nullable=True)
+    embedding_interests = Column(Vector(384), nullable=True)
+    embedding_intent = Column(Vector(384), nullable=True)
+    field_text_keys = Column(JSONB, nullable=True)
+    # Bumped on every save_user_profile; keys cached pair scores.
+    version = Column(Integer, nullable=False, server_default="1", default=1)
+    updated_at = Column(DateTime(timezone=False), onupdate=func.now(), server_default=func.now())
+    app_user = relationship("AppUser", back_populates="profile", foreign_keys=[user_id])
+
+    __table_args__ = (
+        # Serve the MATCH_HARD_FILTERS predicates (see app/hard_filters.py);
+        # the expressions must stay identical to the ones the filters emit.
+        Index('ix_profiles_meeting_style', text("(profile_data ->> 'meeting_style')")),
+        Index('ix_profiles_social_intent', text("(profile_data ->> 'social_intent')")),
+        Index('ix_profiles_availability_days', text("(profile_data -> 'availability' -> 'days')"),
+              postgresql_using='gin'),
+    )
+
+# matches is hash-partitioned by user_id into this many partitions
+# (matches_p0...); every per-user query prunes to a single one.
+MATCH_PARTITIONS = 16
 
 class Match(Base):
     __tablename__ = "matches"
-    id = Column(Integer, primary_key=True, index=True)
-    user_id = Column(String(32), ForeignKey("app_users.user_id"), nullable=False)
+    # The partition key has to be part of the primary key.
+    id = Column(Integer, primary_key=True, autoincrement=True, index=True)
+    user_id = Column(String(32), ForeignKey("app_users.user_id"), primary_key=True)
     match_id = Column(String(32), ForeignKey("app_users.user_id"), nullable=False)
+    # uid/match_uid mirror user_id/match_id; filled by the fill_uids trigger.
+    uid = Column(Integer, ForeignKey("app_users.uid"), FetchedValue(), nullable=True)
+    match_uid = Column(Integer, ForeignKey("app_users.uid"), FetchedValue(), nullable=True)
     score = Column(Float, nullable=False)
     status = Column(String(20), default="suggested", nullable=False)
+    # Which SCORING_VERSIONS weight set produced `score`, plus the raw pillar
+    # scores (interest, availability, location, personality) it was built from.
+    score_version = Column(Integer, nullable=False, server_default="1", index=True)
+    pillar_scores = Column(ARRAY(Float), nullable=True)
     created_at = Column(DateTime(timezone=False), server_default=func.now())
     updated_at = Column(DateTime(timezone=False), onupdate=func.now(), server_default=func.now())
     __table_args__ = (
         UniqueConstraint('user_id', 'match_id', name='unique_match_pair'),
+        # Covering indexes for the two feeds: served by index-only scans of
+        # the requesting user's rows (see get_suggested_match_records).
+        Index('ix_matches_suggested_feed', 'user_id', text('score DESC'),
+              postgresql_include=['id', 'match_id', 'score_version', 'pillar_scores'],
+              postgresql_where=text("status = 'suggested'")),
+        Index('ix_matches_active_feed', 'user_id', text('updated_at DESC'),
+              postgresql_include=['id', 'match_id', 'score', 'score_version', 'pillar_scores'],
+              postgresql_where=text("status = 'active'")),
+        # "Whose lists show this user" (bump_listing_matches_versions).
+        Index('ix_matches_listing', 'match_id', postgresql_where=text("status IN ('suggested', 'active')")),
+        # Feed rows joined to profiles by uid.
+        Index('ix_matches_match_uid', 'match_uid'),
+        # Old passes for scripts/compact_passed_matches.py.
+        Index('ix_matches_passed_updated_at', 'updated_at', postgresql_where=text("status = 'passed'")),
+        {"postgresql_partition_by": "HASH (user_id)"},
     )
 
+for _remainder in range(MATCH_PARTITIONS):
+    event.listen(Match.__table__, "after_create", DDL(
+        f"CREATE TABLE matches_p{_remainder} PARTITION OF matches "
+        f"FOR VALUES WITH (MODULUS {MATCH_PARTITIONS}, REMAINDER {_remainder})"
+    ))
+
+# Resolves the uid columns of profiles and matches rows inserted with only
+# string ids, so no writer (ORM, COPY merges, raw SQL) has to look them up.
+FILL_UIDS_FUNCTION = DDL("""
+    CREATE OR REPLACE FUNCTION fill_uids() RETURNS trigger AS $$
+    BEGIN
+        IF NEW.uid IS NULL THEN
+            SELECT uid INTO NEW.uid FROM app_users WHERE user_id = NEW.user_id;
+        END IF;
+        -- Partition triggers report the partition's name (matches_p3...).
+        IF starts_with(TG_TABLE_NAME, 'matches') THEN
+            IF NEW.match_uid IS NULL THEN
+                SELECT uid INTO NEW.match_uid FROM app_users WHERE user_id = NEW.match_id;
+            END IF;
+        END IF;
+        RETURN NEW;
+    END
+    $$ LANGUAGE plpgsql
+""")
+for _table in (Profile.__table__, Match.__table__):
+    event.listen(_table, "after_create", FILL_UIDS_FUNCTION)
+    event.listen(_table, "after_create", DDL(
+        f"CREATE TRIGGER {_table.name}_fill_uids BEFORE INSERT ON {_table.name} "
+        f"FOR EACH ROW EXECUTE FUNCTION fill_uids()"
+    ))
+
+# Pillar scores for database-side ranking (app/db_scoring.py); each
+# mirrors its app/matching.py counterpart on profile_data values.
+MATCH_SCORE_FUNCTIONS = DDL("""
+    CREATE OR REPLACE FUNCTION match_json_array(value jsonb) RETURNS jsonb
+    LANGUAGE sql IMMUTABLE PARALLEL SAFE AS $$
+        SELECT CASE WHEN jsonb_typeof(value) = 'array' THEN value ELSE '[]'::jsonb END
+    $$;
+
+    -- calculate_interest_score: Jaccard similarity of the two id sets.
+    CREATE OR REPLACE FUNCTION match_interest_score(a jsonb, b jsonb) RETURNS double precision
+    LANGUAGE sql IMMUTABLE PARALLEL SAFE AS $$
+        SELECT coalesce(
+            (SELECT count(*) FROM (
+                SELECT jsonb_array_elements(match_json_array(a))
+                INTERSECT SELECT jsonb_array_elements(match_json_array(b))
+            ) shared)::double precision
+            / nullif((SELECT count(*) FROM (
+                SELECT jsonb_array_elements(match_json_array(a))
+                UNION SELECT jsonb_array_elements(match_json_array(b))
+            ) combined), 0),
+            0)
+    $$;
+
+    -- calculate_availability_score: 0.5 for a shared day, 0.5 for a shared time slot.
+    CREATE OR REPLACE FUNCTION match_availability_score(a jsonb, b jsonb) RETURNS double precision
+    LANGUAGE sql IMMUTABLE PARALLEL SAFE AS $$
+        SELECT CASE WHEN coalesce(a, '{}') IN ('{}', 'null') OR coalesce(b, '{}') IN ('{}', 'null') THEN 0::double precision
+        ELSE 0.5::double precision * (EXISTS (
+            SELECT jsonb_array_elements(match_json_array(a -> 'days'))
+            INTERSECT SELECT jsonb_array_elements(match_json_array(b -> 'days'))
+        ))::int + 0.5::double precision * (EXISTS (
+            SELECT jsonb_array_elements(match_json_array(a -> 'time_slots'))
+            INTERSECT SELECT jsonb_array_elements(match_json_array(b -> 'time_slots'))
+        ))::int END
+    $$
+""")
+event.listen(Profile.__table__, "after_create", MATCH_SCORE_FUNCTIONS)
+
+class MatchExclusion(Base):
+    """
+    Compacted 'passed' matches: the uids a user passed on long enough ago
+    that their match rows were deleted, kept so they are never suggested again.
+    """
+    __tablename__ = "match_exclusions"
+    user_id = Column(String(32), ForeignKey("app_users.user_id"), primary_key=True)
+    match_uids = Column(ARRAY(Integer), nullable=False, server_default="{}")
+    updated_at = Column(DateTime(timezone=False), onupdate=func.now(), server_default=func.now())
+
+class MatchRefreshRequest(Base):
+    """
+    Users whose matches should be refreshed again: marked by every refresh
+    request and consumed by the worker holding that user's refresh lock
+    (see crud.refresh_user_matches).
+    """
+    __tablename__ = "match_refresh_requests"
+    user_id = Column(String(32), ForeignKey("app_users.user_id"), primary_key=True)
+    requested_at = Column(DateTime(timezone=False), server_default=func.now())
+
+class OnboardingMessage(Base):
+    """Conversation history for the Chat Completions onboarding engine."""
+    __tablename__ = "onboarding_messages"
+    id = Column(Integer, primary_key=True)
+    thread_id = Column(String, nullable=False, index=True)
+    role = Column(String(20), nullable=False)
+    content = Column(Text, nullable=True)
+    tool_calls = Column(JSONB, nullable=True)
+    tool_call_id = Column(String, nullable=True)
+    created_at = Column(DateTime(timezone=False), server_default=func.now())
+
 class Question(Base):
     __tablename__ = "questions"
     id = Column(Integer, primary_key=True, index=True)
@@ -57,3 +221,68 @@ class InterestTaxonomy(Base):
     __tablename__ = "interest_taxonomy"
     id = Column(Integer, primary_key=True)
     name = Column(String, unique=True, nullable=False, index=True)
+
+# LISTEN/NOTIFY cache invalidation (app/invalidation.py); same functions
+# and triggers as alembic revision a8f41c6e2d95. Payloads are "<kind>" or
+# "<kind>:<key>" on invalidation.CHANNEL. Row triggers only touch the key
+# column: to_jsonb(NEW) would serialize the embeddings of every row a bulk
+# update touches.
+INVALIDATION_CHANNEL = "coffee_invalidation"
+NOTIFY_DDL = {
+    Profile.__table__: [
+        f"""
+        CREATE OR REPLACE FUNCTION notify_profile_change() RETURNS trigger AS $$
+        BEGIN
+            IF TG_OP = 'DELETE' THEN
+                PERFORM pg_notify('{INVALIDATION_CHANNEL}', 'profile:' || OLD.user_id);
+            ELSE
+                PERFORM pg_notify('{INVALIDATION_CHANNEL}', 'profile:' || NEW.user_id);
+            END IF;
+            RETURN NULL;
+        END
+        $$ LANGUAGE plpgsql
+        """,
+        # Inserts are not notified: nothing can have cached a profile that didn't exist.
+        """
+        CREATE TRIGGER profiles_notify_update AFTER UPDATE ON profiles
+        FOR EACH ROW WHEN (OLD.version IS DISTINCT FROM NEW.version)
+        EXECUTE FUNCTION notify_profile_change()
+        """,
+        """
+        CREATE TRIGGER profiles_notify_delete AFTER DELETE ON profiles
+        FOR EACH ROW EXECUTE FUNCTION notify_profile_change()
+        """,
+    ],
+    AppUser.__table__: [
+        f"""
+        CREATE OR REPLACE FUNCTION notify_matches_change() RETURNS trigger AS $$
+        BEGIN
+            PERFORM pg_notify('{INVALIDATION_CHANNEL}', 'matches:' || NEW.user_id);
+            RETURN NULL;
+        END
+        $$ LANGUAGE plpgsql
+        """,
+        """
+        CREATE TRIGGER app_users_notify_matches AFTER UPDATE OF matches_version ON app_users
+        FOR EACH ROW WHEN (OLD.matches_version IS DISTINCT FROM NEW.matches_version)
+        EXECUTE FUNCTION notify_matches_change()
+        """,
+    ],
+    InterestTaxonomy.__table__: [
+        f"""
+        CREATE OR REPLACE FUNCTION notify_taxonomy_change() RETURNS trigger AS $$
+        BEGIN
+            PERFORM pg_notify('{INVALIDATION_CHANNEL}', 'taxonomy');
+            RETURN NULL;
+        END
+        $$ LANGUAGE plpgsql
+        """,
+        """
+        CREATE TRIGGER interest_taxonomy_notify AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON interest_taxonomy
+        FOR EACH STATEMENT EXECUTE FUNCTION notify_taxonomy_change()
+        """,
+    ],
+}
+for _table, _statements in NOTIFY_DDL.items():
+    for _statement in _statements:
+        event.listen(_table, "after_create", DDL(_statement))
@@ -0,0 +1,229 @@
+import json
+import logging
+import os
+import time
+import uuid
+from fastapi import HTTPException
+from sqlalchemy.orm import Session
+from . import crud, metrics, models
+
+logger = logging.getLogger(__name__)
+
+ONBOARDING_ENGINE = os.environ.get("ONBOARDING_ENGINE", "assistants").lower()
+ONBOARDING_MODEL = os.environ.get("ONBOARDING_MODEL", "gpt-4o-mini")
+MAX_TOOL_ROUNDS = 5
+
+DEFAULT_INSTRUCTIONS = """
+You are the friendly onboarding host for "Coffee", an app that matches people for coffee chats.
+Have a short, warm conversation to build the user's profile, asking one question at a time.
+
+- Call `get_all_questions` first and work through the core questions, using follow-ups when a trigger keyword comes up.
+- Call `get_interest_taxonomy` and map the user's interests onto those canonical names and ids.
+- When you have enough information, call `save_final_profile` exactly once with the complete profile, then thank the user.
+"""
+ONBOARDING_INSTRUCTIONS = os.environ.get("ONBOARDING_INSTRUCTIONS", DEFAULT_INSTRUCTIONS).strip()
+
+PROFILE_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "interests": {"type": "array", "items": {"type": "string"}},
+        "interest_ids": {"type": "array", "items": {"type": "integer"}},
+        "availability": {
+            "type": "object",
+            "properties": {
+                "days": {"type": "array", "items": {"type": "string"}},
+                "time_slots": {"type": "array", "items": {"type": "string"}},
+            },
+        },
+        "vibe_summary": {"type": "string"},
+        "meeting_style": {"type": "string", "enum": ["in-person", "virtual", "either"]},
+        "social_intent": {"type": "string"},
+        "personality_type": {"type": "string"},
+        "conversation_topics": {"type": "array", "items": {"type": "string"}},
+        "preferred_locations": {"type": "array", "items": {"type": "string"}},
+    },
+}
+
+# Same tools the hosted assistant is configured with, in Chat Completions form.
+TOOLS = [
+    {
+        "type": "function",
+        "function": {
+            "name": "get_all_questions",
+            "description": "Returns the onboarding question bank, including follow-up questions and their trigger keywords.",
+            "parameters": {"type": "object", "properties": {}},
+        },
+    },
+    {
+        "type": "function",
+        "function": {
+            "name": "get_interest_taxonomy",
+            "description": "Returns the canonical list of interest names.",
+            "parameters": {"type": "object", "properties": {}},
+        },
+    },
+    {
+        "type": "function",
+        "function": {
+            "name": "save_final_profile",
+            "description": "Saves the user's completed profile.",
+            "parameters": {
+                "type": "object",
+                "properties": {"profile_data": PROFILE_SCHEMA},
+                "required": ["profile_data"],
+            },
+        },
+    },
+]
+
+
+def execute_tool(db: Session, thread_id: str, name: str, arguments: dict):
+    """Runs one assistant tool call against the local crud layer."""
+    with metrics.timed(metrics.CHAT_TOOL_CALL_SECONDS, tool=name):
+        if name == "get_all_questions":
+            return crud.get_all_questions(db)
+        if name == "get_interest_taxonomy":
+            return crud.get_interest_taxonomy(db)
+        if name == "save_final_profile":
+            if 'profile_data' not in arguments:
+                return {"status": "error", "message": "The 'profile_data' argument was missing."}
+            app_user = crud.get_user_by_thread_id(db, thread_id=thread_id)
+            if not app_user:
+                return {"status": "error", "message": "Could not find a user for this thread."}
+            return crud.save_user_profile(db, user_id=app_user.user_id, profile_data=arguments['profile_data'])
+    return {}
+
+
+def _greeting(current_user, message: str) -> str:
+    return f"Hi {current_user.name}! Let's get your profile set up. {message}"
+
+
+def run_assistants_turn(client, db: Session, current_user, message: str, thread_id: str | None,
+                        assistant_id: str, timer: metrics.ChatTurnTimer) -> dict:
+    """One /chat turn on the hosted Assistants API (threads + runs + polling)."""
+    if not thread_id:
+        with timer.openai():
+            thread = client.beta.threads.create()
+        thread_id = thread.id
+        crud.link_thread_to_user(db, user_id=current_user.user_id, thread_id=thread_id)
+        message = _greeting(current_user, message)
+    with timer.openai():
+        client.beta.threads.messages.create(
+            thread_id=thread_id, role="user", content=message
+        )
+
+    with timer.openai():
+        run = client.beta.threads.runs.create(
+            thread_id=thread_id, assistant_id=assistant_id
+        )
+
+    while True:
+        with timer.openai():
+            run = client.beta.threads.runs.retrieve(thread_id=thread_id, run_id=run.id)
+        timer.polls += 1
+        if run.status in ['queued', 'in_progress']:
+            with timer.openai():
+                time.sleep(1)
+            continue
+        if run.status == 'requires_action':
+            tool_outputs = []
+            for tool_call in run.required_action.submit_tool_outputs.tool_calls:
+                arguments = json.loads(tool_call.function.arguments)
+                output = execute_tool(db, thread_id, tool_call.function.name, arguments)
+                tool_outputs.append({"tool_call_id": tool_call.id, "output": json.dumps(output)})
+            with timer.openai():
+                run = client.beta.threads.runs.submit_tool_outputs(
+                    thread_id=thread_id, run_id=run.id, tool_outputs=tool_outputs
+                )
+            continue
+        if run.status == 'completed':
+            # Newest first: only the latest assistant message is needed.
+            with timer.openai():
+                messages = client.beta.threads.messages.list(thread_id=thread_id, limit=1)
+            assistant_message = messages.data[0].content[0].text.value
+            return {"response": assistant_message, "thread_id": thread_id}
+        if run.status in ['failed', 'cancelled', 'expired']:
+            logger.error("Run %s on thread %s ended with status %s", run.id, thread_id, run.status)
+            raise HTTPException(status_code=500, detail=f"Run failed with status: {run.status}")
+        break
+    return {"detail": "An unexpected error occurred."}
+
+
+def get_conversation(db: Session, thread_id: str) -> list[dict]:
+    """Loads a locally stored conversation as Chat Completions messages."""
+    rows = db.query(models.OnboardingMessage).filter(
+        models.OnboardingMessage.thread_id == thread_id
+    ).order_by(models.OnboardingMessage.id).all()
+    messages = []
+    for row in rows:
+        message = {"role": row.role, "content": row.content}
+        if row.tool_calls:
+            message["tool_calls"] = row.tool_calls
+        if row.tool_call_id:
+            message["tool_call_id"] = row.tool_call_id
+        messages.append(message)
+    return messages
+
+
+def _store(db: Session, thread_id: str, message: dict):
+    db.add(models.OnboardingMessage(
+        thread_id=thread_id,
+        role=message["role"],
+        content=message.get("content"),
+        tool_calls=message.get("tool_calls"),
+        tool_call_id=message.get("tool_call_id"),
+    ))
+
+
+def run_completions_turn(client, db: Session, current_user, message: str, thread_id: str | None,
+                         timer: metrics.ChatTurnTimer) -> dict:
+    """
+    One /chat turn on Chat Completions with function calling. History lives
+    in the onboarding_messages table under the user's onboarding_thread_id,
+    so a turn without tool calls is a single OpenAI round trip.
+    """
+    if not thread_id:
+        thread_id = f"conv_{uuid.uuid4().hex}"
+        crud.link_thread_to_user(db, user_id=current_user.user_id, thread_id=thread_id)
+        history = []
+        message = _greeting(current_user, message)
+    else:
+        history = get_conversation(db, thread_id)
+
+    user_message = {"role": "user", "content": message}
+    history.append(user_message)
+    _store(db, thread_id, user_message)
+
+    for _ in range(MAX_TOOL_ROUNDS + 1):
+        with timer.openai():
+            completion = client.chat.completions.create(
+                model=ONBOARDING_MODEL,
+                messages=[{"role": "system", "content": ONBOARDING_INSTRUCTIONS}] + history,
+                tools=TOOLS,
+            )
+        timer.polls += 1
+        reply = completion.choices[0].message
+        if not reply.tool_calls:
+            _store(db, thread_id, {"role": "assistant", "content": reply.content})
+            db.commit()
+            return {"response": reply.content, "thread_id": thread_id}
+
+        assistant_message = {
+            "role": "assistant",
+            "content": reply.content,
+            "tool_calls": [
+                {"id": call.id, "type": "function", "function": {"name": call.function.name, "arguments": call.function.arguments}}
+                for call in reply.tool_calls
+            ],
+        }
+        history.append(assistant_message)
+        _store(db, thread_id, assistant_message)
+        for call in reply.tool_calls:
+            output = execute_tool(db, thread_id, call.function.name, json.loads(call.function.arguments or "{}"))
+            tool_message = {"role": "tool", "tool_call_id": call.id, "content": json.dumps(output)}
+            history.append(tool_message)
+            _store(db, thread_id, tool_message)
+
+    db.commit()
+    logger.error("Thread %s exceeded %d tool rounds in one turn", thread_id, MAX_TOOL_ROUNDS)
+    raise HTTPException(status_code=500, detail="The assistant did not produce a reply.")
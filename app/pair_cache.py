@@ -0,0 +1,83 @@
+import os
+import threading
+from collections import OrderedDict, defaultdict
+
+PAIR_SCORE_CACHE_SIZE = int(os.environ.get("PAIR_SCORE_CACHE_SIZE", "100000"))
+
+
+class PairScoreCache:
+    """
+    LRU cache of pillar scores for unordered user pairs.
+
+    All four pillars are symmetric, so the scores computed for A->B during
+    A's refresh are reused for B->A during B's. Keys carry both profiles'
+    content versions, so an edited profile can never hit a stale entry;
+    invalidate_user() just frees the memory early.
+    """
+
+    def __init__(self, max_entries: int = PAIR_SCORE_CACHE_SIZE):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._keys_by_user = defaultdict(set)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def make_key(user_a: str, version_a: int, user_b: str, version_b: int) -> tuple:
+        if user_a <= user_b:
+            return (user_a, version_a, user_b, version_b)
+        return (user_b, version_b, user_a, version_a)
+
+    def get(self, key: tuple):
+        with self._lock:
+            pillars = self._entries.get(key)
+            if pillars is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return pillars
+
+    def put(self, key: tuple, pillars):
+        if self.max_entries <= 0:
+            return
+        with self._lock:
+            self._entries[key] = pillars
+            self._entries.move_to_end(key)
+            self._keys_by_user[key[0]].add(key)
+            self._keys_by_user[key[2]].add(key)
+            while len(self._entries) > self.max_entries:
+                evicted, _ = self._entries.popitem(last=False)
+                self._forget(evicted)
+
+    def invalidate_user(self, user_id: str):
+        """Drops every cached pair involving `user_id`."""
+        with self._lock:
+            for key in self._keys_by_user.pop(user_id, ()):
+                self._entries.pop(key, None)
+                other = key[2] if key[0] == user_id else key[0]
+                keys = self._keys_by_user.get(other)
+                if keys is not None:
+                    keys.discard(key)
+                    if not keys:
+                        del self._keys_by_user[other]
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._keys_by_user.clear()
+
+    def _forget(self, key: tuple):
+        for user_id in (key[0], key[2]):
+            keys = self._keys_by_user.get(user_id)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._keys_by_user[user_id]
+
+    def __len__(self):
+        return len(self._entries)
+
+
+pair_scores = PairScoreCache()
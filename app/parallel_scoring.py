@@ -0,0 +1,375 @@
+"""
+Vectorized, multi-process candidate scoring.
+
+The candidates' features are packed into column arrays and published once
+into multiprocessing.shared_memory. A persistent pool of worker processes
+attaches to those blocks as zero-copy NumPy views, scores a shard of rows
+for a batch of users with matrix products, and returns each user's top-K
+for that shard; the parent merges the per-shard heaps.
+
+This module deliberately imports nothing heavier than NumPy: workers are
+spawned (not forked from a process holding torch threads) and import it
+on their own.
+"""
+import heapq
+import logging
+import multiprocessing
+import os
+import threading
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import contextmanager
+from multiprocessing import shared_memory
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# 0 disables the pool: everything is scored in-process by matching.rank_candidates.
+MATCH_SCORING_WORKERS = int(os.environ.get("MATCH_SCORING_WORKERS", "0"))
+# Refreshes with fewer candidates than this aren't worth the publish/IPC overhead.
+MATCH_SCORING_MIN_CANDIDATES = int(os.environ.get("MATCH_SCORING_MIN_CANDIDATES", "5000"))
+USER_BATCH_SIZE = 64
+
+# Same field order as matching.PillarScores.
+Pillars = namedtuple("Pillars", ["interest", "availability", "location", "personality"])
+
+_ARRAYS = ("embeddings", "norms", "interests", "interest_counts", "days", "slots", "has_availability",
+           "valid", "availability_broken")
+
+
+def _multi_hot(rows: list, vocabulary: dict) -> np.ndarray:
+    matrix = np.zeros((len(rows), max(1, len(vocabulary))), dtype=np.float32)
+    for i, items in enumerate(rows):
+        for item in items:
+            column = vocabulary.get(item)
+            if column is not None:
+                matrix[i, column] = 1.0
+    return matrix
+
+
+def _set(values) -> set | None:
+    try:
+        return set(values)
+    except TypeError:
+        return None
+
+
+def _profile_sets(profile_data: dict) -> tuple:
+    """
+    (interest ids, availability, days, time slots, valid, availability_broken).
+
+    matching.calculate_pillar_scores raises on some malformed values, and
+    matching.rank_candidates then skips the pair. `valid` is False when it
+    would raise for any pair (no profile_data, interest_ids that are not a
+    collection), `availability_broken` when it raises only against another
+    profile with availability (days or time_slots None or not a collection).
+    Such pairs are never ranked here either; the sets are then empty.
+    """
+    if not isinstance(profile_data, dict):
+        return set(), {}, set(), set(), False, False
+    interests = _set(profile_data.get('interest_ids', []))
+    availability = profile_data.get('availability', {})
+    days = slots = set()
+    broken = False
+    if availability:
+        if isinstance(availability, dict):
+            days, slots = _set(availability.get('days', [])), _set(availability.get('time_slots', []))
+        broken = not isinstance(availability, dict) or days is None or slots is None
+        if broken:
+            days = slots = set()
+    return interests or set(), availability or {}, days, slots, interests is not None, broken
+
+
+class CandidateFeatures:
+    """
+    Column arrays for a list of candidates (anything with user_id,
+    profile_data and embedding), mirroring what matching.calculate_pillar_scores
+    reads: multi-hot interest ids, days and time slots, plus embeddings.
+    """
+
+    def __init__(self, candidates: list, dim: int | None = None):
+        self.user_ids = [c.user_id for c in candidates]
+        self.index = {user_id: i for i, user_id in enumerate(self.user_ids)}
+        sets = [_profile_sets(c.profile_data) for c in candidates]
+        self.vocabularies = tuple(
+            {item: column for column, item in enumerate(sorted({x for s in sets for x in s[k]}, key=str))}
+            for k in (0, 2, 3)
+        )
+        self.arrays = self.encode(candidates, sets, dim)
+
+    def encode(self, profiles: list, sets: list | None = None, dim: int | None = None) -> dict:
+        """Encodes profiles (candidates or users being matched) against this vocabulary."""
+        sets = sets if sets is not None else [_profile_sets(p.profile_data) for p in profiles]
+        if dim is None:
+            dim = next((len(p.embedding) for p in profiles if p.embedding is not None), 1)
+        embeddings = np.zeros((len(profiles), dim), dtype=np.float32)
+        for i, p in enumerate(profiles):
+            if p.embedding is not None:
+                embeddings[i] = p.embedding
+        interest_vocab, day_vocab, slot_vocab = self.vocabularies
+        return {
+            "embeddings": embeddings,
+            "norms": np.linalg.norm(embeddings, axis=1).astype(np.float32),
+            "interests": _multi_hot([s[0] for s in sets], interest_vocab),
+            "interest_counts": np.array([len(s[0]) for s in sets], dtype=np.float32),
+            "days": _multi_hot([s[2] for s in sets], day_vocab),
+            "slots": _multi_hot([s[3] for s in sets], slot_vocab),
+            "has_availability": np.array([bool(s[1]) for s in sets], dtype=bool),
+            "valid": np.array([s[4] for s in sets], dtype=bool),
+            "availability_broken": np.array([s[5] for s in sets], dtype=bool),
+        }
+
+    def __len__(self):
+        return len(self.user_ids)
+
+
+def score_block(candidates: dict, users: dict, weights, location_score: float):
+    """
+    Scores every user against every candidate row. Returns (scores, pillars)
+    with shapes (users, rows) and (4, users, rows).
+    """
+    inter = users["interests"] @ candidates["interests"].T
+    union = users["interest_counts"][:, None] + candidates["interest_counts"][None, :] - inter
+    interest = np.divide(inter, union, out=np.zeros_like(inter), where=union > 0)
+
+    both = users["has_availability"][:, None] & candidates["has_availability"][None, :]
+    availability = 0.5 * ((users["days"] @ candidates["days"].T) > 0) + 0.5 * ((users["slots"] @ candidates["slots"].T) > 0)
+    availability = np.where(both, availability, 0.0)
+
+    dots = users["embeddings"] @ candidates["embeddings"].T
+    norms = users["norms"][:, None] * candidates["norms"][None, :]
+    cosine = np.divide(dots, norms, out=np.zeros_like(dots), where=norms > 0)
+    personality = np.maximum(cosine, 0.0)
+
+    location = np.full_like(interest, location_score)
+    pillars = np.stack([interest, availability, location, personality])
+    scores = np.tensordot(np.asarray(weights, dtype=np.float64), pillars, axes=1)
+    # Pairs matching.rank_candidates fails to score (see _profile_sets).
+    scorable = users["valid"][:, None] & candidates["valid"][None, :] & ~(
+        both & (users["availability_broken"][:, None] | candidates["availability_broken"][None, :]))
+    scores = np.where(scorable, scores, -np.inf)
+    return scores, pillars
+
+
+def top_k_block(scores: np.ndarray, pillars: np.ndarray, offset: int, excluded: list[int], limit: int,
+                allowed: np.ndarray | None = None) -> list[list]:
+    """
+    Per user, the `limit` best (score, global_row, pillars) of a scored
+    block. Rows where `allowed` (users, rows) is False are skipped.
+    """
+    results = []
+    for u in range(scores.shape[0]):
+        row = scores[u]
+        if allowed is not None:
+            row = np.where(allowed[u], row, -np.inf)
+        if 0 <= excluded[u] - offset < row.shape[0]:
+            row = row.copy()
+            row[excluded[u] - offset] = -np.inf
+        k = min(limit, row.shape[0])
+        if k == 0:
+            results.append([])
+            continue
+        # Everything tied with the k-th best, ordered by (score desc, row),
+        # so ties resolve to the earliest candidate like a stable sort.
+        threshold = np.partition(row, row.shape[0] - k)[row.shape[0] - k]
+        tied = np.flatnonzero(row >= threshold)
+        best = tied[np.lexsort((tied, -row[tied]))][:k]
+        results.append([
+            (float(row[j]), offset + int(j), tuple(float(p) for p in pillars[:, u, j]))
+            for j in best if np.isfinite(row[j])
+        ])
+    return results
+
+
+class SharedCandidateMatrix:
+    """CandidateFeatures published into shared memory. Use as a context manager."""
+
+    def __init__(self, features: CandidateFeatures):
+        self.features = features
+        self.blocks = []
+        self.layout = {}
+        self._derived = {}
+        for name in _ARRAYS:
+            array = features.arrays[name]
+            block = shared_memory.SharedMemory(create=True, size=max(1, array.nbytes))
+            np.ndarray(array.shape, dtype=array.dtype, buffer=block.buf)[...] = array
+            self.blocks.append(block)
+            self.layout[name] = (block.name, array.shape, array.dtype.str)
+
+    def derived(self, name: str, build):
+        """`build()`, computed once per matrix (e.g. filter columns over the same candidates)."""
+        value = self._derived.get(name)
+        if value is None:
+            value = self._derived[name] = build()
+        return value
+
+    def close(self):
+        for block in self.blocks:
+            block.close()
+            block.unlink()
+        self.blocks = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+# --- worker side -----------------------------------------------------------
+
+_attached = {}
+
+
+def _attach_block(name: str):
+    try:
+        return shared_memory.SharedMemory(name=name, track=False)
+    except TypeError:
+        # Python < 3.13 has no track=False; spawned workers share the
+        # parent's resource tracker, so registering again is harmless.
+        return shared_memory.SharedMemory(name=name)
+
+
+def _attach(layout: dict) -> dict:
+    key = tuple(sorted((name, spec[0]) for name, spec in layout.items()))
+    if key not in _attached:
+        for blocks, _ in _attached.values():
+            for block in blocks:
+                block.close()
+        _attached.clear()
+        blocks, arrays = [], {}
+        for name, (block_name, shape, dtype) in layout.items():
+            block = _attach_block(block_name)
+            blocks.append(block)
+            arrays[name] = np.ndarray(shape, dtype=np.dtype(dtype), buffer=block.buf)
+        _attached[key] = (blocks, arrays)
+    return _attached[key][1]
+
+
+def _score_shard(layout: dict, start: int, stop: int, users: dict, excluded: list[int],
+                 limit: int, weights, location_score: float, allowed: np.ndarray | None = None) -> list[list]:
+    arrays = _attach(layout)
+    shard = {name: array[start:stop] for name, array in arrays.items()}
+    scores, pillars = score_block(shard, users, weights, location_score)
+    return top_k_block(scores, pillars, start, excluded, limit, allowed)
+
+
+def _init_worker():
+    try:
+        from threadpoolctl import threadpool_limits
+        threadpool_limits(1)
+    except ImportError:
+        pass
+
+
+# --- parent side -----------------------------------------------------------
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def get_pool() -> ProcessPoolExecutor:
+    """The persistent scoring pool, started on first use."""
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ProcessPoolExecutor(
+                max_workers=MATCH_SCORING_WORKERS,
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=_init_worker,
+            )
+            logger.info("Started scoring pool with %d workers", MATCH_SCORING_WORKERS)
+        return _pool
+
+
+def shutdown_pool():
+    global _pool
+    published.close()
+    with _pool_lock:
+        if _pool is not None:
+            _pool.shutdown()
+            _pool = None
+
+
+def enabled(candidate_count: int) -> bool:
+    return MATCH_SCORING_WORKERS > 0 and candidate_count >= MATCH_SCORING_MIN_CANDIDATES
+
+
+def rank_users(matrix: SharedCandidateMatrix, users: list, limit: int, weights, location_score: float,
+               shards: int | None = None, allowed: np.ndarray | None = None) -> list[list[tuple]]:
+    """
+    Ranks the published candidates for each of `users` across the pool and
+    returns, per user, the top `limit` (user_id, score, Pillars) best first.
+    A user that is itself in the matrix is never matched with itself.
+    `allowed` is an optional (users, candidates) bool mask; candidates it
+    marks False (hard filters, exclusions) are never returned for that user.
+    """
+    features = matrix.features
+    shards = shards or MATCH_SCORING_WORKERS
+    bounds = np.linspace(0, len(features), shards + 1, dtype=int)
+    pool = get_pool()
+    ranked = []
+    for batch_start in range(0, len(users), USER_BATCH_SIZE):
+        batch = users[batch_start:batch_start + USER_BATCH_SIZE]
+        encoded = features.encode(batch, dim=features.arrays["embeddings"].shape[1])
+        excluded = [features.index.get(u.user_id, -1) for u in batch]
+        batch_allowed = allowed[batch_start:batch_start + USER_BATCH_SIZE] if allowed is not None else None
+        futures = [
+            pool.submit(_score_shard, matrix.layout, int(start), int(stop), encoded, excluded, limit, tuple(weights), location_score,
+                        batch_allowed[:, start:stop] if batch_allowed is not None else None)
+            for start, stop in zip(bounds[:-1], bounds[1:]) if stop > start
+        ]
+        per_shard = [future.result() for future in futures]
+        for u in range(len(batch)):
+            best = heapq.nsmallest(limit, (entry for shard in per_shard for entry in shard[u]), key=lambda e: (-e[0], e[1]))
+            ranked.append([(features.user_ids[row], score, Pillars(*pillars)) for score, row, pillars in best])
+    return ranked
+
+
+class PublishedCandidates:
+    """
+    The most recently published candidate matrix, reused by every refresh
+    while the candidate list (ids and profile versions) is unchanged, so a
+    refresh does not pay the O(N) encode and publish each time. A replaced
+    matrix is closed once the refreshes still using it are done.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._key = None
+        self._current = None
+        self._users = {}
+
+    @contextmanager
+    def use(self, candidates: list):
+        key = tuple((c.user_id, c.version) for c in candidates)
+        with self._lock:
+            if key != self._key:
+                previous = self._current
+                self._current = SharedCandidateMatrix(CandidateFeatures(candidates))
+                self._key = key
+                self._users[self._current] = 0
+                if previous is not None:
+                    self._release(previous)
+            matrix = self._current
+            self._users[matrix] += 1
+        try:
+            yield matrix
+        finally:
+            with self._lock:
+                self._users[matrix] -= 1
+                self._release(matrix)
+
+    def _release(self, matrix: SharedCandidateMatrix):
+        if matrix is not self._current and self._users[matrix] == 0:
+            del self._users[matrix]
+            matrix.close()
+
+    def close(self):
+        with self._lock:
+            current, self._current, self._key = self._current, None, None
+            if current is not None:
+                self._release(current)
+
+
+published = PublishedCandidates()
@@ -0,0 +1,189 @@
+import contextvars
+import cProfile
+import json
+import logging
+import os
+import pstats
+import random
+import re
+import time
+from contextlib import contextmanager, nullcontext
+from functools import wraps
+
+logger = logging.getLogger(__name__)
+
+PROFILE_HEADER = "X-Profile"
+PROFILE_SAMPLE_RATE = float(os.environ.get("PROFILE_SAMPLE_RATE", "0"))
+PROFILE_HEADER_ENABLED = os.environ.get("PROFILE_HEADER_ENABLED", "false").lower() == "true"
+PROFILE_DUMP_DIR = os.environ.get("PROFILE_DUMP_DIR")
+PROFILE_BACKEND = os.environ.get("PROFILE_BACKEND", "cprofile").lower()
+
+_current_profile = contextvars.ContextVar("request_profile", default=None)
+_NULL_PHASE = nullcontext()
+
+
+class RequestProfile:
+    """Phase timings collected for one profiled request."""
+
+    def __init__(self, name: str):
+        self.name = name
+        self.phases = {}
+        self.started = time.perf_counter()
+        self.total = None
+        # Profilers run on worker threads for this request (see threaded).
+        self.thread_profilers = []
+
+    def add(self, phase_name: str, seconds: float):
+        self.phases[phase_name] = self.phases.get(phase_name, 0.0) + seconds
+
+    def server_timing(self) -> str:
+        """Formats the phases as a Server-Timing header value (milliseconds)."""
+        entries = [f"{name};dur={seconds * 1000:.2f}" for name, seconds in self.phases.items()]
+        if self.total is not None:
+            entries.append(f"total;dur={self.total * 1000:.2f}")
+        return ", ".join(entries)
+
+
+class _PhaseTimer:
+    __slots__ = ("profile", "name", "start")
+
+    def __init__(self, profile: RequestProfile, name: str):
+        self.profile = profile
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+
+    def __exit__(self, *exc):
+        self.profile.add(self.name, time.perf_counter() - self.start)
+        return False
+
+
+def phase(name: str):
+    """
+    Times a block as a named phase of the current request's profile. When the
+    request is not being profiled this returns a shared no-op context.
+    """
+    profile = _current_profile.get()
+    if profile is None:
+        return _NULL_PHASE
+    return _PhaseTimer(profile, name)
+
+
+def should_profile(header_value: str | None) -> bool:
+    """Decides whether a request is profiled, by opt-in header or sampling."""
+    if PROFILE_HEADER_ENABLED and header_value and header_value.lower() in ("1", "true", "yes"):
+        return True
+    return PROFILE_SAMPLE_RATE > 0 and random.random() < PROFILE_SAMPLE_RATE
+
+
+def _dump_basename(name: str) -> str:
+    slug = re.sub(r"[^A-Za-z0-9]+", "-", name).strip("-")
+    return os.path.join(PROFILE_DUMP_DIR, f"{time.strftime('%Y%m%dT%H%M%S')}-{int(time.time() * 1000) % 1000:03d}-{slug}")
+
+
+def _start_backend():
+    if not PROFILE_DUMP_DIR:
+        return None
+    if PROFILE_BACKEND == "pyinstrument":
+        try:
+            from pyinstrument import Profiler
+            profiler = Profiler(async_mode="enabled")
+            profiler.start()
+            return profiler
+        except ImportError:
+            logger.warning("pyinstrument is not installed; falling back to cProfile")
+    profiler = cProfile.Profile()
+    try:
+        profiler.enable()
+    except ValueError:
+        # Another sampled request already owns the interpreter's profiler.
+        return None
+    return profiler
+
+
+def _stop_backend(profiler, basename: str, thread_profilers: list):
+    if isinstance(profiler, cProfile.Profile):
+        profiler.disable()
+        stats = pstats.Stats(profiler)
+        for thread_profiler in thread_profilers:
+            stats.add(thread_profiler)
+        stats.dump_stats(basename + ".prof")
+    else:
+        profiler.stop()
+        with open(basename + ".html", "w") as f:
+            f.write(profiler.output_html())
+        for index, thread_profiler in enumerate(thread_profilers):
+            with open(f"{basename}-thread{index}.html", "w") as f:
+                f.write(thread_profiler.output_html())
+
+
+def _start_thread_backend():
+    if PROFILE_BACKEND == "pyinstrument":
+        try:
+            from pyinstrument import Profiler
+            profiler = Profiler(async_mode="disabled")
+            profiler.start()
+            return profiler
+        except ImportError:
+            pass
+    profiler = cProfile.Profile()
+    try:
+        profiler.enable()
+    except ValueError:
+        # Python 3.12+ profiles through sys.monitoring, which covers every
+        # thread: the request's own profiler already sees this one.
+        return None
+    return profiler
+
+
+def threaded(func):
+    """
+    Wraps a blocking function handed to run_in_threadpool so that, in a
+    profiled request, the worker thread is profiled too (cProfile and
+    pyinstrument only see the thread they were started on). Its stats are
+    merged into the request's dump.
+    """
+    @wraps(func)
+    def run(*args, **kwargs):
+        profile = _current_profile.get()
+        if profile is None or not PROFILE_DUMP_DIR:
+            return func(*args, **kwargs)
+        profiler = _start_thread_backend()
+        try:
+            return func(*args, **kwargs)
+        finally:
+            if profiler is not None:
+                if isinstance(profiler, cProfile.Profile):
+                    profiler.disable()
+                else:
+                    profiler.stop()
+                profile.thread_profilers.append(profiler)
+    return run
+
+
+@contextmanager
+def profile_request(name: str):
+    """
+    Activates phase collection for the enclosed request and, when
+    PROFILE_DUMP_DIR is set, records a cProfile/pyinstrument dump next to a
+    JSON phase summary.
+    """
+    profile = RequestProfile(name)
+    token = _current_profile.set(profile)
+    profiler = _start_backend()
+    try:
+        yield profile
+    finally:
+        profile.total = time.perf_counter() - profile.started
+        _current_profile.reset(token)
+        if profiler is not None:
+            try:
+                os.makedirs(PROFILE_DUMP_DIR, exist_ok=True)
+                basename = _dump_basename(name)
+                _stop_backend(profiler, basename, profile.thread_profilers)
+                with open(basename + ".json", "w") as f:
+                    json.dump({"request": name, "total": profile.total, "phases": profile.phases}, f, indent=2)
+            except Exception:
+                logger.exception("Failed to write profile dump for %s", name)
+        logger.info("Profiled %s: %s", name, profile.server_timing())
@@ -0,0 +1,74 @@
+import logging
+import os
+from datetime import datetime, timezone
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# Path to a fitted projection artifact (.npz, see scripts/fit_embedding_projection.py).
+# When set, every newly written profile also stores its reduced embedding.
+EMBEDDING_PROJECTION_PATH = os.environ.get("EMBEDDING_PROJECTION_PATH", "")
+# Score the personality pillar on the reduced embeddings instead of the full ones.
+MATCH_USE_PROJECTION = os.environ.get("MATCH_USE_PROJECTION", "false").lower() == "true"
+if MATCH_USE_PROJECTION and not EMBEDDING_PROJECTION_PATH:
+    raise ValueError("MATCH_USE_PROJECTION requires EMBEDDING_PROJECTION_PATH!")
+
+
+class EmbeddingProjection:
+    """
+    A linear projection of SBERT embeddings onto their top principal axes.
+
+    It is an uncentered truncated SVD: the components are the leading right
+    singular vectors of the raw (unit-norm) embedding matrix, so the projection
+    of a vector is just `components @ vector` and the cosine between two
+    projected vectors approximates the cosine of the originals.
+    """
+
+    def __init__(self, components: np.ndarray, version: str, explained_variance: float = 0.0):
+        self.components = np.asarray(components, dtype=np.float32)
+        self.version = version
+        self.explained_variance = explained_variance
+
+    @property
+    def dim(self) -> int:
+        return self.components.shape[0]
+
+    @property
+    def input_dim(self) -> int:
+        return self.components.shape[1]
+
+    @classmethod
+    def fit(cls, embeddings: np.ndarray, dim: int, version: str | None = None) -> "EmbeddingProjection":
+        """Fits a `dim`-component projection on an (n, input_dim) embedding matrix."""
+        matrix = np.asarray(embeddings, dtype=np.float32)
+        if dim >= matrix.shape[1]:
+            raise ValueError(f"Target dimension {dim} must be below the input dimension {matrix.shape[1]}!")
+        _, singular_values, vt = np.linalg.svd(matrix, full_matrices=False)
+        energy = singular_values ** 2
+        explained = float(energy[:dim].sum() / energy.sum())
+        version = version or f"pca{dim}-{datetime.now(timezone.utc).strftime('%Y%m%d%H%M%S')}"
+        return cls(vt[:dim], version, explained)
+
+    def project(self, embeddings) -> np.ndarray:
+        """Projects one vector or a batch of row vectors."""
+        return np.asarray(embeddings, dtype=np.float32) @ self.components.T
+
+    def save(self, path: str):
+        np.savez(path, components=self.components, version=self.version, explained_variance=self.explained_variance)
+
+    @classmethod
+    def load(cls, path: str) -> "EmbeddingProjection":
+        with np.load(path) as artifact:
+            return cls(artifact["components"], str(artifact["version"]), float(artifact["explained_variance"]))
+
+
+_active = None
+
+def get_active_projection() -> EmbeddingProjection | None:
+    """The projection configured by EMBEDDING_PROJECTION_PATH, loaded once."""
+    global _active
+    if _active is None and EMBEDDING_PROJECTION_PATH:
+        _active = EmbeddingProjection.load(EMBEDDING_PROJECTION_PATH)
+        logger.info("Loaded embedding projection %s (%d -> %d dims, %.1f%% variance)",
+                    _active.version, _active.input_dim, _active.dim, 100 * _active.explained_variance)
+    return _active
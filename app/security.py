@@ -1,4 +1,5 @@
 import os
+import logging
 from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
 from jose import JWTError, jwt
@@ -13,6 +14,8 @@ SECRET_KEY = os.environ.get("JWT_SECRET")
 ALGORITHM = os.environ.get("JWT_ALGORITHM", "HS256")
 DEV_USER_ID = os.environ.get("DEV_USER_ID")
 
+logger = logging.getLogger(__name__)
+
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="token") 
 
 async def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)) -> SharedUser:
@@ -32,10 +35,10 @@ async def get_current_user(token: str = Depends(oauth2_scheme), db: Session = De
         payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
         user_id: str = payload.get("userId") or payload.get("user_id")
         if user_id is None:
-            print("ERROR: JWT payload does not contain 'userId' or 'user_id' claim.")
+            logger.error("JWT payload does not contain 'userId' or 'user_id' claim.")
             raise credentials_exception
     except JWTError as e:
-        print(f"ERROR: JWT validation failed. Error: {e}")
+        logger.error("JWT validation failed: %s", e)
         raise credentials_exception
 
     user = db.query(SharedUser).filter(SharedUser.user_id == user_id).first()
@@ -44,11 +47,10 @@ async def get_current_user(token: str = Depends(oauth2_scheme), db: Session = De
 
     app_user = db.query(AppUser).filter(AppUser.user_id == user_id).first()
     if not app_user:
-        print(f"First-time interaction for user {user.user_id}. Provisioning AppUser record...")
+        logger.info("First-time interaction for user %s. Provisioning AppUser record...", user.user_id)
         new_app_user = AppUser(user_id=user.user_id)
         db.add(new_app_user)
         db.commit()
-        print("   -> AppUser record created.")
     
     return user
 
@@ -0,0 +1,189 @@
+"""
+Columnar, memory-mappable snapshots of the candidate profiles.
+
+A snapshot is a directory of .npy columns plus a manifest:
+
+    <root>/<snapshot_id>/
+        manifest.json            kind (full|delta), base, storage, high-water mark...
+        user_ids.npy             (n,) fixed-width unicode
+        uids.npy                 (n,) int64 app_users.uid (-1 if unknown)
+        versions.npy             (n,) int64 profile content versions
+        embeddings.npy           (n, dim) float32
+        profile_data.bin         concatenated UTF-8 JSON documents
+        profile_offsets.npy      (n + 1,) int64 byte offsets into profile_data.bin
+
+Every column opens with mmap_mode="r", so loading a snapshot costs a few
+page-table entries, not a read of the whole file. A delta holds only the
+profiles updated since its base's high-water mark (profiles.updated_at);
+the newest version of a user wins when a chain is merged. Deleted
+profiles are not tracked by deltas; export a new full snapshot after
+bulk deletions.
+"""
+import json
+import logging
+import os
+from datetime import datetime, timedelta, timezone
+import numpy as np
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+from . import crud, models, projection
+
+logger = logging.getLogger(__name__)
+
+SNAPSHOT_DIR = os.environ.get("SNAPSHOT_DIR", "snapshots")
+MANIFEST = "manifest.json"
+# updated_at is the writing transaction's start time, so a row can commit
+# after a later-stamped one. Deltas re-read this much before the mark.
+HIGH_WATER_OVERLAP = timedelta(minutes=5)
+
+
+class Snapshot:
+    """One snapshot directory, opened read-only via mmap."""
+
+    def __init__(self, path: str):
+        self.path = path
+        with open(os.path.join(path, MANIFEST)) as f:
+            self.manifest = json.load(f)
+        load = lambda name: np.load(os.path.join(path, name), mmap_mode="r")
+        self.user_ids = load("user_ids.npy")
+        self.versions = load("versions.npy")
+        # Snapshots taken before uids existed don't have the column.
+        self.uids = load("uids.npy") if os.path.exists(os.path.join(path, "uids.npy")) else None
+        self.embeddings = load("embeddings.npy")
+        self.profile_offsets = load("profile_offsets.npy")
+        self.profile_blob = np.memmap(os.path.join(path, "profile_data.bin"), dtype=np.uint8, mode="r") \
+            if self.profile_offsets[-1] > 0 else np.zeros(0, dtype=np.uint8)
+
+    @property
+    def id(self) -> str:
+        return self.manifest["id"]
+
+    @property
+    def high_water_mark(self) -> datetime | None:
+        mark = self.manifest.get("high_water_mark")
+        return datetime.fromisoformat(mark) if mark else None
+
+    def __len__(self):
+        return len(self.user_ids)
+
+    def profile_data(self, row: int) -> dict | None:
+        start, stop = self.profile_offsets[row], self.profile_offsets[row + 1]
+        return json.loads(self.profile_blob[start:stop].tobytes()) if stop > start else None
+
+    def candidates(self, rows=None) -> list[crud.CandidateProfile]:
+        rows = range(len(self)) if rows is None else rows
+        return [
+            crud.CandidateProfile(str(self.user_ids[i]), self.profile_data(i), self.embeddings[i], int(self.versions[i]),
+                                  int(self.uids[i]) if self.uids is not None and self.uids[i] >= 0 else None)
+            for i in rows
+        ]
+
+
+def _write_columns(path: str, candidates: list, dim: int):
+    os.makedirs(path)
+    ids_width = max((len(c.user_id) for c in candidates), default=1)
+    np.save(os.path.join(path, "user_ids.npy"), np.array([c.user_id for c in candidates], dtype=f"<U{ids_width}"))
+    np.save(os.path.join(path, "versions.npy"), np.array([c.version or 0 for c in candidates], dtype=np.int64))
+    np.save(os.path.join(path, "uids.npy"), np.array([-1 if c.uid is None else c.uid for c in candidates], dtype=np.int64))
+    embeddings = np.lib.format.open_memmap(os.path.join(path, "embeddings.npy"), mode="w+", dtype=np.float32,
+                                           shape=(len(candidates), dim))
+    offsets = np.zeros(len(candidates) + 1, dtype=np.int64)
+    with open(os.path.join(path, "profile_data.bin"), "wb") as blob:
+        for i, c in enumerate(candidates):
+            embeddings[i] = c.embedding
+            document = json.dumps(c.profile_data).encode() if c.profile_data is not None else b""
+            blob.write(document)
+            offsets[i + 1] = offsets[i] + len(document)
+    embeddings.flush()
+    del embeddings
+    np.save(os.path.join(path, "profile_offsets.npy"), offsets)
+
+
+def export_snapshot(db: Session, root: str = SNAPSHOT_DIR, delta: bool = False, storage: str | None = None) -> dict:
+    """
+    Writes a full snapshot, or a delta on top of the newest snapshot in
+    `root`, and returns its manifest.
+    """
+    storage = storage or crud.SCORING_EMBEDDING
+    base = latest_snapshot(root) if delta else None
+    if delta and base is None:
+        raise ValueError(f"No snapshot in '{root}' to export a delta against!")
+    if base is not None and base.manifest["storage"] != storage:
+        raise ValueError(f"Snapshot {base.id} holds '{base.manifest['storage']}' embeddings, not '{storage}'!")
+
+    # Take the mark before reading so rows updated mid-export land in the next delta.
+    high_water_mark = db.query(func.max(models.Profile.updated_at)).scalar()
+    since = base.high_water_mark - HIGH_WATER_OVERLAP if base is not None and base.high_water_mark else None
+    candidates = crud.get_match_candidates(db, current_user_id="", storage=storage, updated_since=since)
+    dim = len(candidates[0].embedding) if candidates else (base.embeddings.shape[1] if base is not None else 0)
+
+    snapshot_id = datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%S%fZ") + ("-delta" if delta else "-full")
+    path = os.path.join(root, snapshot_id)
+    _write_columns(path, candidates, dim)
+    manifest = {
+        "id": snapshot_id,
+        "kind": "delta" if delta else "full",
+        "base": base.id if base is not None else None,
+        "storage": storage,
+        "projection": projection.get_active_projection().version if storage == "reduced" else None,
+        "rows": len(candidates),
+        "dim": dim,
+        "high_water_mark": high_water_mark.isoformat() if high_water_mark else (base.manifest["high_water_mark"] if base else None),
+        "created_at": datetime.now(timezone.utc).isoformat(),
+    }
+    # The manifest goes last: a directory without one is an interrupted export.
+    with open(os.path.join(path, MANIFEST), "w") as f:
+        json.dump(manifest, f, indent=2)
+    logger.info("Exported %s snapshot %s (%d rows)", manifest["kind"], snapshot_id, len(candidates))
+    return manifest
+
+
+def latest_snapshot(root: str = SNAPSHOT_DIR) -> Snapshot | None:
+    if not os.path.isdir(root):
+        return None
+    complete = sorted(name for name in os.listdir(root) if os.path.exists(os.path.join(root, name, MANIFEST)))
+    return Snapshot(os.path.join(root, complete[-1])) if complete else None
+
+
+def load_chain(root: str = SNAPSHOT_DIR) -> list[Snapshot]:
+    """The newest snapshot and its bases back to a full one, oldest first."""
+    chain = []
+    snapshot = latest_snapshot(root)
+    while snapshot is not None:
+        chain.append(snapshot)
+        base = snapshot.manifest["base"]
+        snapshot = Snapshot(os.path.join(root, base)) if base else None
+    return chain[::-1]
+
+
+def load_candidates(db: Session | None = None, root: str = SNAPSHOT_DIR) -> list[crud.CandidateProfile]:
+    """
+    Rebuilds the candidate list from the snapshot chain (newest version of
+    each user wins). With a session, profiles updated after the chain's
+    high-water mark are fetched from the database and applied on top.
+    """
+    chain = load_chain(root)
+    if not chain:
+        raise FileNotFoundError(f"No snapshot found in '{root}'")
+    manifest = chain[-1].manifest
+    if manifest["storage"] == "reduced" and manifest["projection"] != projection.get_active_projection().version:
+        raise ValueError(f"Snapshot {manifest['id']} was taken with projection {manifest['projection']}, "
+                         f"not the active {projection.get_active_projection().version}!")
+    newest = {}
+    for snapshot in chain:
+        for row, (user_id, version) in enumerate(zip(snapshot.user_ids.tolist(), snapshot.versions.tolist())):
+            current = newest.get(user_id)
+            if current is None or version >= current[2]:
+                newest[user_id] = (snapshot, row, version)
+    candidates = {user_id: snapshot.candidates([row])[0] for user_id, (snapshot, row, _) in newest.items()}
+
+    mark = chain[-1].high_water_mark
+    if db is not None and mark is not None:
+        live = crud.get_match_candidates(db, current_user_id="", storage=manifest["storage"],
+                                         updated_since=mark - HIGH_WATER_OVERLAP)
+        for candidate in live:
+            current = candidates.get(candidate.user_id)
+            if current is None or (candidate.version or 0) >= (current.version or 0):
+                candidates[candidate.user_id] = candidate
+        logger.info("Loaded %d candidates from %d snapshot(s) plus %d live rows", len(candidates), len(chain), len(live))
+    return list(candidates.values())
@@ -0,0 +1,142 @@
+import asyncio
+import logging
+import os
+import time
+from contextlib import asynccontextmanager
+from fastapi import HTTPException
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy import text
+from . import metrics
+from .database import engine, advisory_lock_key
+
+logger = logging.getLogger(__name__)
+
+# "local": per-process asyncio locks (single worker).
+# "advisory": additionally hold a Postgres advisory lock so turns for the
+# same thread are serialized across uvicorn workers and hosts.
+CHAT_LOCK_MODE = os.environ.get("CHAT_LOCK_MODE", "local").lower()
+CHAT_LOCK_TIMEOUT = float(os.environ.get("CHAT_LOCK_TIMEOUT", "120"))
+ADVISORY_POLL_SECONDS = 0.05
+
+BUSY_DETAIL = "Another message for this conversation is still being processed."
+CANCELLED_DETAIL = "The original request for this message was cancelled. Please retry."
+
+
+class _ThreadState:
+    __slots__ = ("lock", "pending", "users")
+
+    def __init__(self):
+        self.lock = asyncio.Lock()
+        self.pending = {}
+        self.users = 0
+
+
+class ThreadTurnCoordinator:
+    """
+    Serializes /chat turns per thread_id.
+
+    A turn whose (thread_id, message_id) is already queued or running is not
+    executed again: the duplicate waits for and returns the original's
+    result, so client retries no longer start a second OpenAI run or a
+    second save_final_profile/match refresh. message_id is supplied by the
+    client; turns without one are never coalesced (the same text sent twice
+    is two messages). Turns for the same thread queue behind each other in
+    arrival order, for at most CHAT_LOCK_TIMEOUT seconds.
+    """
+
+    def __init__(self):
+        self._states = {}
+
+    def _state(self, thread_id: str) -> _ThreadState:
+        state = self._states.get(thread_id)
+        if state is None:
+            state = self._states[thread_id] = _ThreadState()
+        return state
+
+    async def run(self, thread_id: str, message_id: str | None, turn):
+        """Runs `turn` (an async callable) exclusively for `thread_id`."""
+        state = self._state(thread_id)
+        existing = state.pending.get(message_id) if message_id is not None else None
+        if existing is not None:
+            metrics.CHAT_TURNS_COALESCED.inc()
+            logger.info("Coalescing duplicate message on thread %s", thread_id)
+            return await asyncio.shield(existing)
+
+        future = asyncio.get_running_loop().create_future()
+        # Nobody may be waiting on a failed turn; don't warn about it.
+        future.add_done_callback(lambda f: f.cancelled() or f.exception())
+        if message_id is not None:
+            state.pending[message_id] = future
+        state.users += 1
+        try:
+            result = await self._run_exclusive(state, thread_id, turn)
+        except BaseException as e:
+            # Whatever failed (lock timeout, connection error, the turn
+            # itself, cancellation), duplicates waiting on the future must
+            # not hang.
+            if not future.done():
+                if isinstance(e, asyncio.CancelledError):
+                    future.set_exception(HTTPException(status_code=409, detail=CANCELLED_DETAIL))
+                else:
+                    future.set_exception(e)
+            raise
+        else:
+            future.set_result(result)
+            return result
+        finally:
+            if message_id is not None and state.pending.get(message_id) is future:
+                del state.pending[message_id]
+            state.users -= 1
+            if state.users == 0:
+                self._states.pop(thread_id, None)
+
+    async def _run_exclusive(self, state: _ThreadState, thread_id: str, turn):
+        start = time.perf_counter()
+        deadline = time.monotonic() + CHAT_LOCK_TIMEOUT
+        # asyncio.timeout, not wait_for: on 3.11 wait_for can swallow a
+        # cancellation that races with the acquire and return holding the lock.
+        try:
+            async with asyncio.timeout(CHAT_LOCK_TIMEOUT):
+                await state.lock.acquire()
+        except TimeoutError:
+            raise HTTPException(status_code=409, detail=BUSY_DETAIL)
+        try:
+            async with _cross_worker_lock(thread_id, deadline):
+                metrics.CHAT_THREAD_LOCK_WAIT_SECONDS.observe(time.perf_counter() - start)
+                return await turn()
+        finally:
+            state.lock.release()
+
+
+def _try_advisory_lock(connection, key: int) -> bool:
+    return connection.execute(text("SELECT pg_try_advisory_lock(:key)"), {"key": key}).scalar()
+
+
+def _advisory_unlock(connection, key: int):
+    connection.execute(text("SELECT pg_advisory_unlock(:key)"), {"key": key})
+
+
+@asynccontextmanager
+async def _cross_worker_lock(thread_id: str, deadline: float):
+    if CHAT_LOCK_MODE != "advisory":
+        yield
+        return
+    key = advisory_lock_key("chat", thread_id)
+    # AUTOCOMMIT: the session-level lock outlives each statement, so the
+    # connection need not sit idle in a transaction while the turn runs.
+    # All database calls go through the threadpool, off the event loop.
+    connection = await run_in_threadpool(lambda: engine.connect().execution_options(isolation_level="AUTOCOMMIT"))
+    try:
+        while not await run_in_threadpool(_try_advisory_lock, connection, key):
+            if time.monotonic() > deadline:
+                raise HTTPException(status_code=409, detail=BUSY_DETAIL)
+            await asyncio.sleep(ADVISORY_POLL_SECONDS)
+        try:
+            yield
+        finally:
+            await run_in_threadpool(_advisory_unlock, connection, key)
+    finally:
+        await run_in_threadpool(connection.close)
+
+
+coordinator = ThreadTurnCoordinator()
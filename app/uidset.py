@@ -0,0 +1,70 @@
+"""
+Sets of integer user uids (app_users.uid) for the matching hot paths.
+
+A UidSet keeps its members as a sorted int64 array, so membership for a
+whole array of uids (snapshot columns, feature matrices) is one
+vectorized searchsorted. Python-object paths use `members`, a frozenset
+of small ints, which hashes and compares faster than 32-char strings.
+When pyroaring is installed a roaring bitmap is kept alongside for
+compact storage and set algebra.
+"""
+import numpy as np
+
+try:
+    from pyroaring import BitMap
+except ImportError:
+    BitMap = None
+
+
+class UidSet:
+    """An immutable set of non-negative integer uids."""
+
+    def __init__(self, uids=()):
+        if BitMap is not None and isinstance(uids, BitMap):
+            self._bitmap = uids
+            self.uids = np.asarray(uids.to_array(), dtype=np.int64)
+            self._members = None
+            return
+        if isinstance(uids, np.ndarray):
+            self.uids = np.unique(uids.astype(np.int64))
+        else:
+            self.uids = np.unique(np.fromiter((int(uid) for uid in uids if uid is not None), dtype=np.int64))
+        if self.uids.size and self.uids[0] < 0:
+            raise ValueError("uids must be non-negative")
+        self._bitmap = BitMap(self.uids.astype(np.uint32)) if BitMap is not None else None
+        self._members = None
+
+    @property
+    def members(self) -> frozenset:
+        if self._members is None:
+            self._members = frozenset(self.uids.tolist())
+        return self._members
+
+    def __len__(self):
+        return int(self.uids.size)
+
+    def __contains__(self, uid) -> bool:
+        if uid is None:
+            return False
+        if self._bitmap is not None:
+            return 0 <= uid < 2 ** 32 and int(uid) in self._bitmap
+        index = np.searchsorted(self.uids, uid)
+        return bool(index < self.uids.size and self.uids[index] == uid)
+
+    def contains(self, uids) -> np.ndarray:
+        """Vectorized membership: a bool array shaped like `uids`."""
+        uids = np.asarray(uids, dtype=np.int64)
+        if not self.uids.size:
+            return np.zeros(uids.shape, dtype=bool)
+        index = np.minimum(np.searchsorted(self.uids, uids), self.uids.size - 1)
+        return self.uids[index] == uids
+
+    def union(self, other: "UidSet") -> "UidSet":
+        if self._bitmap is not None and other._bitmap is not None:
+            return UidSet(self._bitmap | other._bitmap)
+        return UidSet(np.union1d(self.uids, other.uids))
+
+    def nbytes(self) -> int:
+        if self._bitmap is not None:
+            return self._bitmap.get_serialized_size_in_bytes()
+        return self.uids.nbytes
@@ -0,0 +1,96 @@
+"""
+Database-side scoring (MATCH_DB_SCORING) vs the Python path.
+
+For each population size, bench users are seeded and one of them is
+ranked both ways: get_match_candidates + matching.rank_candidates against
+crud.db_rank_candidates. Before timing, every candidate's SQL score is
+compared with matching.calculate_final_match_score and the run fails if
+any differs by more than --tolerance.
+
+    python -m benchmarks.bench_db_scoring --sizes 1000 10000 50000
+
+Needs DATABASE_URL at the match score function migration; bench rows are
+removed afterwards.
+"""
+import argparse
+import os
+import sys
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from dotenv import load_dotenv
+from sqlalchemy import text
+
+from benchmarks.harness import measure, print_results, save_results
+
+load_dotenv()
+
+TOP_K = 10
+
+
+def check_agreement(db, user_profile, tolerance: float) -> float:
+    """Max |SQL score - Python score| over all candidates; raises above `tolerance`."""
+    from app import crud, matching
+    rows = crud.get_match_candidates(db, user_profile.user_id, hard_filter_profile=user_profile.profile_data)
+    candidates = {c.user_id: c for c in rows}
+    ranked = crud.db_rank_candidates(db, user_profile, limit=len(candidates))
+    if len(ranked) != len(candidates):
+        raise AssertionError(f"SQL scored {len(ranked)} candidates, Python {len(candidates)}")
+    worst = 0.0
+    for user_id, score, pillars in ranked:
+        expected_pillars = matching.calculate_pillar_scores(user_profile, candidates[user_id])
+        expected = matching.combine_pillar_scores(expected_pillars)
+        worst = max(worst, abs(score - expected))
+        if abs(score - expected) > tolerance:
+            raise AssertionError(f"{user_id}: SQL {score} ({pillars}) vs Python {expected} ({expected_pillars})")
+    return worst
+
+
+def bench_size(results: dict, size: int, tolerance: float):
+    from app import crud, matching
+    from app.database import SessionLocal, engine
+    from benchmarks.db import cleanup_bench_users, seed_bench_users
+
+    db = SessionLocal()
+    try:
+        cleanup_bench_users(db)
+        user_ids = seed_bench_users(db, size)
+        with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as connection:
+            connection.execute(text("VACUUM ANALYZE profiles"))
+        user_profile = crud.scoring_view(crud.get_user_profile(db, user_ids[0]))
+        worst = check_agreement(db, user_profile, tolerance)
+        print(f"{size} candidates: max |SQL - Python| score difference {worst:.2e}")
+
+        def python_path():
+            candidates = crud.get_match_candidates(db, user_ids[0], hard_filter_profile=user_profile.profile_data)
+            return matching.rank_candidates(user_profile, candidates, limit=TOP_K)
+
+        python_top = {row[0] for row in python_path()}
+        sql_top = {row[0] for row in crud.db_rank_candidates(db, user_profile, limit=TOP_K)}
+        print(f"{size} candidates: top-{TOP_K} overlap {len(python_top & sql_top)}/{TOP_K}")
+
+        results[f"rank[python,{size}]"] = measure(python_path, repeat=3)
+        results[f"rank[database,{size}]"] = measure(lambda: crud.db_rank_candidates(db, user_profile, limit=TOP_K), repeat=3)
+        db.rollback()
+    finally:
+        cleanup_bench_users(db)
+        db.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark database-side match scoring against the Python path.")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000, 50000])
+    parser.add_argument("--tolerance", type=float, default=1e-6, help="Max allowed score difference.")
+    parser.add_argument("--save", action="store_true", help="Store results under benchmarks/results/.")
+    args = parser.parse_args()
+
+    results = {}
+    for size in args.sizes:
+        bench_size(results, size, args.tolerance)
+    print_results(results)
+    if args.save:
+        print(f"\nResults saved to {save_results(results)}")
+
+
+if __name__ == "__main__":
+    main()
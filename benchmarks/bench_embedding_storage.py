@@ -0,0 +1,98 @@
+"""
+Compares float32, half-precision and binary-quantized embedding storage on
+a seeded bench population: bytes per row, candidate scan time, and how far
+the resulting top-10 lists drift from full-precision scoring.
+
+    python -m benchmarks.bench_embedding_storage --size 10000
+
+Needs DATABASE_URL with the pgvector migrations applied; bench rows are
+removed afterwards.
+"""
+import argparse
+import os
+import sys
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from dotenv import load_dotenv
+from sqlalchemy import text
+
+from benchmarks.db import BENCH_PREFIX, seed_bench_users, cleanup_bench_users
+from benchmarks.harness import measure, print_results, save_results
+
+load_dotenv()
+
+TOP_K = 10
+
+
+def column_sizes(db) -> dict:
+    row = db.execute(text(
+        "SELECT avg(pg_column_size(embedding)), avg(pg_column_size(embedding_half)), avg(pg_column_size(embedding_bits)) "
+        "FROM profiles WHERE user_id LIKE :prefix"
+    ), {"prefix": f"{BENCH_PREFIX}%"}).one()
+    return {"float32": float(row[0]), "halfvec": float(row[1]), "bits": float(row[2])}
+
+
+def top_ids(user_profile, candidates) -> set:
+    from app import matching
+    others = [c for c in candidates if c.user_id != user_profile.user_id]
+    return {user_id for user_id, _, _ in matching.rank_candidates(user_profile, others, limit=TOP_K)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark embedding storage formats.")
+    parser.add_argument("--size", type=int, default=10000)
+    parser.add_argument("--users", type=int, default=20, help="Users whose top-10 lists are compared.")
+    parser.add_argument("--prefilter", type=int, nargs="+", default=[200, 1000], help="Hamming prefilter limits to evaluate.")
+    parser.add_argument("--save", action="store_true", help="Store results under benchmarks/results/.")
+    args = parser.parse_args()
+
+    from app import crud
+    from app.database import SessionLocal
+
+    db = SessionLocal()
+    results = {}
+    try:
+        cleanup_bench_users(db)
+        user_ids = seed_bench_users(db, args.size)
+        sizes = column_sizes(db)
+        print(f"Average bytes per row: float32 {sizes['float32']:.0f}, halfvec {sizes['halfvec']:.0f}, bits {sizes['bits']:.0f}")
+
+        candidates = {}
+        for storage in ("float32", "halfvec"):
+            results[f"get_match_candidates[{storage}]"] = measure(
+                lambda: crud.get_match_candidates(db, current_user_id="", storage=storage), repeat=3
+            )
+            results[f"get_match_candidates[{storage}]"]["bytes_per_row"] = sizes[storage]
+            candidates[storage] = crud.get_match_candidates(db, current_user_id="", storage=storage)
+        by_id = {storage: {c.user_id: c for c in rows} for storage, rows in candidates.items()}
+
+        sample = user_ids[:args.users]
+        reference = {user_id: top_ids(by_id["float32"][user_id], candidates["float32"]) for user_id in sample}
+        overlap = [len(reference[u] & top_ids(by_id["halfvec"][u], candidates["halfvec"])) / TOP_K for u in sample]
+        print(f"halfvec top-{TOP_K} overlap with float32: {sum(overlap) / len(overlap):.3f}")
+
+        bits = dict(db.execute(text("SELECT user_id, embedding_bits FROM profiles WHERE user_id LIKE :prefix"),
+                               {"prefix": f"{BENCH_PREFIX}%"}).all())
+        for limit in args.prefilter:
+            stats = measure(lambda: crud.get_match_candidates(
+                db, current_user_id=sample[0], prefilter_bits=bits[sample[0]], prefilter_limit=limit
+            ), repeat=3)
+            overlap = []
+            for user_id in sample:
+                shortlist = crud.get_match_candidates(db, current_user_id=user_id, prefilter_bits=bits[user_id], prefilter_limit=limit)
+                overlap.append(len(reference[user_id] & top_ids(by_id["float32"][user_id], shortlist)) / TOP_K)
+            stats["top10_overlap"] = sum(overlap) / len(overlap)
+            results[f"get_match_candidates[prefilter={limit}]"] = stats
+            print(f"Hamming prefilter {limit}: top-{TOP_K} overlap with full scan {stats['top10_overlap']:.3f}")
+    finally:
+        cleanup_bench_users(db)
+        db.close()
+
+    print_results(results)
+    if args.save:
+        print(f"\nResults saved to {save_results(results)}")
+
+
+if __name__ == "__main__":
+    main()
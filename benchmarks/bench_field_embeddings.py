@@ -0,0 +1,88 @@
+"""
+Field-level embeddings (EMBEDDING_MODE=fields) vs one combined sentence.
+
+Offline: how many distinct field texts a population needs (what the
+field vector cache and batch dedup save) and the cost of recombining all
+profile vectors with new weights in NumPy. With --model also the SBERT
+cost of a full profile encode, a first field-mode save and an edit that
+changes only the vibe.
+
+    python -m benchmarks.bench_field_embeddings --size 100000
+    python -m benchmarks.bench_field_embeddings --model --count 256
+"""
+import argparse
+import os
+import sys
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import numpy as np
+
+from benchmarks.harness import measure, print_results, save_results
+from benchmarks.population import EMBEDDING_DIM, generate_population, random_unit_embedding
+
+
+def bench_recombine(results: dict, size: int):
+    from app import field_embeddings
+    profiles = [profile.profile_data for profile in generate_population(size, seed=size)]
+    texts = [field_embeddings.field_texts(profile_data) for profile_data in profiles]
+    field_count = sum(1 for row in texts for text in row.values() if text)
+    distinct = len({text for row in texts for text in row.values() if text})
+    print(f"{size} profiles: {field_count} field texts, {distinct} distinct ({distinct / field_count:.1%} need encoding)")
+    results["field_texts"] = {"fields": field_count, "distinct": distinct}
+
+    rng = np.random.default_rng(size)
+    matrices = {field: np.stack([random_unit_embedding(rng, EMBEDDING_DIM) for _ in range(size)])
+                for field in field_embeddings.FIELDS}
+    retuned = {"vibe": 0.6, "interests": 0.25, "intent": 0.15}
+    results[f"recombine[{size}]"] = measure(lambda: field_embeddings.combine_many(matrices, retuned), repeat=5)
+
+
+def bench_model(results: dict, count: int):
+    from app import crud, field_embeddings
+    crud.load_embedding_model()
+    profiles = [profile.profile_data for profile in generate_population(count, seed=7)]
+    encoder = crud._encode_texts
+
+    def combined():
+        for profile_data in profiles:
+            crud.embedding_model.encode(crud.profile_embedding_text(profile_data))
+
+    def fields_first_save():
+        field_embeddings.field_vectors.clear()
+        for profile_data in profiles:
+            field_embeddings.combine(field_embeddings.encode_fields(profile_data, encoder).vectors)
+
+    stored = [field_embeddings.encode_fields(profile_data, encoder) for profile_data in profiles]
+    edited = [dict(profile_data, vibe_summary=f"{profile_data['vibe_summary']} Edited.") for profile_data in profiles]
+
+    def fields_vibe_edit():
+        field_embeddings.field_vectors.clear()
+        for profile_data, previous in zip(edited, stored):
+            field_embeddings.combine(field_embeddings.encode_fields(profile_data, encoder, previous=previous).vectors)
+
+    for name, run in (("combined", combined), ("fields_first_save", fields_first_save), ("fields_vibe_edit", fields_vibe_edit)):
+        stats = measure(run, repeat=3)
+        stats["profiles_per_second"] = count / stats["median"]
+        results[f"encode[{name},{count}]"] = stats
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark field-level embeddings.")
+    parser.add_argument("--size", type=int, default=100000, help="Population size for the offline part.")
+    parser.add_argument("--model", action="store_true", help="Also time SBERT encodes (loads the model).")
+    parser.add_argument("--count", type=int, default=256, help="Profiles encoded per --model run.")
+    parser.add_argument("--save", action="store_true", help="Store results under benchmarks/results/.")
+    args = parser.parse_args()
+
+    results = {}
+    bench_recombine(results, args.size)
+    if args.model:
+        bench_model(results, args.count)
+    print_results(results)
+    if args.save:
+        print(f"\nResults saved to {save_results(results)}")
+
+
+if __name__ == "__main__":
+    main()
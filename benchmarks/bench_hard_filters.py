@@ -0,0 +1,113 @@
+"""
+Candidate-set shrinkage from the hard match filters (app/hard_filters.py).
+
+Offline: for a sample of users from a synthetic population, the share of
+candidates each filter (and all of them combined) removes, plus the cost
+of the Python filter. With --database: get_match_candidates latency with
+and without the filters pushed into SQL, and the plans they get.
+
+    python -m benchmarks.bench_hard_filters --size 10000
+    python -m benchmarks.bench_hard_filters --database --size 20000
+
+The database part needs DATABASE_URL at the hard filter index migration;
+bench rows are removed afterwards.
+"""
+import argparse
+import os
+import random
+import sys
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from dotenv import load_dotenv
+from sqlalchemy import text
+
+from benchmarks.harness import measure, print_results, save_results
+from benchmarks.population import generate_population
+
+load_dotenv()
+
+SAMPLE_USERS = 200
+
+
+def filter_sets() -> dict:
+    from app.hard_filters import FILTERS
+    sets = {name: [name] for name in FILTERS}
+    sets["all"] = list(FILTERS)
+    return sets
+
+
+def bench_shrinkage(results: dict, size: int):
+    from app.hard_filters import allows
+    profiles = [profile.profile_data for profile in generate_population(size, seed=size)]
+    users = random.Random(size).sample(profiles, min(SAMPLE_USERS, size))
+    kept_fractions = {}
+    for label, names in filter_sets().items():
+        kept = [sum(allows(user, candidate, names) for candidate in profiles) / len(profiles) for user in users]
+        kept_mean = sum(kept) / len(kept)
+        kept_fractions[label] = round(kept_mean, 4)
+        print(f"{label:>14}: keeps {kept_mean:.1%} of candidates (min {min(kept):.1%}, max {max(kept):.1%})")
+    results["kept_fraction"] = kept_fractions
+    user = users[0]
+    names = filter_sets()["all"]
+    results[f"python_filter[{size}]"] = measure(lambda: [c for c in profiles if allows(user, c, names)], repeat=5)
+
+
+def bench_database(results: dict, size: int):
+    from app import crud, hard_filters
+    from app.database import SessionLocal, engine
+    from benchmarks.db import cleanup_bench_users, seed_bench_users
+
+    db = SessionLocal()
+    try:
+        cleanup_bench_users(db)
+        user_ids = seed_bench_users(db, size)
+        with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as connection:
+            connection.execute(text("VACUUM ANALYZE profiles"))
+        user_data = {user_id: crud.get_user_profile(db, user_id).profile_data for user_id in user_ids[:SAMPLE_USERS]}
+        picks = iter(random.choices(list(user_data), k=10000))
+
+        results["candidates[none]"] = measure(lambda: crud.get_match_candidates(db, next(picks)), repeat=3)
+        for label, names in filter_sets().items():
+            def run():
+                user_id = next(picks)
+                query = db.query(crud.models.Profile.user_id).filter(
+                    crud.models.Profile.user_id != user_id,
+                    *hard_filters.sql_predicates(user_data[user_id], names))
+                return query.count()
+            results[f"count[{label}]"] = measure(run, repeat=3, number=20)
+            user_id = user_ids[0]
+            statement = db.query(crud.models.Profile.user_id).filter(
+                *hard_filters.sql_predicates(user_data[user_id], names)).statement
+            compiled = statement.compile(engine, compile_kwargs={"literal_binds": True})
+            plan = db.execute(text(f"EXPLAIN {compiled}")).scalars().all()
+            print(f"\n{label} plan:\n  " + "\n  ".join(plan))
+        if hard_filters.MATCH_HARD_FILTERS:
+            def filtered_candidates():
+                user_id = next(picks)
+                return crud.get_match_candidates(db, user_id, hard_filter_profile=user_data[user_id])
+            results["candidates[MATCH_HARD_FILTERS]"] = measure(filtered_candidates, repeat=3)
+        db.rollback()
+    finally:
+        cleanup_bench_users(db)
+        db.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark candidate shrinkage from hard match filters.")
+    parser.add_argument("--size", type=int, default=10000, help="Population size.")
+    parser.add_argument("--database", action="store_true", help="Also time the filters pushed into SQL.")
+    parser.add_argument("--save", action="store_true", help="Store results under benchmarks/results/.")
+    args = parser.parse_args()
+
+    results = {}
+    bench_shrinkage(results, args.size)
+    if args.database:
+        bench_database(results, args.size)
+    print_results(results)
+    if args.save:
+        print(f"\nResults saved to {save_results(results)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,173 @@
+"""
+Feed latency on a large matches table, before and after compacting old
+passes, plus the on-disk size of the table, its indexes and
+match_exclusions.
+
+    python -m benchmarks.bench_matches_table --users 100000 --per-user 500   # 50M rows
+
+Each bench user gets `--per-user` rows: 10 suggested, 3 active, 2 blocked,
+the rest passed with update times spread over the last 180 days. Users
+are created without profiles (the feeds only read matches here). Needs
+DATABASE_URL at the partitioned-matches migration; bench rows are removed
+afterwards unless --keep is given.
+"""
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from dotenv import load_dotenv
+from sqlalchemy import text
+
+from benchmarks.db import BENCH_PREFIX, cleanup_bench_users
+from benchmarks.harness import measure, print_results, save_results
+
+load_dotenv()
+
+SEED_CHUNK_USERS = 2000
+
+SEED_USERS_SQL = text("""
+    INSERT INTO users (user_id, mobile_number, name)
+    SELECT :prefix || lpad(to_hex(i), 27, '0'), '+0' || lpad(i::text, 14, '0'), 'Bench ' || i
+    FROM generate_series(0, :count - 1) i
+""")
+SEED_APP_USERS_SQL = text("""
+    INSERT INTO app_users (user_id)
+    SELECT :prefix || lpad(to_hex(i), 27, '0') FROM generate_series(0, :count - 1) i
+""")
+SEED_MATCHES_SQL = text("""
+    INSERT INTO matches (user_id, match_id, score, status, score_version, pillar_scores, updated_at)
+    SELECT :prefix || lpad(to_hex(u), 27, '0'),
+           :prefix || lpad(to_hex((u + k * :stride) % :count), 27, '0'),
+           random(),
+           CASE WHEN k <= 10 THEN 'suggested' WHEN k <= 13 THEN 'active' WHEN k <= 15 THEN 'blocked' ELSE 'passed' END,
+           1,
+           ARRAY[random(), random(), 0.5, random()],
+           now() - random() * interval '180 days'
+    FROM generate_series(:start, :stop - 1) u, generate_series(1, :per_user) k
+""")
+SIZES_SQL = text("""
+    SELECT coalesce(sum(pg_table_size(relid)), 0), coalesce(sum(pg_indexes_size(relid)), 0)
+    FROM pg_partition_tree(CAST(:table AS regclass)) WHERE isleaf
+""")
+
+
+def seed(db, users: int, per_user: int):
+    from app.database import engine
+    params = {"prefix": BENCH_PREFIX, "count": users}
+    db.execute(SEED_USERS_SQL, params)
+    db.execute(SEED_APP_USERS_SQL, params)
+    db.commit()
+    # Spreads each user's matches over the population without repeats or self-matches.
+    stride = max(1, (users - 1) // per_user)
+    start = time.perf_counter()
+    for chunk_start in range(0, users, SEED_CHUNK_USERS):
+        db.execute(SEED_MATCHES_SQL, {**params, "stride": stride, "per_user": min(per_user, users - 1),
+                                      "start": chunk_start, "stop": min(users, chunk_start + SEED_CHUNK_USERS)})
+        db.commit()
+        done = min(users, chunk_start + SEED_CHUNK_USERS)
+        print(f"  seeded {done * per_user:,} rows ({done * per_user / (time.perf_counter() - start):,.0f} rows/s)")
+    # Index-only scans need an up-to-date visibility map.
+    with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as connection:
+        connection.execute(text("VACUUM ANALYZE matches"))
+        connection.execute(text("VACUUM ANALYZE match_exclusions"))
+
+
+def sizes(db) -> dict:
+    matches_table, matches_indexes = db.execute(SIZES_SQL, {"table": "matches"}).one()
+    exclusions = db.execute(text("SELECT pg_total_relation_size('match_exclusions')")).scalar()
+    return {"matches_table_bytes": int(matches_table), "matches_index_bytes": int(matches_indexes),
+            "match_exclusions_bytes": int(exclusions)}
+
+
+def plan_summary(db, user_id: str) -> str:
+    from app import models
+    from app.crud import MATCH_FEED_COLUMNS
+    query = db.query(*MATCH_FEED_COLUMNS).filter(models.Match.user_id == user_id, models.Match.status == "suggested") \
+        .order_by(models.Match.score.desc())
+    compiled = query.statement.compile(db.get_bind(), compile_kwargs={"literal_binds": True})
+    plan = db.execute(text(f"EXPLAIN (ANALYZE, BUFFERS) {compiled}")).scalars().all()
+    return " / ".join(line.strip() for line in plan if "Scan" in line or "Buffers" in line or "Execution" in line)
+
+
+def bench_feeds(db, user_ids: list[str], label: str, results: dict):
+    from app import crud, models
+    from app.crud import MATCH_FEED_COLUMNS
+    from sqlalchemy.orm import load_only
+
+    picks = iter(random.choices(user_ids, k=10000))
+
+    def suggested():
+        crud.get_suggested_match_records(db, next(picks), limit=10)
+        db.rollback()
+
+    def active():
+        db.query(models.Match).options(load_only(*MATCH_FEED_COLUMNS, models.Match.updated_at)).filter(
+            models.Match.user_id == next(picks), models.Match.status == "active"
+        ).order_by(models.Match.updated_at.desc()).all()
+        db.rollback()
+
+    def refresh_read():
+        # What store_user_matches reads before upserting.
+        user_id = next(picks)
+        db.query(models.Match).filter(models.Match.user_id == user_id).all()
+        crud.get_excluded_uids(db, user_id)
+        db.rollback()
+
+    results[f"suggested_feed[{label}]"] = measure(suggested, repeat=5, number=50)
+    results[f"active_feed[{label}]"] = measure(active, repeat=5, number=50)
+    results[f"refresh_existing_rows[{label}]"] = measure(refresh_read, repeat=5, number=20)
+    print(f"{label} plan: {plan_summary(db, user_ids[0])}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the partitioned matches table and passed-row compaction.")
+    parser.add_argument("--users", type=int, default=10000)
+    parser.add_argument("--per-user", type=int, default=500)
+    parser.add_argument("--retention-days", type=int, default=30)
+    parser.add_argument("--keep", action="store_true", help="Leave the bench rows in place.")
+    parser.add_argument("--save", action="store_true", help="Store results under benchmarks/results/.")
+    args = parser.parse_args()
+
+    from app.database import SessionLocal
+    from scripts.compact_passed_matches import compact_passed_matches
+
+    db = SessionLocal()
+    results = {}
+    try:
+        cleanup_bench_users(db)
+        print(f"Seeding {args.users:,} users x {args.per_user} matches...")
+        seed(db, args.users, args.per_user)
+        user_ids = [f"{BENCH_PREFIX}{i:027x}" for i in range(args.users)]
+
+        before = sizes(db)
+        print(f"Before compaction: {before}")
+        bench_feeds(db, user_ids, "before", results)
+
+        start = time.perf_counter()
+        moved = compact_passed_matches(args.retention_days, batch_size=5000)
+        results["compaction"] = {"rows": moved, "seconds": time.perf_counter() - start}
+        from app.database import engine
+        with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as connection:
+            connection.execute(text("VACUUM ANALYZE matches"))
+            connection.execute(text("VACUUM ANALYZE match_exclusions"))
+
+        after = sizes(db)
+        print(f"After compaction: {after}")
+        bench_feeds(db, user_ids, "after", results)
+        results["sizes"] = {"before": before, "after": after}
+    finally:
+        if not args.keep:
+            cleanup_bench_users(db)
+        db.close()
+
+    print_results(results)
+    if args.save:
+        print(f"\nResults saved to {save_results(results)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,226 @@
+"""
+Matching benchmark suite.
+
+In-memory benchmarks run anywhere. Pass --database to also benchmark the
+database-backed paths (refresh_user_matches, the match-list endpoints)
+against the DATABASE_URL in your .env; bench users are inserted with a
+'bench' id prefix and removed afterwards.
+
+    python -m benchmarks.bench_matching --sizes 1000 10000 --save
+    python -m benchmarks.bench_matching --database --compare benchmarks/results/<baseline>.json
+"""
+import argparse
+import os
+import sys
+
+from dotenv import load_dotenv
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+load_dotenv()
+
+from app import matching
+from benchmarks.harness import measure, save_results, compare_results, print_results
+from benchmarks.population import generate_population
+from benchmarks.db import seed_bench_users, cleanup_bench_users
+
+DEFAULT_SIZES = [1000, 10000, 100000]
+
+
+def bench_calculate_final_match_score(results: dict):
+    profiles = list(generate_population(200, seed=1))
+    pairs = [(profiles[i], profiles[-i - 1]) for i in range(100)]
+
+    def run():
+        for a, b in pairs:
+            matching.calculate_final_match_score(a, b)
+
+    stats = measure(run, repeat=5)
+    stats = {key: (value / len(pairs) if key in ("min", "median", "mean") else value) for key, value in stats.items()}
+    results["calculate_final_match_score"] = stats
+
+
+def bench_rank_candidates(results: dict, sizes: list[int]):
+    for size in sizes:
+        population = list(generate_population(size + 1, seed=size))
+        user_profile, candidates = population[0], population[1:]
+        results[f"rank_candidates[{size}]"] = measure(
+            lambda: matching.rank_candidates(user_profile, candidates, limit=10), repeat=3
+        )
+
+
+def bench_full_rematch_scoring(results: dict, size: int = 300):
+    from collections import namedtuple
+    from app.pair_cache import PairScoreCache
+
+    Versioned = namedtuple("Versioned", ["user_id", "profile_data", "embedding", "version"])
+    population = [Versioned(*p, 1) for p in generate_population(size, seed=3)]
+
+    def run(cache):
+        for user_profile in population:
+            others = [c for c in population if c.user_id != user_profile.user_id]
+            matching.rank_candidates(user_profile, others, limit=10, cache=cache)
+
+    results[f"full_rematch_scoring[{size}]"] = measure(lambda: run(None), repeat=1)
+    results[f"full_rematch_scoring_pair_cache[{size}]"] = measure(lambda: run(PairScoreCache(size * size)), repeat=1)
+
+
+def bench_embedding_throughput(results: dict, count: int = 256):
+    from app import crud
+    crud.load_embedding_model()
+    profiles = [p.profile_data for p in generate_population(count, seed=7)]
+
+    def run():
+        for profile_data in profiles:
+            crud.generate_profile_embedding(profile_data)
+
+    stats = measure(run, repeat=3)
+    stats["profiles_per_second"] = count / stats["median"]
+    results[f"generate_profile_embedding[{count}]"] = stats
+
+
+def bench_parallel_scoring(results: dict, size: int, workers: list[int], users: int = 256):
+    """
+    Per-user ranking cost for a full re-match: the in-process loop versus
+    the vectorized shared-memory pool at each worker count.
+    """
+    from app import parallel_scoring
+
+    population = list(generate_population(size, seed=9))
+    weights = matching.get_scoring_weights()
+    location_score = matching.calculate_location_score(None, None)
+    sample = population[:4]
+    serial = measure(lambda: [matching.rank_candidates(u, population, limit=10) for u in sample], repeat=1)
+    serial = {key: (value / len(sample) if key in ("min", "median", "mean") else value) for key, value in serial.items()}
+    results[f"rematch_per_user_serial[{size}]"] = serial
+
+    batch = population[:users]
+    with parallel_scoring.SharedCandidateMatrix(parallel_scoring.CandidateFeatures(population)) as matrix:
+        for count in workers:
+            parallel_scoring.shutdown_pool()
+            parallel_scoring.MATCH_SCORING_WORKERS = count
+            parallel_scoring.rank_users(matrix, batch[:1], 10, weights, location_score)  # start the pool
+            stats = measure(lambda: parallel_scoring.rank_users(matrix, batch, 10, weights, location_score), repeat=3)
+            stats = {key: (value / len(batch) if key in ("min", "median", "mean") else value) for key, value in stats.items()}
+            stats["speedup"] = serial["median"] / stats["median"]
+            results[f"rematch_per_user_pool[{size},workers={count}]"] = stats
+    parallel_scoring.shutdown_pool()
+
+
+def bench_match_feed_serialization(results: dict, count: int = 10):
+    """
+    Payload bytes and encode time of one match feed: the full profile_data
+    through FastAPI's default encoder versus the public-key projection
+    through orjson.
+    """
+    import json
+    from datetime import datetime, timezone
+    import orjson
+    from fastapi.encoders import jsonable_encoder
+    from app.crud import PUBLIC_PROFILE_FIELDS
+
+    now = datetime.now(timezone.utc)
+    profiles = list(generate_population(count, seed=5))
+    full = {"matches": [
+        {"user_id": p.user_id, "score": 0.5, "last_active": now, "profile_data": p.profile_data} for p in profiles
+    ]}
+    lean = {"matches": [
+        {"user_id": p.user_id, "score": 0.5, "last_active": now,
+         "profile_data": {field: p.profile_data.get(field) for field in PUBLIC_PROFILE_FIELDS}} for p in profiles
+    ]}
+    encoders = {
+        "full_default": lambda: json.dumps(jsonable_encoder(full)).encode(),
+        "lean_orjson": lambda: orjson.dumps(lean),
+    }
+    for name, encode in encoders.items():
+        stats = measure(encode, repeat=5, number=200)
+        stats["payload_bytes"] = len(encode())
+        results[f"match_feed_serialization[{name}]"] = stats
+
+
+def bench_refresh_user_matches(results: dict, sizes: list[int]):
+    from app import crud
+    from app.database import SessionLocal
+
+    for size in sizes:
+        db = SessionLocal()
+        try:
+            cleanup_bench_users(db)
+            user_ids = seed_bench_users(db, size)
+            results[f"refresh_user_matches[{size}]"] = measure(
+                lambda: crud.refresh_user_matches(db, user_ids[0]), repeat=3
+            )
+        finally:
+            cleanup_bench_users(db)
+            db.close()
+
+
+def bench_match_list_endpoints(results: dict, size: int = 1000):
+    from fastapi.testclient import TestClient
+    from app import crud, main
+    from app.database import SessionLocal
+    from app.models import SharedUser
+
+    db = SessionLocal()
+    try:
+        cleanup_bench_users(db)
+        user_ids = seed_bench_users(db, size)
+        crud.refresh_user_matches(db, user_ids[0])
+        for match_id in user_ids[1:4]:
+            crud.update_match_status(db, user_ids[0], match_id, "active")
+        bench_user = db.query(SharedUser).filter(SharedUser.user_id == user_ids[0]).first()
+        main.app.dependency_overrides[main.auth_dependency] = lambda: bench_user
+        client = TestClient(main.app)
+        for path in ("/api/matches/suggested", "/api/matches/active"):
+            results[f"GET {path}"] = measure(lambda: client.get(path).raise_for_status(), repeat=5, number=20)
+            response = client.get(path)
+            results[f"GET {path}"]["payload_bytes"] = len(response.content)
+            headers = {"If-None-Match": response.headers["ETag"]}
+            results[f"GET {path} (304)"] = measure(lambda: client.get(path, headers=headers), repeat=5, number=20)
+    finally:
+        main.app.dependency_overrides.clear()
+        cleanup_bench_users(db)
+        db.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run the matching benchmark suite.")
+    parser.add_argument("--sizes", type=int, nargs="+", default=DEFAULT_SIZES)
+    parser.add_argument("--database", action="store_true", help="Also run the database-backed benchmarks.")
+    parser.add_argument("--embeddings", action="store_true", help="Also benchmark embedding throughput (loads SBERT).")
+    parser.add_argument("--workers", type=int, nargs="+", help="Also benchmark the scoring pool at these worker counts.")
+    parser.add_argument("--save", action="store_true", help="Store results under benchmarks/results/.")
+    parser.add_argument("--compare", metavar="BASELINE", help="Compare against a saved results file.")
+    args = parser.parse_args()
+
+    results = {}
+    print("Benchmarking calculate_final_match_score...")
+    bench_calculate_final_match_score(results)
+    print(f"Benchmarking rank_candidates at {args.sizes}...")
+    bench_rank_candidates(results, args.sizes)
+    print("Benchmarking full re-match scoring with and without the pair cache...")
+    bench_full_rematch_scoring(results)
+    if args.workers:
+        print(f"Benchmarking the scoring pool at {args.workers} workers...")
+        bench_parallel_scoring(results, max(args.sizes), args.workers)
+    print("Benchmarking match feed serialization...")
+    bench_match_feed_serialization(results)
+    if args.embeddings:
+        print("Benchmarking embedding throughput...")
+        bench_embedding_throughput(results)
+    if args.database:
+        print(f"Benchmarking refresh_user_matches at {args.sizes}...")
+        bench_refresh_user_matches(results, args.sizes)
+        print("Benchmarking match-list endpoints...")
+        bench_match_list_endpoints(results)
+
+    print_results(results)
+    if args.save:
+        print(f"\nResults saved to {save_results(results)}")
+    if args.compare:
+        regressions = compare_results(results, args.compare)
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
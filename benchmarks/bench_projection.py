@@ -0,0 +1,108 @@
+"""
+Reports, for each PCA target dimension, how closely matching on reduced
+embeddings agrees with the full 384-dim embeddings (top-10 overlap and
+personality-pillar error) and how much faster rank_candidates gets.
+
+    python -m benchmarks.bench_projection --dims 32 64 128 --encode 2000
+    python -m benchmarks.bench_projection --database
+
+Random unit embeddings have no low-rank structure, so the embeddings are
+either real ones (--database / --population) or SBERT encodings of
+synthetic profiles (--encode, loads the model).
+"""
+import argparse
+import json
+import os
+import sys
+
+from dotenv import load_dotenv
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+load_dotenv()
+
+import numpy as np
+
+from app import matching
+from app.projection import EmbeddingProjection
+from benchmarks.harness import measure, print_results, save_results
+from benchmarks.population import SyntheticProfile, generate_population
+
+TOP_K = 10
+
+
+def load_profiles(args) -> list[SyntheticProfile]:
+    if args.database:
+        from app.crud import EMBEDDING_STORAGE, get_match_candidates
+        from app.database import SessionLocal
+        db = SessionLocal()
+        try:
+            rows = get_match_candidates(db, current_user_id="", storage=EMBEDDING_STORAGE)
+        finally:
+            db.close()
+        return [SyntheticProfile(c.user_id, c.profile_data, c.embedding) for c in rows]
+    if args.population:
+        with open(args.population) as f:
+            records = [json.loads(line) for line in f if line.strip()]
+        return [SyntheticProfile(r["user_id"], r["profile_data"], np.asarray(r["embedding"], dtype=np.float32)) for r in records]
+    from app import crud
+    crud.load_embedding_model()
+    profiles = []
+    for profile in generate_population(args.encode, seed=11):
+        embedding = np.asarray(crud.generate_profile_embedding(profile.profile_data), dtype=np.float32)
+        profiles.append(profile._replace(embedding=embedding))
+    return profiles
+
+
+def top_ids(user, population) -> list[str]:
+    others = [c for c in population if c.user_id != user.user_id]
+    return [user_id for user_id, _, _ in matching.rank_candidates(user, others, limit=TOP_K)]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark PCA-reduced embeddings against full ones.")
+    parser.add_argument("--dims", type=int, nargs="+", default=[32, 64, 128])
+    parser.add_argument("--users", type=int, default=50, help="Users whose top-10 lists are compared.")
+    parser.add_argument("--database", action="store_true", help="Use the stored profile embeddings.")
+    parser.add_argument("--population", help="Use a population JSONL written with --with-embeddings.")
+    parser.add_argument("--encode", type=int, default=2000, help="Otherwise, SBERT-encode this many synthetic profiles.")
+    parser.add_argument("--save", action="store_true", help="Store results under benchmarks/results/.")
+    args = parser.parse_args()
+
+    profiles = load_profiles(args)
+    matrix = np.stack([p.embedding for p in profiles])
+    sample = profiles[:args.users]
+    print(f"Loaded {len(profiles)} embeddings; comparing top-{TOP_K} lists for {len(sample)} users.")
+
+    results = {}
+    full = measure(lambda: matching.rank_candidates(sample[0], profiles, limit=TOP_K), repeat=3)
+    results[f"rank_candidates[{matrix.shape[1]}d]"] = full
+    reference = {user.user_id: top_ids(user, profiles) for user in sample}
+
+    for dim in args.dims:
+        # Fit on everyone but the evaluated users, as a deployed artifact would be.
+        fitted = EmbeddingProjection.fit(matrix[len(sample):], dim)
+        reduced = [p._replace(embedding=row) for p, row in zip(profiles, fitted.project(matrix))]
+        stats = measure(lambda: matching.rank_candidates(reduced[0], reduced, limit=TOP_K), repeat=3)
+        overlap = [len(set(reference[u.user_id]) & set(top_ids(u, reduced))) / TOP_K for u in reduced[:len(sample)]]
+        errors = [
+            abs(matching.calculate_personality_score(a.embedding, b.embedding)
+                - matching.calculate_personality_score(ra.embedding, rb.embedding))
+            for a, b, ra, rb in zip(sample, profiles[-len(sample):], reduced, reduced[-len(sample):])
+        ]
+        stats.update({
+            "explained_variance": fitted.explained_variance,
+            "top10_overlap": float(np.mean(overlap)),
+            "personality_abs_error": float(np.mean(errors)),
+            "speedup": full["median"] / stats["median"],
+        })
+        results[f"rank_candidates[{dim}d]"] = stats
+        print(f"{dim:>4} dims: {100 * fitted.explained_variance:5.1f}% variance, top-{TOP_K} overlap {stats['top10_overlap']:.3f}, "
+              f"personality error {stats['personality_abs_error']:.4f}, {stats['speedup']:.2f}x faster")
+
+    print_results(results)
+    if args.save:
+        print(f"\nResults saved to {save_results(results)}")
+
+
+if __name__ == "__main__":
+    main()
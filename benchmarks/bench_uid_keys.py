@@ -0,0 +1,121 @@
+"""
+String user ids vs integer uid surrogates.
+
+In memory: filtering a candidate list against a user's exclusions with a
+Python set of 32-char ids vs a UidSet over uids. With --database: index
+sizes of the string keys vs their uid counterparts and the latency of
+the matches -> profiles join on either key.
+
+    python -m benchmarks.bench_uid_keys --sizes 10000 100000
+    python -m benchmarks.bench_uid_keys --database --size 20000 --per-user 100
+
+The database part needs DATABASE_URL at the uid migration; bench rows are
+removed afterwards.
+"""
+import argparse
+import os
+import random
+import sys
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from dotenv import load_dotenv
+from sqlalchemy import text
+
+from benchmarks.harness import measure, print_results, save_results
+
+load_dotenv()
+
+EXCLUSIONS = 500
+
+INDEX_SIZE_SQL = text("""
+    SELECT coalesce(sum(pg_relation_size(relid)), 0) FROM pg_partition_tree(CAST(:index AS regclass))
+""")
+JOIN_BY_STRING_SQL = text("""
+    SELECT p.profile_data -> 'vibe_summary' FROM matches m JOIN profiles p ON p.user_id = m.match_id
+    WHERE m.user_id = :user_id AND m.status = 'suggested'
+""")
+JOIN_BY_UID_SQL = text("""
+    SELECT p.profile_data -> 'vibe_summary' FROM matches m JOIN profiles p ON p.uid = m.match_uid
+    WHERE m.user_id = :user_id AND m.status = 'suggested'
+""")
+FULL_JOIN_BY_STRING_SQL = text("SELECT count(*) FROM matches m JOIN profiles p ON p.user_id = m.match_id WHERE m.user_id LIKE 'bench%'")
+FULL_JOIN_BY_UID_SQL = text("SELECT count(*) FROM matches m JOIN profiles p ON p.uid = m.match_uid WHERE m.user_id LIKE 'bench%'")
+
+
+def bench_exclusion_filter(results: dict, sizes: list[int]):
+    from app.crud import CandidateProfile, exclude_candidates
+    from app.uidset import UidSet
+    for size in sizes:
+        candidates = [CandidateProfile(f"{i:032x}", None, None, 1, i) for i in range(size)]
+        excluded = random.Random(size).sample(range(size), min(EXCLUSIONS, size))
+        excluded_ids = {f"{i:032x}" for i in excluded}
+        excluded_uids = UidSet(excluded)
+        results[f"exclusion_filter[str,{size}]"] = measure(
+            lambda: [c for c in candidates if c.user_id not in excluded_ids], repeat=5)
+        results[f"exclusion_filter[uid,{size}]"] = measure(
+            lambda: exclude_candidates(candidates, excluded_uids), repeat=5)
+        string_bytes = sys.getsizeof(excluded_ids) + sum(sys.getsizeof(i) for i in excluded_ids)
+        print(f"{size} candidates, {len(excluded)} exclusions: string set {string_bytes} B, UidSet {excluded_uids.nbytes()} B")
+
+
+def bench_database(results: dict, size: int, per_user: int):
+    from app.database import SessionLocal, engine
+    from benchmarks.bench_matches_table import SEED_MATCHES_SQL
+    from benchmarks.db import BENCH_PREFIX, cleanup_bench_users, seed_bench_users
+
+    db = SessionLocal()
+    try:
+        cleanup_bench_users(db)
+        user_ids = seed_bench_users(db, size)
+        count = len(user_ids)
+        stride = max(1, (count - 1) // per_user)
+        db.execute(SEED_MATCHES_SQL, {"prefix": BENCH_PREFIX, "count": count, "stride": stride,
+                                      "per_user": min(per_user, count - 1), "start": 0, "stop": count})
+        db.commit()
+        with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as connection:
+            connection.execute(text("VACUUM ANALYZE matches"))
+            connection.execute(text("VACUUM ANALYZE profiles"))
+            # Integer twin of unique_match_pair, only for the size comparison.
+            connection.execute(text("CREATE INDEX IF NOT EXISTS bench_ix_matches_uid_pair ON matches (uid, match_uid)"))
+        try:
+            index_sizes = {name: int(db.execute(INDEX_SIZE_SQL, {"index": name}).scalar()) for name in (
+                "profiles_pkey", "profiles_uid_key", "unique_match_pair", "bench_ix_matches_uid_pair",
+            )}
+        finally:
+            with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as connection:
+                connection.execute(text("DROP INDEX IF EXISTS bench_ix_matches_uid_pair"))
+        print("Index sizes (bytes):", index_sizes)
+        results["index_sizes"] = index_sizes
+
+        picks = iter(random.choices(user_ids, k=10000))
+        results["feed_join[user_id]"] = measure(lambda: db.execute(JOIN_BY_STRING_SQL, {"user_id": next(picks)}).all(), repeat=5, number=50)
+        results["feed_join[uid]"] = measure(lambda: db.execute(JOIN_BY_UID_SQL, {"user_id": next(picks)}).all(), repeat=5, number=50)
+        results["full_join[user_id]"] = measure(lambda: db.execute(FULL_JOIN_BY_STRING_SQL).scalar(), repeat=3)
+        results["full_join[uid]"] = measure(lambda: db.execute(FULL_JOIN_BY_UID_SQL).scalar(), repeat=3)
+        db.rollback()
+    finally:
+        cleanup_bench_users(db)
+        db.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark string ids vs integer uid keys.")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10000, 100000])
+    parser.add_argument("--database", action="store_true", help="Also measure index sizes and join latency.")
+    parser.add_argument("--size", type=int, default=20000, help="Bench users for --database.")
+    parser.add_argument("--per-user", type=int, default=100, help="Match rows per bench user for --database.")
+    parser.add_argument("--save", action="store_true", help="Store results under benchmarks/results/.")
+    args = parser.parse_args()
+
+    results = {}
+    bench_exclusion_filter(results, args.sizes)
+    if args.database:
+        bench_database(results, args.size, args.per_user)
+    print_results(results)
+    if args.save:
+        print(f"\nResults saved to {save_results(results)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,51 @@
+"""Helpers for benchmarks that need bench rows in the DATABASE_URL database."""
+from sqlalchemy import insert, text
+
+from benchmarks.population import generate_population
+
+BENCH_PREFIX = "bench"
+INSERT_BATCH_SIZE = 5000
+
+
+def seed_bench_users(db, size: int, seed: int | None = None) -> list[str]:
+    """
+    Inserts `size + 1` synthetic users with profiles and embeddings (in every
+    storage format) under the 'bench' id prefix. Returns their ids; the
+    first one is meant to be the user being matched.
+    """
+    from app.crud import embedding_columns
+    from app.models import SharedUser, AppUser, Profile
+
+    def flush(users, profiles):
+        db.execute(insert(SharedUser), users)
+        db.execute(insert(AppUser), [{"user_id": u["user_id"]} for u in users])
+        db.execute(insert(Profile), profiles)
+
+    user_ids = []
+    batch_users, batch_profiles = [], []
+    for index, profile in enumerate(generate_population(size + 1, seed=size if seed is None else seed)):
+        user_id = f"{BENCH_PREFIX}{index:027x}"
+        user_ids.append(user_id)
+        batch_users.append({"user_id": user_id, "mobile_number": f"+0{index:014d}", "name": f"Bench {index}"})
+        batch_profiles.append({
+            "user_id": user_id,
+            "profile_data": profile.profile_data,
+            **embedding_columns(profile.embedding, storage="dual"),
+        })
+        if len(batch_users) == INSERT_BATCH_SIZE:
+            flush(batch_users, batch_profiles)
+            batch_users, batch_profiles = [], []
+    if batch_users:
+        flush(batch_users, batch_profiles)
+    db.commit()
+    return user_ids
+
+
+def cleanup_bench_users(db):
+    """Deletes every row created by seed_bench_users (and matches they own)."""
+    db.execute(text("DELETE FROM matches WHERE user_id LIKE :prefix OR match_id LIKE :prefix"), {"prefix": f"{BENCH_PREFIX}%"})
+    db.execute(text("DELETE FROM match_exclusions WHERE user_id LIKE :prefix"), {"prefix": f"{BENCH_PREFIX}%"})
+    db.execute(text("DELETE FROM match_refresh_requests WHERE user_id LIKE :prefix"), {"prefix": f"{BENCH_PREFIX}%"})
+    for table in ("profiles", "app_users", "users"):
+        db.execute(text(f"DELETE FROM {table} WHERE user_id LIKE :prefix"), {"prefix": f"{BENCH_PREFIX}%"})
+    db.commit()
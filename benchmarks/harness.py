@@ -0,0 +1,83 @@
+import json
+import os
+import platform
+import statistics
+import subprocess
+import time
+from datetime import datetime, timezone
+
+RESULTS_DIR = os.path.join(os.path.dirname(__file__), "results")
+REGRESSION_THRESHOLD = 1.10
+
+
+def measure(func, repeat: int = 5, number: int = 1) -> dict:
+    """
+    Times `func` `repeat` times, calling it `number` times per sample, and
+    returns per-call statistics in seconds.
+    """
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for _ in range(number):
+            func()
+        samples.append((time.perf_counter() - start) / number)
+    return {
+        "min": min(samples),
+        "median": statistics.median(samples),
+        "mean": statistics.fmean(samples),
+        "repeat": repeat,
+        "number": number,
+    }
+
+
+def _git_commit() -> str | None:
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], text=True).strip()
+    except Exception:
+        return None
+
+
+def save_results(results: dict, path: str | None = None) -> str:
+    """Writes a results dict with machine/commit metadata and returns the path."""
+    commit = _git_commit()
+    stamp = datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%SZ")
+    if path is None:
+        os.makedirs(RESULTS_DIR, exist_ok=True)
+        path = os.path.join(RESULTS_DIR, f"{stamp}-{commit or 'nogit'}.json")
+    payload = {
+        "commit": commit,
+        "timestamp": stamp,
+        "machine": {"python": platform.python_version(), "platform": platform.platform(), "cpus": os.cpu_count()},
+        "benchmarks": results,
+    }
+    with open(path, "w") as f:
+        json.dump(payload, f, indent=2)
+    return path
+
+
+def compare_results(results: dict, baseline_path: str, threshold: float = REGRESSION_THRESHOLD) -> list[str]:
+    """
+    Compares median timings against a saved baseline and prints a table.
+    Returns the names of benchmarks that got slower than `threshold`x.
+    """
+    with open(baseline_path) as f:
+        baseline = json.load(f)["benchmarks"]
+    regressions = []
+    print(f"\n{'benchmark':<50} {'baseline':>12} {'current':>12} {'ratio':>8}")
+    for name, stats in results.items():
+        if name not in baseline or "median" not in stats:
+            continue
+        ratio = stats["median"] / baseline[name]["median"]
+        flag = ""
+        if ratio > threshold:
+            regressions.append(name)
+            flag = "  <-- REGRESSION"
+        print(f"{name:<50} {baseline[name]['median']:>12.6f} {stats['median']:>12.6f} {ratio:>8.2f}{flag}")
+    return regressions
+
+
+def print_results(results: dict):
+    print(f"\n{'benchmark':<50} {'min (s)':>12} {'median (s)':>12}")
+    for name, stats in results.items():
+        if "median" in stats:
+            print(f"{name:<50} {stats['min']:>12.6f} {stats['median']:>12.6f}")
@@ -0,0 +1,111 @@
+import argparse
+import json
+import random
+from collections import namedtuple
+
+import numpy as np
+
+EMBEDDING_DIM = 384
+
+# Mirrors the canonical taxonomy seeded by app/seed_db.py so the generator
+# works without a database connection.
+DEFAULT_TAXONOMY = [
+    (1, "Technology"),
+    (2, "Artificial Intelligence"),
+    (3, "Sports"),
+    (4, "Formula 1"),
+    (5, "Reading"),
+    (6, "Books"),
+    (7, "Movies & TV"),
+    (8, "Hiking"),
+    (9, "Travel"),
+    (10, "Food & Drink"),
+    (11, "Music"),
+    (12, "Gaming"),
+    (13, "Photography"),
+    (14, "Arts & Culture"),
+]
+
+DAYS = ["Monday", "Tuesday", "Wednesday", "Thursday", "Friday", "Saturday", "Sunday"]
+TIME_SLOTS = ["Morning", "Afternoon", "Evening", "Night"]
+PERSONALITY_TRAITS = ["Introverted", "Extroverted", "Analytical", "Creative", "Spontaneous", "Organized", "Adventurous", "Homebody", "Humorous", "Serious"]
+SOCIAL_GOALS = ["Mentorship", "Friendship", "Professional Networking", "Finding a collaborator", "Casual chats"]
+MEETING_STYLES = ["in-person", "virtual", "either"]
+
+SyntheticProfile = namedtuple("SyntheticProfile", ["user_id", "profile_data", "embedding"])
+
+
+def load_taxonomy(db=None) -> list[tuple[int, str]]:
+    """
+    Returns the interest taxonomy as (id, name) pairs. Reads the
+    InterestTaxonomy table when a session is given, otherwise falls back to
+    the seeded defaults.
+    """
+    if db is None:
+        return list(DEFAULT_TAXONOMY)
+    from app.models import InterestTaxonomy
+    rows = db.query(InterestTaxonomy).order_by(InterestTaxonomy.id).all()
+    return [(row.id, row.name) for row in rows] or list(DEFAULT_TAXONOMY)
+
+
+def random_unit_embedding(rng: np.random.Generator, dim: int = EMBEDDING_DIM) -> np.ndarray:
+    """Draws a random vector uniformly on the unit sphere."""
+    vector = rng.standard_normal(dim).astype(np.float32)
+    return vector / np.linalg.norm(vector)
+
+
+def generate_profile_data(rng: random.Random, taxonomy: list[tuple[int, str]]) -> dict:
+    """Builds one profile_data dict in the shape saved by the onboarding chat."""
+    picked = rng.sample(taxonomy, rng.randint(2, min(5, len(taxonomy))))
+    personality = rng.choice(PERSONALITY_TRAITS)
+    goal = rng.choice(SOCIAL_GOALS)
+    interests = [name for _, name in picked]
+    return {
+        "interests": interests,
+        "interest_ids": [interest_id for interest_id, _ in picked],
+        "availability": {
+            "days": rng.sample(DAYS, rng.randint(1, 4)),
+            "time_slots": rng.sample(TIME_SLOTS, rng.randint(1, 2)),
+        },
+        "vibe_summary": f"I'm {personality.lower()} and love talking about {interests[0]} over coffee.",
+        "meeting_style": rng.choice(MEETING_STYLES),
+        "social_intent": goal,
+        "personality_type": personality,
+        "conversation_topics": interests[:2],
+        "preferred_locations": [],
+    }
+
+
+def generate_population(count: int, seed: int = 42, taxonomy=None, dim: int = EMBEDDING_DIM):
+    """
+    Yields `count` synthetic profiles with random unit embeddings. The same
+    seed always produces the same population.
+    """
+    taxonomy = taxonomy or list(DEFAULT_TAXONOMY)
+    rng = random.Random(seed)
+    np_rng = np.random.default_rng(seed)
+    for _ in range(count):
+        user_id = "%032x" % rng.getrandbits(128)
+        yield SyntheticProfile(user_id, generate_profile_data(rng, taxonomy), random_unit_embedding(np_rng, dim))
+
+
+def write_population(path: str, count: int, seed: int = 42, with_embeddings: bool = False):
+    """Streams a population to a JSONL file, one profile per line."""
+    with open(path, "w") as f:
+        for profile in generate_population(count, seed=seed):
+            record = {"user_id": profile.user_id, "profile_data": profile.profile_data}
+            if with_embeddings:
+                record["embedding"] = profile.embedding.tolist()
+            f.write(json.dumps(record) + "\n")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Generate an offline synthetic population.")
+    parser.add_argument("--count", type=int, default=1000)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", default="synthetic_population.jsonl")
+    parser.add_argument("--with-embeddings", action="store_true")
+    args = parser.parse_args()
+
+    write_population(args.output, args.count, seed=args.seed, with_embeddings=args.with_embeddings)
+    print(f"Wrote {args.count} profiles to {args.output}")
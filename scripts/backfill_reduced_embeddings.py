@@ -0,0 +1,60 @@
+import argparse
+import os
+import sys
+import time
+from dotenv import load_dotenv
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+load_dotenv()
+from sqlalchemy import or_
+from app.database import SessionLocal
+from app.models import Profile
+from app.crud import embedding_column, scoring_view
+from app.projection import get_active_projection
+
+BATCH_SIZE = 500
+
+def backfill_reduced_embeddings(batch_size: int = BATCH_SIZE, pause: float = 0.0):
+    """
+    Writes the active projection's reduced embedding for every profile that
+    has a full embedding but no reduced one from this projection version.
+    Runs in small committed batches and is safe to stop and resume. Each
+    profile's version is bumped so cached pair scores are not reused.
+    """
+    active = get_active_projection()
+    if active is None:
+        print("ERROR: set EMBEDDING_PROJECTION_PATH to the projection artifact to backfill.")
+        return
+    full_column = embedding_column()
+    db = SessionLocal()
+    print(f"--- Backfilling reduced embeddings with {active.version} ({active.input_dim} -> {active.dim} dims) ---")
+    try:
+        updated = 0
+        while True:
+            rows = db.query(Profile).filter(
+                full_column.is_not(None),
+                or_(Profile.embedding_projection.is_(None), Profile.embedding_projection != active.version)
+            ).order_by(Profile.user_id).limit(batch_size).with_for_update(skip_locked=True).all()
+            if not rows:
+                break
+            for row in rows:
+                row.embedding_reduced = scoring_view(row, storage="reduced").embedding
+                row.embedding_projection = active.version
+                row.version = (row.version or 0) + 1
+            db.commit()
+            updated += len(rows)
+            print(f"   -> {updated} profiles projected")
+            if pause:
+                time.sleep(pause)
+        print(f"\n SUCCESS: {updated} profiles now carry {active.version} embeddings.")
+    except Exception as e:
+        print(f"\n An error occurred: {e}")
+        db.rollback()
+    finally:
+        db.close()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Backfill PCA-reduced embeddings for the active projection.")
+    parser.add_argument("--batch-size", type=int, default=BATCH_SIZE)
+    parser.add_argument("--pause", type=float, default=0.0, help="Seconds to sleep between batches.")
+    args = parser.parse_args()
+    backfill_reduced_embeddings(batch_size=args.batch_size, pause=args.pause)
@@ -0,0 +1,105 @@
+import argparse
+import os
+import sys
+import time
+from dotenv import load_dotenv
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+load_dotenv()
+from sqlalchemy import text
+from sqlalchemy.exc import OperationalError
+from app.database import SessionLocal
+
+RETENTION_DAYS = 30
+BATCH_SIZE = 1000
+LOCK_TIMEOUT = "2s"
+
+PARTITIONS_SQL = text("""
+    SELECT c.relname FROM pg_inherits i
+    JOIN pg_class c ON c.oid = i.inhrelid
+    WHERE i.inhparent = 'matches'::regclass
+    ORDER BY c.relname
+""")
+
+# One short transaction per batch: delete old passes from one partition and
+# merge their uids into each owner's exclusion array.
+COMPACT_BATCH_SQL = """
+    WITH moved AS (
+        DELETE FROM {partition}
+        WHERE ctid IN (
+            SELECT ctid FROM {partition}
+            WHERE status = 'passed' AND updated_at < now() - make_interval(days => :retention_days)
+            LIMIT :batch_size
+            FOR UPDATE SKIP LOCKED
+        )
+        RETURNING user_id, match_uid
+    ), grouped AS (
+        -- A pass on a user without an app_users row has no uid and can never be a candidate.
+        SELECT user_id, array_agg(DISTINCT match_uid) AS match_uids FROM moved
+        WHERE match_uid IS NOT NULL GROUP BY user_id
+    ), merged AS (
+        INSERT INTO match_exclusions (user_id, match_uids)
+        SELECT user_id, match_uids FROM grouped
+        ON CONFLICT (user_id) DO UPDATE
+        SET match_uids = ARRAY(SELECT DISTINCT unnest(match_exclusions.match_uids || EXCLUDED.match_uids)),
+            updated_at = now()
+    )
+    SELECT count(*) FROM moved
+"""
+
+def compact_passed_matches(retention_days: int = RETENTION_DAYS, batch_size: int = BATCH_SIZE, pause: float = 0.0):
+    """
+    Moves 'passed' match rows older than `retention_days` into the per-user
+    match_exclusions arrays, partition by partition, in small batches.
+
+    Rows locked by a running refresh are skipped (SKIP LOCKED) and a batch
+    that cannot get its locks within LOCK_TIMEOUT is retried later, so the
+    job never queues behind user traffic. It can be stopped and resumed at
+    any point. Blocked and active rows are never touched.
+    """
+    db = SessionLocal()
+    print(f"--- Compacting passed matches older than {retention_days} days ---")
+    total = 0
+    start = time.perf_counter()
+    try:
+        partitions = [row[0] for row in db.execute(PARTITIONS_SQL)]
+        for partition in partitions:
+            moved, timeouts = 0, 0
+            while True:
+                try:
+                    db.execute(text(f"SET LOCAL lock_timeout = '{LOCK_TIMEOUT}'"))
+                    count = db.execute(text(COMPACT_BATCH_SQL.format(partition=partition)), {
+                        "retention_days": retention_days,
+                        "batch_size": batch_size,
+                    }).scalar()
+                    db.commit()
+                except OperationalError as e:
+                    db.rollback()
+                    timeouts += 1
+                    if timeouts > 3:
+                        print(f"   {partition}: giving up after repeated lock timeouts ({e.orig})")
+                        break
+                    time.sleep(1.0)
+                    continue
+                if not count:
+                    break
+                moved += count
+                if pause:
+                    time.sleep(pause)
+            total += moved
+            print(f"   {partition}: {moved} rows compacted")
+        elapsed = time.perf_counter() - start
+        print(f"\n SUCCESS: {total} passed rows compacted in {elapsed:.1f}s.")
+    except Exception as e:
+        print(f"\n An error occurred: {e}")
+        db.rollback()
+    finally:
+        db.close()
+    return total
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compact old 'passed' matches into per-user exclusion arrays.")
+    parser.add_argument("--retention-days", type=int, default=RETENTION_DAYS)
+    parser.add_argument("--batch-size", type=int, default=BATCH_SIZE)
+    parser.add_argument("--pause", type=float, default=0.0, help="Seconds to sleep between batches.")
+    args = parser.parse_args()
+    compact_passed_matches(args.retention_days, args.batch_size, args.pause)
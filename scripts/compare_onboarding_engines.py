@@ -0,0 +1,74 @@
+import argparse
+import os
+import statistics
+import sys
+import time
+from dotenv import load_dotenv
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+load_dotenv()
+from openai import OpenAI
+from app import metrics, onboarding
+from app.database import SessionLocal
+from app.models import SharedUser
+from scripts.fake_openai_server import FakeOpenAIConfig, start_fake_server
+
+MESSAGES = [
+    "Hi! I'm new here.",
+    "I love hiking and reading sci-fi.",
+    "Mostly weekends, mornings work best.",
+    "I'd like to find people to chat about tech with.",
+]
+
+def _percentile(samples: list[float], pct: float) -> float:
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))]
+
+def compare_engines(user_id: str, conversations: int, config: FakeOpenAIConfig):
+    """
+    Runs the same scripted conversations through the Assistants and the Chat
+    Completions onboarding engines against a local fake OpenAI server and
+    prints per-turn latency for each.
+    """
+    server, base_url = start_fake_server(config=config)
+    client = OpenAI(api_key="fake", base_url=base_url)
+    db = SessionLocal()
+    user = db.query(SharedUser).filter(SharedUser.user_id == user_id).first()
+    if user is None:
+        print(f"ERROR: user {user_id} not found in the 'users' table.")
+        return
+    print(f"--- Comparing onboarding engines ({conversations} conversations x {len(MESSAGES)} turns) ---")
+    print(f"Fake API: {config.latency_ms:.0f} ms network, {config.run_seconds}s per run, {config.completion_seconds}s per completion\n")
+    try:
+        results = {}
+        for engine in ("assistants", "completions"):
+            samples, round_trips = [], []
+            for _ in range(conversations):
+                thread_id = None
+                for message in MESSAGES:
+                    timer = metrics.ChatTurnTimer()
+                    start = time.perf_counter()
+                    if engine == "assistants":
+                        reply = onboarding.run_assistants_turn(client, db, user, message, thread_id, "asst_fake", timer)
+                    else:
+                        reply = onboarding.run_completions_turn(client, db, user, message, thread_id, timer)
+                    samples.append(time.perf_counter() - start)
+                    round_trips.append(timer.polls)
+                    thread_id = reply["thread_id"]
+            results[engine] = samples
+            print(f"{engine:<12} p50 {statistics.median(samples):6.2f}s   p95 {_percentile(samples, 95):6.2f}s   "
+                  f"mean {statistics.fmean(samples):6.2f}s   polls/round trips per turn {statistics.fmean(round_trips):.1f}")
+        speedup = statistics.median(results["assistants"]) / statistics.median(results["completions"])
+        print(f"\nMedian turn latency: completions engine is {speedup:.1f}x faster.")
+    finally:
+        db.close()
+        server.shutdown()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compare onboarding engine latency against a fake OpenAI server.")
+    parser.add_argument("--user-id", default=os.environ.get("DEV_USER_ID"), help="Existing user to run the conversations as.")
+    parser.add_argument("--conversations", type=int, default=3)
+    parser.add_argument("--latency-ms", type=float, default=50)
+    parser.add_argument("--run-seconds", type=float, default=1.5)
+    parser.add_argument("--completion-seconds", type=float, default=0.8)
+    args = parser.parse_args()
+    compare_engines(args.user_id, args.conversations, FakeOpenAIConfig(args.latency_ms, args.run_seconds, args.completion_seconds))
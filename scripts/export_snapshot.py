@@ -0,0 +1,31 @@
+import argparse
+import os
+import sys
+from dotenv import load_dotenv
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+load_dotenv()
+from app.database import SessionLocal
+from app.snapshots import SNAPSHOT_DIR, export_snapshot
+
+def main(root: str, delta: bool, storage: str | None):
+    """
+    Writes a full columnar snapshot of every profile with an embedding, or
+    (--delta) only the profiles updated since the newest snapshot in `root`.
+    """
+    db = SessionLocal()
+    try:
+        manifest = export_snapshot(db, root, delta=delta, storage=storage)
+        print(f"Wrote {manifest['kind']} snapshot {manifest['id']}: {manifest['rows']} rows, "
+              f"{manifest['dim']} dims, high-water mark {manifest['high_water_mark']}")
+    except Exception as e:
+        print(f"\n An error occurred: {e}")
+    finally:
+        db.close()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Export profiles and embeddings to a memory-mappable snapshot.")
+    parser.add_argument("--dir", default=SNAPSHOT_DIR)
+    parser.add_argument("--delta", action="store_true", help="Only export profiles changed since the newest snapshot.")
+    parser.add_argument("--storage", choices=["float32", "dual", "halfvec", "reduced"], help="Embedding column (default: the scored one).")
+    args = parser.parse_args()
+    main(args.dir, args.delta, args.storage)
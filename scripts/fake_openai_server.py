@@ -0,0 +1,164 @@
+"""
+A minimal local stand-in for the OpenAI HTTP API, for latency comparisons
+and load tests without touching the real service. It implements just
+enough of the Assistants (threads/messages/runs) and Chat Completions
+endpoints for the code in this repo.
+
+    python -m scripts.fake_openai_server --port 8089 --latency-ms 80
+    OPENAI_BASE_URL=http://127.0.0.1:8089/v1 uvicorn app.main:app
+"""
+import argparse
+import json
+import os
+import random
+import re
+import sys
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from benchmarks.population import DEFAULT_TAXONOMY, generate_profile_data
+
+
+class FakeOpenAIConfig:
+    def __init__(self, latency_ms: float = 50, run_seconds: float = 1.5, completion_seconds: float = 0.8,
+                 error_rate: float = 0.0, rate_limit: int = 500):
+        self.latency_ms = latency_ms
+        self.run_seconds = run_seconds
+        self.completion_seconds = completion_seconds
+        self.error_rate = error_rate
+        self.rate_limit = rate_limit
+
+
+class FakeOpenAIHandler(BaseHTTPRequestHandler):
+    config = FakeOpenAIConfig()
+    runs = {}
+    messages = {}
+    lock = threading.Lock()
+    request_count = 0
+
+    def log_message(self, format, *args):
+        pass
+
+    def _read_body(self) -> dict:
+        length = int(self.headers.get("Content-Length") or 0)
+        return json.loads(self.rfile.read(length) or b"{}") if length else {}
+
+    def _send(self, status: int, payload: dict):
+        body = json.dumps(payload).encode()
+        with FakeOpenAIHandler.lock:
+            FakeOpenAIHandler.request_count += 1
+            remaining = max(0, self.config.rate_limit - FakeOpenAIHandler.request_count % self.config.rate_limit)
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.send_header("x-ratelimit-limit-requests", str(self.config.rate_limit))
+        self.send_header("x-ratelimit-remaining-requests", str(remaining))
+        self.send_header("x-ratelimit-reset-requests", "1s")
+        if status == 429:
+            self.send_header("retry-after", "1")
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _simulate_network(self) -> bool:
+        time.sleep(self.config.latency_ms / 1000)
+        if self.config.error_rate and random.random() < self.config.error_rate:
+            self._send(429, {"error": {"message": "Rate limit reached (fake)", "type": "requests", "code": "rate_limit_exceeded"}})
+            return False
+        return True
+
+    def _message(self, thread_id: str, role: str, text: str) -> dict:
+        return {
+            "id": f"msg_{uuid.uuid4().hex[:24]}", "object": "thread.message", "created_at": int(time.time()),
+            "thread_id": thread_id, "role": role, "status": "completed", "attachments": [], "metadata": {},
+            "content": [{"type": "text", "text": {"value": text, "annotations": []}}],
+        }
+
+    def _run(self, run: dict) -> dict:
+        elapsed = time.time() - run["created_at"]
+        status = "completed" if elapsed >= self.config.run_seconds else ("in_progress" if elapsed > 0.1 else "queued")
+        if status == "completed" and not run["answered"]:
+            run["answered"] = True
+            self.messages.setdefault(run["thread_id"], []).insert(0, self._message(run["thread_id"], "assistant", "Nice to meet you! What do you do for fun?"))
+        return {
+            "id": run["id"], "object": "thread.run", "created_at": int(run["created_at"]), "thread_id": run["thread_id"],
+            "assistant_id": run["assistant_id"], "status": status, "required_action": None, "instructions": "",
+            "model": "fake", "tools": [], "metadata": {}, "parallel_tool_calls": True,
+        }
+
+    def do_POST(self):
+        if not self._simulate_network():
+            return
+        body = self._read_body()
+        path = self.path.split("?")[0]
+        if path.endswith("/chat/completions"):
+            time.sleep(self.config.completion_seconds)
+            if (body.get("response_format") or {}).get("type") == "json_object":
+                content = json.dumps(generate_profile_data(random.Random(), list(DEFAULT_TAXONOMY)))
+            else:
+                content = "Nice to meet you! What do you do for fun?"
+            return self._send(200, {
+                "id": f"chatcmpl-{uuid.uuid4().hex[:24]}", "object": "chat.completion", "created": int(time.time()),
+                "model": body.get("model", "fake"),
+                "choices": [{"index": 0, "finish_reason": "stop", "message": {"role": "assistant", "content": content}}],
+                "usage": {"prompt_tokens": 100, "completion_tokens": 20, "total_tokens": 120},
+            })
+        if path.endswith("/threads"):
+            return self._send(200, {"id": f"thread_{uuid.uuid4().hex[:24]}", "object": "thread", "created_at": int(time.time()), "metadata": {}})
+        match = re.search(r"/threads/([^/]+)/messages$", path)
+        if match:
+            message = self._message(match.group(1), body.get("role", "user"), body.get("content", ""))
+            self.messages.setdefault(match.group(1), []).insert(0, message)
+            return self._send(200, message)
+        match = re.search(r"/threads/([^/]+)/runs$", path)
+        if match:
+            run = {"id": f"run_{uuid.uuid4().hex[:24]}", "thread_id": match.group(1), "assistant_id": body.get("assistant_id"),
+                   "created_at": time.time(), "answered": False}
+            self.runs[run["id"]] = run
+            return self._send(200, self._run(run))
+        self._send(404, {"error": {"message": f"Unknown route {path}"}})
+
+    def do_GET(self):
+        if not self._simulate_network():
+            return
+        path = self.path.split("?")[0]
+        match = re.search(r"/threads/([^/]+)/runs/([^/]+)$", path)
+        if match and match.group(2) in self.runs:
+            return self._send(200, self._run(self.runs[match.group(2)]))
+        match = re.search(r"/threads/([^/]+)/messages$", path)
+        if match:
+            data = self.messages.get(match.group(1), [])
+            return self._send(200, {"object": "list", "data": data, "has_more": False,
+                                    "first_id": data[0]["id"] if data else None, "last_id": data[-1]["id"] if data else None})
+        self._send(404, {"error": {"message": f"Unknown route {path}"}})
+
+
+def start_fake_server(port: int = 0, config: FakeOpenAIConfig | None = None):
+    """Starts the fake server on a background thread; returns (server, base_url)."""
+    FakeOpenAIHandler.config = config or FakeOpenAIConfig()
+    server = ThreadingHTTPServer(("127.0.0.1", port), FakeOpenAIHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}/v1"
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run a fake OpenAI API server.")
+    parser.add_argument("--port", type=int, default=8089)
+    parser.add_argument("--latency-ms", type=float, default=50)
+    parser.add_argument("--run-seconds", type=float, default=1.5, help="Time an Assistants run takes to complete.")
+    parser.add_argument("--completion-seconds", type=float, default=0.8, help="Generation time per chat completion.")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Fraction of requests answered with 429.")
+    parser.add_argument("--rate-limit", type=int, default=500)
+    args = parser.parse_args()
+
+    server, base_url = start_fake_server(args.port, FakeOpenAIConfig(
+        args.latency_ms, args.run_seconds, args.completion_seconds, args.error_rate, args.rate_limit
+    ))
+    print(f"Fake OpenAI API listening on {base_url}")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        server.shutdown()
@@ -0,0 +1,60 @@
+import argparse
+import json
+import os
+import sys
+from dotenv import load_dotenv
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+load_dotenv()
+import numpy as np
+from app.projection import EmbeddingProjection
+
+DEFAULT_OUTPUT_DIR = "artifacts/projections"
+
+def load_embeddings(population: str | None = None, sample: int = 0, seed: int = 42) -> np.ndarray:
+    """
+    Loads the training matrix: every stored profile embedding, or the
+    embeddings of a population JSONL written with --with-embeddings.
+    """
+    if population:
+        with open(population) as f:
+            vectors = [json.loads(line)["embedding"] for line in f if line.strip()]
+    else:
+        from app.crud import EMBEDDING_STORAGE, get_match_candidates
+        from app.database import SessionLocal
+        db = SessionLocal()
+        try:
+            vectors = [c.embedding for c in get_match_candidates(db, current_user_id="", storage=EMBEDDING_STORAGE)]
+        finally:
+            db.close()
+    matrix = np.asarray(vectors, dtype=np.float32)
+    if sample and len(matrix) > sample:
+        matrix = matrix[np.random.default_rng(seed).choice(len(matrix), sample, replace=False)]
+    return matrix
+
+def fit_projections(dims: list[int], output_dir: str, population: str | None = None, sample: int = 0):
+    """
+    Fits one projection per target dimension and writes each as a versioned
+    artifact (pca<dim>-<timestamp>.npz). Point EMBEDDING_PROJECTION_PATH at
+    the one to deploy, then run scripts/backfill_reduced_embeddings.py.
+    """
+    print("--- Fitting embedding projections ---")
+    matrix = load_embeddings(population, sample)
+    if len(matrix) < max(dims):
+        print(f"ERROR: need at least {max(dims)} embeddings to fit, found {len(matrix)}.")
+        return
+    print(f"Training on {len(matrix)} embeddings of dimension {matrix.shape[1]}.")
+    os.makedirs(output_dir, exist_ok=True)
+    for dim in dims:
+        fitted = EmbeddingProjection.fit(matrix, dim)
+        path = os.path.join(output_dir, f"{fitted.version}.npz")
+        fitted.save(path)
+        print(f"  {dim:>4} dims: {100 * fitted.explained_variance:5.1f}% of variance -> {path}")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Fit PCA projections over profile embeddings.")
+    parser.add_argument("--dims", type=int, nargs="+", default=[64, 128])
+    parser.add_argument("--output-dir", default=DEFAULT_OUTPUT_DIR)
+    parser.add_argument("--population", help="Fit on a population JSONL instead of the database.")
+    parser.add_argument("--sample", type=int, default=0, help="Fit on a random sample of this many embeddings.")
+    args = parser.parse_args()
+    fit_projections(args.dims, args.output_dir, args.population, args.sample)
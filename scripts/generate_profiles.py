@@ -1,14 +1,24 @@
-import os
+import argparse
+import asyncio
 import json
+import os
 import random
-from openai import OpenAI
+import sys
+import time
+from openai import AsyncOpenAI, APIConnectionError, APITimeoutError, InternalServerError, RateLimitError
 from dotenv import load_dotenv
 
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 load_dotenv()
 
 NUM_PROFILES_TO_GENERATE = 50
-OUTPUT_FILE = "synthetic_profiles.json"
+OUTPUT_FILE = "synthetic_profiles.jsonl"
 MODEL_TO_USE = "gpt-3.5-turbo-0125"
+CONCURRENCY = 8
+REQUESTS_PER_SECOND = 5.0
+MAX_ATTEMPTS = 5
+BACKOFF_BASE_SECONDS = 1.0
+BACKOFF_MAX_SECONDS = 30.0
 
 INTEREST_CATEGORIES = ["Technology", "Arts & Culture", "Sports & Fitness", "Travel", "Food & Drink", "Reading", "Gaming", "Music", "Outdoor Activities"]
 PERSONALITY_TRAITS = ["Introverted", "Extroverted", "Analytical", "Creative", "Spontaneous", "Organized", "Adventurous", "Homebody", "Humorous", "Serious"]
@@ -23,7 +33,7 @@ The user profile MUST be ONLY a single, valid JSON object that strictly adheres
 **REQUIRED JSON SCHEMA:**
 {
   "interests": ["string", "string", "string"],
-  "availability": {"days": ["string"], "time_windows": ["string"]},
+  "availability": {"days": ["string"], "time_slots": ["string"]},
   "vibe_summary": "string",
   "meeting_style": "string",
   "social_intent": "string",
@@ -39,25 +49,108 @@ The user profile MUST be ONLY a single, valid JSON object that strictly adheres
 - Keep `preferred_locations` as an empty array `[]`.
 """
 
-def generate_synthetic_profiles():
+REQUIRED_FIELDS = {
+    "interests": list,
+    "availability": dict,
+    "vibe_summary": str,
+    "meeting_style": str,
+    "social_intent": str,
+    "personality_type": str,
+    "conversation_topics": list,
+}
+MEETING_STYLES = {"in-person", "virtual", "either"}
+
+RETRYABLE_ERRORS = (RateLimitError, APIConnectionError, APITimeoutError, InternalServerError)
+
+
+class InvalidProfile(ValueError):
+    """The model answered, but not with a usable profile."""
+
+
+def validate_profile(profile_data) -> list[str]:
+    """Returns the reasons a generated profile does not match the schema (empty if valid)."""
+    if not isinstance(profile_data, dict):
+        return ["profile is not a JSON object"]
+    errors = []
+    for field, expected in REQUIRED_FIELDS.items():
+        if not isinstance(profile_data.get(field), expected):
+            errors.append(f"'{field}' should be a {expected.__name__}")
+    if isinstance(profile_data.get("interests"), list) and not all(isinstance(i, str) for i in profile_data["interests"]):
+        errors.append("'interests' should only contain strings")
+    availability = profile_data.get("availability")
+    if isinstance(availability, dict):
+        for key in ("days", "time_slots"):
+            if not isinstance(availability.get(key), list):
+                errors.append(f"'availability.{key}' should be a list")
+    if isinstance(profile_data.get("meeting_style"), str) and profile_data["meeting_style"] not in MEETING_STYLES:
+        errors.append(f"'meeting_style' should be one of {sorted(MEETING_STYLES)}")
+    return errors
+
+
+class TokenBucket:
+    """Async token bucket: allows `rate` acquisitions per second with bursts up to `capacity`."""
+
+    def __init__(self, rate: float, capacity: float | None = None):
+        self.rate = rate
+        self.capacity = capacity or max(1.0, rate)
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self.lock = asyncio.Lock()
+
+    async def acquire(self):
+        async with self.lock:
+            while True:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                await asyncio.sleep((1 - self.tokens) / self.rate)
+
+
+def seed_for(index: int) -> dict:
+    """The seed characteristics of record `index`; stable so resumed runs ask the same thing."""
+    rng = random.Random(index)
+    return {
+        "trait": rng.choice(PERSONALITY_TRAITS),
+        "goal": rng.choice(SOCIAL_GOALS),
+        "interests": rng.sample(INTEREST_CATEGORIES, 3),
+    }
+
+
+def completed_indices(path: str) -> set[int]:
     """
-    Generates a specified number of synthetic user profiles using an LLM
-    and saves them to a file.
+    Indices already written to the JSONL output. A torn last line left by an
+    interrupted run is cut off so new records start on a fresh line.
     """
-    client = OpenAI(api_key=os.environ["OPENAI_API_KEY"])
-    generated_profiles = []
-    print(f"Starting generation of {NUM_PROFILES_TO_GENERATE} profiles...")
-    for i in range(NUM_PROFILES_TO_GENERATE):
-        seed_trait = random.choice(PERSONALITY_TRAITS)
-        seed_goal = random.choice(SOCIAL_GOALS)
-        seed_interests = random.sample(INTEREST_CATEGORIES, 3)
-        user_message = (
-            f"Generate a user profile for a person who is {seed_trait}, "
-            f"is primarily looking for {seed_goal}, "
-            f"and is interested in {seed_interests[0]}, {seed_interests[1]}, and {seed_interests[2]}."
-        )
+    done = set()
+    if not os.path.exists(path):
+        return done
+    with open(path, "rb+") as f:
+        content = f.read()
+        if content and not content.endswith(b"\n"):
+            f.truncate(content.rfind(b"\n") + 1)
+    with open(path) as f:
+        for line in f:
+            try:
+                done.add(json.loads(line)["index"])
+            except (ValueError, KeyError):
+                continue
+    return done
+
+
+async def generate_one(client: AsyncOpenAI, bucket: TokenBucket, index: int, max_attempts: int = MAX_ATTEMPTS) -> dict:
+    seed = seed_for(index)
+    user_message = (
+        f"Generate a user profile for a person who is {seed['trait']}, "
+        f"is primarily looking for {seed['goal']}, "
+        f"and is interested in {seed['interests'][0]}, {seed['interests'][1]}, and {seed['interests'][2]}."
+    )
+    for attempt in range(1, max_attempts + 1):
+        await bucket.acquire()
         try:
-            response = client.chat.completions.create(
+            response = await client.chat.completions.create(
                 model=MODEL_TO_USE,
                 messages=[
                     {"role": "system", "content": SYSTEM_PROMPT},
@@ -66,19 +159,92 @@ def generate_synthetic_profiles():
                 response_format={"type": "json_object"},
                 temperature=0.8
             )
-            profile_json_str = response.choices[0].message.content
-            profile_data = json.loads(profile_json_str)
-            generated_profiles.append(profile_data)
-            print(f"  Successfully generated profile {i + 1}/{NUM_PROFILES_TO_GENERATE}")
+            try:
+                profile_data = json.loads(response.choices[0].message.content)
+            except ValueError as e:
+                raise InvalidProfile(f"response is not JSON: {e}")
+            errors = validate_profile(profile_data)
+            if errors:
+                raise InvalidProfile("; ".join(errors))
+            return {"index": index, "seed": seed, "profile_data": profile_data}
+        except (InvalidProfile, *RETRYABLE_ERRORS) as e:
+            if attempt == max_attempts:
+                raise
+            # Exponential backoff with full jitter, so concurrent workers don't retry in lockstep.
+            delay = random.uniform(0, min(BACKOFF_MAX_SECONDS, BACKOFF_BASE_SECONDS * 2 ** (attempt - 1)))
+            print(f"  profile {index}: attempt {attempt} failed ({type(e).__name__}: {e}); retrying in {delay:.1f}s")
+            await asyncio.sleep(delay)
 
-        except Exception as e:
-            print(f"  ERROR generating profile {i + 1}: {e}")
-            continue
-    
-    with open(OUTPUT_FILE, "w") as f:
-        json.dump(generated_profiles, f, indent=2)
 
-    print(f"\n Generation complete. {len(generated_profiles)} profiles saved to {OUTPUT_FILE}")
+async def generate_synthetic_profiles(count: int = NUM_PROFILES_TO_GENERATE, output: str = OUTPUT_FILE,
+                                      concurrency: int = CONCURRENCY, rate: float = REQUESTS_PER_SECOND,
+                                      base_url: str | None = None):
+    """
+    Generates `count` synthetic user profiles with an LLM and appends each
+    one to a JSONL file as soon as it is ready. Re-running with the same
+    output file only generates the records that are still missing.
+    """
+    done = completed_indices(output)
+    pending = [i for i in range(count) if i not in done]
+    if not pending:
+        print(f"All {count} profiles already in {output}. Nothing to do.")
+        return
+    print(f"Starting generation of {len(pending)} profiles ({len(done)} already done), "
+          f"concurrency {concurrency}, {rate:g} requests/s...")
+
+    client = AsyncOpenAI(api_key=os.environ.get("OPENAI_API_KEY", "fake"), base_url=base_url, max_retries=0)
+    bucket = TokenBucket(rate)
+    queue = asyncio.Queue()
+    for index in pending:
+        queue.put_nowait(index)
+    stats = {"written": 0, "failed": 0}
+    start = time.perf_counter()
+
+    with open(output, "a") as f:
+        async def worker():
+            while True:
+                try:
+                    index = queue.get_nowait()
+                except asyncio.QueueEmpty:
+                    return
+                try:
+                    record = await generate_one(client, bucket, index)
+                except Exception as e:
+                    stats["failed"] += 1
+                    print(f"  ERROR generating profile {index}: {e}")
+                    continue
+                f.write(json.dumps(record) + "\n")
+                f.flush()
+                stats["written"] += 1
+                if stats["written"] % 50 == 0 or stats["written"] == len(pending):
+                    elapsed = time.perf_counter() - start
+                    print(f"  {stats['written']}/{len(pending)} written ({stats['written'] / elapsed:.1f} profiles/s)")
+
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+    await client.close()
+
+    elapsed = time.perf_counter() - start
+    print(f"\n Generation complete in {elapsed:.1f}s. {stats['written']} profiles appended to {output}, {stats['failed']} failed.")
+    if stats["failed"]:
+        print(" Re-run the same command to retry the failed profiles.")
+
 
 if __name__ == "__main__":
-    generate_synthetic_profiles()
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Generate synthetic profiles concurrently with an LLM.")
+    parser.add_argument("--count", type=int, default=NUM_PROFILES_TO_GENERATE)
+    parser.add_argument("--output", default=OUTPUT_FILE)
+    parser.add_argument("--concurrency", type=int, default=CONCURRENCY)
+    parser.add_argument("--rate", type=float, default=REQUESTS_PER_SECOND, help="Max requests per second (token bucket).")
+    parser.add_argument("--base-url", default=os.environ.get("OPENAI_BASE_URL"), help="Alternative API endpoint, e.g. a fake server.")
+    parser.add_argument("--fake", action="store_true", help="Run against an in-process fake OpenAI server.")
+    args = parser.parse_args()
+
+    server = None
+    if args.fake:
+        from scripts.fake_openai_server import FakeOpenAIConfig, start_fake_server
+        server, args.base_url = start_fake_server(config=FakeOpenAIConfig(latency_ms=50, completion_seconds=0.5, error_rate=0.05))
+    try:
+        asyncio.run(generate_synthetic_profiles(args.count, args.output, args.concurrency, args.rate, args.base_url))
+    finally:
+        if server is not None:
+            server.shutdown()
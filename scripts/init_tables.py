@@ -5,7 +5,7 @@ sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 load_dotenv()
 from sqlalchemy import text
 from app.database import engine, Base, SessionLocal
-from app.models import AppUser, Profile, Question, InterestTaxonomy, Match
+from app.models import AppUser, Profile, Question, InterestTaxonomy, Match, MatchExclusion, MatchRefreshRequest, OnboardingMessage
 
 def initialize_application_tables():
     """
@@ -18,7 +18,10 @@ def initialize_application_tables():
         Profile.__table__,
         Question.__table__,
         InterestTaxonomy.__table__,
-        Match.__table__
+        Match.__table__,
+        MatchExclusion.__table__,
+        MatchRefreshRequest.__table__,
+        OnboardingMessage.__table__
     ]
     db = SessionLocal()
     try:
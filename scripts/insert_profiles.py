@@ -1,79 +1,179 @@
+import argparse
+import csv
+import io
 import json
 import os
 import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from itertools import islice
 from dotenv import load_dotenv
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 load_dotenv()
-from app.database import SessionLocal
-from app.models import SharedUser, AppUser, Profile
-from app.crud import generate_profile_embedding, load_embedding_model
-INPUT_FILE = "synthetic_profiles.json"
-def insert_synthetic_profiles():
+import numpy as np
+from app.database import engine
+from app.crud import (EMBEDDING_MODE, combine_field_embeddings, embedding_columns, generate_field_embeddings_many,
+                      generate_profile_embeddings, load_embedding_model)
+INPUT_FILE = "synthetic_profiles.jsonl"
+# Shipped with the repo; read when generate_profiles has not written INPUT_FILE.
+FALLBACK_INPUT_FILE = "synthetic_profiles.json"
+BATCH_SIZE = 1024
+
+USERS_WITHOUT_PROFILE_SQL = """
+    SELECT u.user_id FROM users u
+    WHERE NOT EXISTS (SELECT 1 FROM profiles p WHERE p.user_id = u.user_id)
+    ORDER BY u.user_id
+"""
+CREATE_STAGING_SQL = "CREATE TEMP TABLE profile_staging (LIKE profiles INCLUDING DEFAULTS) ON COMMIT DROP"
+MERGE_APP_USERS_SQL = """
+    INSERT INTO app_users (user_id)
+    SELECT user_id FROM profile_staging
+    ON CONFLICT (user_id) DO NOTHING
+"""
+MERGE_PROFILES_SQL = """
+    INSERT INTO profiles ({columns})
+    SELECT {columns} FROM profile_staging
+    ON CONFLICT (user_id) DO NOTHING
+"""
+
+def iter_profiles(path: str):
     """
-    Finds existing users in the 'users' table who do not have a profile yet,
-    and creates an AppUser and a Profile (with embedding) for them using
-    pre-generated synthetic data.
+    Streams profile_data dicts from a JSON array (incrementally with ijson
+    when it is installed) or from a JSONL file, one record per line.
     """
-    if not os.path.exists(INPUT_FILE):
-        print(f"ERROR: The file '{INPUT_FILE}' was not found.")
-        print("Please run 'python -m scripts.generate_profiles' first.")
+    if path.endswith(".jsonl"):
+        with open(path) as f:
+            for line in f:
+                if line.strip():
+                    record = json.loads(line)
+                    yield record.get("profile_data", record)
         return
     try:
-        with open(INPUT_FILE, "r") as f:
-            profiles_to_insert = json.load(f)
-    except Exception as e:
-        print(f"Error reading JSON file: {e}")
+        import ijson
+    except ImportError:
+        ijson = None
+        print("ijson is not installed; reading the whole JSON array into memory.")
+    with open(path, "rb") as f:
+        records = ijson.items(f, "item", use_float=True) if ijson else json.load(f)
+        for record in records:
+            yield record.get("profile_data", record)
+
+def _copy_value(value):
+    if value is None or isinstance(value, str):
+        return value
+    if isinstance(value, dict):
+        return json.dumps(value)
+    array = np.asarray(value)
+    if array.dtype == bool:
+        return "".join("1" if bit else "0" for bit in array)
+    return "[" + ",".join(map(str, array.tolist())) + "]"
+
+def _copy_batch(cursor, batch: list, embeddings: np.ndarray, fields: list | None = None) -> list[str]:
+    """COPYs one encoded batch into the staging table; returns the columns written."""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    columns = None
+    for index, ((user_id, profile_data), embedding) in enumerate(zip(batch, embeddings)):
+        values = embedding_columns(embedding, fields=fields[index] if fields is not None else None)
+        if not embedding.any():
+            # No field texts to combine: leave the embedding columns NULL like a missing embedding.
+            values = dict.fromkeys(values)
+        columns = columns or ["user_id", "profile_data", *values]
+        writer.writerow([user_id, json.dumps(profile_data), *(_copy_value(v) for v in values.values())])
+    buffer.seek(0)
+    cursor.copy_expert(f"COPY profile_staging ({', '.join(columns)}) FROM STDIN WITH (FORMAT csv)", buffer)
+    return columns
+
+def insert_synthetic_profiles(input_file: str = INPUT_FILE, batch_size: int = BATCH_SIZE, limit: int = 0):
+    """
+    Gives every user in the 'users' table that has no profile yet an AppUser
+    and a Profile (with embedding) from pre-generated synthetic data.
+
+    Users are found with one anti-join, profiles are streamed from the input
+    file and encoded in batches (the next batch encodes while the previous
+    one is COPYed into a staging table), and everything is merged into
+    app_users/profiles in one transaction at the end.
+    """
+    if input_file == INPUT_FILE and not os.path.exists(input_file) and os.path.exists(FALLBACK_INPUT_FILE):
+        print(f"'{input_file}' not found; using '{FALLBACK_INPUT_FILE}'.")
+        input_file = FALLBACK_INPUT_FILE
+    if not os.path.exists(input_file):
+        print(f"ERROR: The file '{input_file}' was not found.")
+        print("Please run 'python -m scripts.generate_profiles' first.")
         return
     print("Loading SBERT model for script...")
     load_embedding_model()
     print("Model loaded.")
-    db = SessionLocal()
-    print("--- Starting Synthetic Profile Insertion ---")
-    print("Finding existing shared users without a profile in our system...")
-    all_shared_users = db.query(SharedUser).all()
-    existing_profile_user_ids = {p.user_id for p in db.query(Profile).all()}
-    users_to_profile = [u for u in all_shared_users if u.user_id not in existing_profile_user_ids]
-    if not users_to_profile:
-        print("All existing users already have a profile. Nothing to do.")
-        db.close()
-        return
-    print(f"Found {len(users_to_profile)} users to profile. Using {len(profiles_to_insert)} available synthetic profiles.")
-    num_to_create = min(len(users_to_profile), len(profiles_to_insert))
-    if num_to_create == 0:
-        print("No new profiles to create.")
-        db.close()
-        return
-    print(f"Will now create profiles for the first {num_to_create} users...")
-    success_count = 0
-    failure_count = 0
+    print("--- Starting Bulk Profile Insertion ---")
+    connection = engine.raw_connection()
+    start = time.perf_counter()
     try:
-        for i in range(num_to_create):
-            user = users_to_profile[i]
-            profile_data = profiles_to_insert[i]
-            print(f"  ({i + 1}/{num_to_create}) Processing for user: {user.name} ({user.user_id})")
-            try:
-                app_user = db.query(AppUser).filter(AppUser.user_id == user.user_id).first()
-                if not app_user:
-                    app_user = AppUser(user_id=user.user_id)
-                    db.add(app_user)
-                embedding_vector = generate_profile_embedding(profile_data)
-                new_profile = Profile(
-                    user_id=user.user_id,
-                    profile_data=profile_data,
-                    embedding=embedding_vector
-                )
-                db.add(new_profile)
-                db.commit()
-                success_count += 1
-            except Exception as e:
-                db.rollback()
-                failure_count += 1
-                print(f"    [ERROR] Failed to insert profile for user {user.user_id}: {e}")
-                continue
+        cursor = connection.cursor()
+        cursor.execute(USERS_WITHOUT_PROFILE_SQL)
+        user_ids = [row[0] for row in cursor.fetchall()]
+        if limit:
+            user_ids = user_ids[:limit]
+        if not user_ids:
+            print("All existing users already have a profile. Nothing to do.")
+            return
+        print(f"Found {len(user_ids)} users without a profile.")
+        cursor.execute(CREATE_STAGING_SQL)
+
+        pairs = zip(user_ids, iter_profiles(input_file))
+        staged, columns, encode_seconds, copy_seconds = 0, None, 0.0, 0.0
+
+        def encode(batch):
+            batch_start = time.perf_counter()
+            profiles = [profile_data for _, profile_data in batch]
+            if EMBEDDING_MODE == "fields":
+                fields = generate_field_embeddings_many(profiles)
+                embeddings = combine_field_embeddings(fields)
+            else:
+                fields, embeddings = None, generate_profile_embeddings(profiles)
+            return embeddings, fields, time.perf_counter() - batch_start
+
+        with ThreadPoolExecutor(max_workers=1) as encoder:
+            pending = None
+            while True:
+                batch = list(islice(pairs, batch_size))
+                future = encoder.submit(encode, batch) if batch else None
+                if pending is not None:
+                    previous, previous_future = pending
+                    embeddings, fields, seconds = previous_future.result()
+                    encode_seconds += seconds
+                    copy_start = time.perf_counter()
+                    columns = _copy_batch(cursor, previous, embeddings, fields)
+                    copy_seconds += time.perf_counter() - copy_start
+                    staged += len(previous)
+                    print(f"  {staged}/{len(user_ids)} staged ({staged / (time.perf_counter() - start):.0f} rows/s)")
+                if future is None:
+                    break
+                pending = (batch, future)
+
+        if staged == 0:
+            print("No synthetic profiles available in the input file.")
+            return
+        merge_start = time.perf_counter()
+        cursor.execute(MERGE_APP_USERS_SQL)
+        cursor.execute(MERGE_PROFILES_SQL.format(columns=", ".join(columns)))
+        inserted = cursor.rowcount
+        connection.commit()
+        merge_seconds = time.perf_counter() - merge_start
+        total = time.perf_counter() - start
+        print("\n--- DONE ---")
+        print(f"Inserted {inserted} profiles in {total:.1f}s ({inserted / total:.0f} rows/s overall)")
+        print(f"  encode {encode_seconds:.1f}s ({staged / max(encode_seconds, 1e-9):.0f} rows/s), "
+              f"COPY {copy_seconds:.1f}s ({staged / max(copy_seconds, 1e-9):.0f} rows/s), merge {merge_seconds:.1f}s")
+    except Exception as e:
+        connection.rollback()
+        print(f"\n An error occurred: {e}")
     finally:
-        db.close()
-        print(f"\n--- DONE ---")
-        print(f"Successfully inserted: {success_count}")
-        print(f"Failed: {failure_count}")
+        connection.close()
+
 if __name__ == "__main__":
-    insert_synthetic_profiles()
+    parser = argparse.ArgumentParser(description="Bulk-insert synthetic profiles for users that have none.")
+    parser.add_argument("--input", default=INPUT_FILE, help=f"JSON array or JSONL file of profile_data records (default {INPUT_FILE}, else {FALLBACK_INPUT_FILE}).")
+    parser.add_argument("--batch-size", type=int, default=BATCH_SIZE)
+    parser.add_argument("--limit", type=int, default=0, help="Only profile this many users.")
+    args = parser.parse_args()
+    insert_synthetic_profiles(args.input, args.batch_size, args.limit)
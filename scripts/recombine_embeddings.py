@@ -0,0 +1,62 @@
+import argparse
+import os
+import sys
+import time
+from dotenv import load_dotenv
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+load_dotenv()
+from app.database import SessionLocal
+from app.models import Profile
+from app.crud import combine_field_embeddings, embedding_columns, stored_field_embeddings
+from app.field_embeddings import FIELD_EMBEDDING_WEIGHTS
+
+BATCH_SIZE = 1000
+
+def recombine_embeddings(batch_size: int = BATCH_SIZE, pause: float = 0.0, after: str = ""):
+    """
+    Rebuilds every profile embedding from its stored field embeddings with
+    the current FIELD_EMBEDDING_WEIGHTS: NumPy only, no model is loaded.
+    Each profile's version is bumped so cached pair scores are not reused.
+    Profiles whose fields combine to nothing are left unchanged and not
+    counted. Runs in committed batches ordered by user_id; safe to stop and
+    resume with --after.
+    """
+    db = SessionLocal()
+    print(f"--- Recombining field embeddings with weights {FIELD_EMBEDDING_WEIGHTS} ---")
+    start = time.perf_counter()
+    try:
+        updated, last_user_id = 0, after
+        while True:
+            rows = db.query(Profile).filter(
+                Profile.field_text_keys.is_not(None),
+                Profile.user_id > last_user_id
+            ).order_by(Profile.user_id).limit(batch_size).all()
+            if not rows:
+                break
+            embeddings = combine_field_embeddings([stored_field_embeddings(row) for row in rows])
+            for row, embedding in zip(rows, embeddings):
+                if not embedding.any():
+                    continue
+                for column, value in embedding_columns(embedding).items():
+                    setattr(row, column, value)
+                row.version = (row.version or 0) + 1
+                updated += 1
+            db.commit()
+            last_user_id = rows[-1].user_id
+            print(f"   -> {updated} profiles recombined (last user_id {last_user_id})")
+            if pause:
+                time.sleep(pause)
+        print(f"\n SUCCESS: {updated} profiles recombined in {time.perf_counter() - start:.1f}s.")
+    except Exception as e:
+        print(f"\n An error occurred: {e}")
+        db.rollback()
+    finally:
+        db.close()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Recombine stored field embeddings with the current FIELD_EMBEDDING_WEIGHTS.")
+    parser.add_argument("--batch-size", type=int, default=BATCH_SIZE)
+    parser.add_argument("--pause", type=float, default=0.0, help="Seconds to sleep between batches.")
+    parser.add_argument("--after", default="", help="Resume after this user_id.")
+    args = parser.parse_args()
+    recombine_embeddings(batch_size=args.batch_size, pause=args.pause, after=args.after)
@@ -1,3 +1,4 @@
+import argparse
 import sys
 import os
 from dotenv import load_dotenv
@@ -5,21 +6,27 @@ sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 load_dotenv()
 from app.database import SessionLocal
 from app.models import SharedUser, Profile
-from app.crud import generate_profile_embedding
+from app.crud import load_embedding_model, embedding_column, profile_embedding_columns
 from sqlalchemy.orm import Session
 
-def recompute_embeddings_for_null_profiles():
+def recompute_embeddings_for_null_profiles(recompute_all: bool = False):
     """
-    Finds all profiles with a NULL embedding and generates a new one for them.
-    This is safe to run multiple times.
+    Finds all profiles with a NULL embedding (or every profile with
+    `recompute_all`, e.g. after switching EMBEDDING_MODE) and generates a
+    new one for them. This is safe to run multiple times. Each updated
+    profile's version is bumped so cached pair scores are not reused.
     """
     db: Session = SessionLocal()
     
     print("--- Starting Embedding Re-computation Script ---")
+    load_embedding_model()
 
     try:
         # 1. Find all profiles that are missing an embedding
-        profiles_to_update = db.query(Profile).filter(Profile.embedding.is_(None)).all()
+        query = db.query(Profile)
+        if not recompute_all:
+            query = query.filter(embedding_column().is_(None))
+        profiles_to_update = query.all()
 
         if not profiles_to_update:
             print(" No profiles found with missing embeddings. Database is up-to-date.")
@@ -36,12 +43,14 @@ def recompute_embeddings_for_null_profiles():
                 print(f"    -> SKIPPING: No profile_data found for this user.")
                 continue
 
-            # 3. Generate the new embedding
-            new_embedding = generate_profile_embedding(profile.profile_data)
+            # 3. Generate the new embedding (field mode reuses unchanged stored fields)
+            new_columns = profile_embedding_columns(profile.profile_data, previous=profile)
 
             # 4. Update the profile record if the embedding was generated successfully
-            if new_embedding:
-                profile.embedding = new_embedding
+            if new_columns:
+                for column, value in new_columns.items():
+                    setattr(profile, column, value)
+                profile.version = (profile.version or 0) + 1
                 updated_count += 1
                 print("    -> SUCCESS: Embedding generated.")
             else:
@@ -63,4 +72,7 @@ def recompute_embeddings_for_null_profiles():
         print("\n--- Script finished ---")
 
 if __name__ == "__main__":
-    recompute_embeddings_for_null_profiles()
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Generate embeddings for profiles that have none.")
+    parser.add_argument("--all", action="store_true", help="Recompute every profile, not only those without an embedding.")
+    args = parser.parse_args()
+    recompute_embeddings_for_null_profiles(args.all)
\ No newline at end of file
@@ -0,0 +1,87 @@
+import argparse
+import sys
+import os
+import time
+from dotenv import load_dotenv
+import numpy as np
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+load_dotenv()
+from app import hard_filters, matching, parallel_scoring, snapshots
+from app.database import SessionLocal
+from app.crud import allowed_candidates, candidate_uids, get_match_candidates, refresh_user_matches, store_user_matches, MATCH_TOP_K
+from app.pair_cache import pair_scores
+
+RANK_CHUNK_SIZE = 1024
+
+def rematch_parallel(db, candidates: list):
+    """Ranks every candidate against all others on the scoring pool and stores the top-K."""
+    weights = matching.get_scoring_weights()
+    location_score = matching.calculate_location_score(None, None)
+    features = parallel_scoring.CandidateFeatures(candidates)
+    # Same candidate filtering as refresh_user_matches, as a per-user mask.
+    filter_columns = hard_filters.FilterColumns([c.profile_data for c in candidates])
+    uids = candidate_uids(candidates)
+    with parallel_scoring.SharedCandidateMatrix(features) as matrix:
+        for chunk_start in range(0, len(candidates), RANK_CHUNK_SIZE):
+            chunk = candidates[chunk_start:chunk_start + RANK_CHUNK_SIZE]
+            allowed = np.stack([allowed_candidates(db, c.user_id, c.profile_data, filter_columns, uids) for c in chunk])
+            ranked = parallel_scoring.rank_users(matrix, chunk, MATCH_TOP_K, weights, location_score, allowed=allowed)
+            for candidate, top_k in zip(chunk, ranked):
+                store_user_matches(db, candidate.user_id, [
+                    (user_id, score, matching.PillarScores(*pillars)) for user_id, score, pillars in top_k
+                ])
+            print(f"  ({chunk_start + len(chunk)}/{len(candidates)}) refreshed")
+
+def rematch_serial(db, candidates: list):
+    """Refreshes every candidate in-process against the shared candidate list."""
+    for i, candidate in enumerate(candidates):
+        refresh_user_matches(db, candidate.user_id, candidates=candidates)
+        if (i + 1) % 100 == 0:
+            print(f"  ({i + 1}/{len(candidates)}) refreshed, cache hits: {pair_scores.hits}, misses: {pair_scores.misses}")
+
+def rematch_all_users(snapshot_dir: str | None = None):
+    """
+    Recomputes suggestions for every user with an embedding. Candidates are
+    loaded once and shared by every refresh.
+
+    With MATCH_SCORING_WORKERS set, the candidate matrix is published to
+    shared memory once and all users are ranked on the process pool.
+    Otherwise each user is refreshed in-process, where the pair score cache
+    means each unordered pair is scored once instead of once per side
+    (size PAIR_SCORE_CACHE_SIZE to roughly N^2/2 for the full saving).
+
+    With `snapshot_dir`, candidates are mapped from the newest snapshot
+    chain there and only profiles changed since are read from the database.
+    """
+    db = SessionLocal()
+    print("--- Starting Full Re-match ---")
+    try:
+        load_start = time.perf_counter()
+        if snapshot_dir:
+            candidates = snapshots.load_candidates(db, snapshot_dir)
+        else:
+            candidates = get_match_candidates(db, current_user_id="")
+        print(f"Candidates loaded in {time.perf_counter() - load_start:.2f}s.")
+        start = time.perf_counter()
+        if parallel_scoring.enabled(len(candidates)):
+            print(f"Loaded {len(candidates)} profiles. Scoring on {parallel_scoring.MATCH_SCORING_WORKERS} worker processes.")
+            rematch_parallel(db, candidates)
+            parallel_scoring.shutdown_pool()
+        else:
+            print(f"Loaded {len(candidates)} profiles. Pair cache capacity: {pair_scores.max_entries}")
+            rematch_serial(db, candidates)
+            print(f"Pair scores computed: {pair_scores.misses}, reused: {pair_scores.hits}")
+        elapsed = time.perf_counter() - start
+        print(f"\n SUCCESS: Re-matched {len(candidates)} users in {elapsed:.1f}s.")
+    except Exception as e:
+        print(f"\n An error occurred: {e}")
+        db.rollback()
+    finally:
+        db.close()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Recompute suggested matches for every user.")
+    parser.add_argument("--snapshot", nargs="?", const=snapshots.SNAPSHOT_DIR,
+                        help="Load candidates from this snapshot directory (default SNAPSHOT_DIR) plus a live delta.")
+    args = parser.parse_args()
+    rematch_all_users(args.snapshot)
@@ -0,0 +1,116 @@
+import argparse
+import os
+import sys
+import time
+from dotenv import load_dotenv
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+load_dotenv()
+from sqlalchemy import text
+from app.database import SessionLocal
+from app.models import Match, Profile
+from app import matching
+from app.crud import scoring_view
+
+BATCH_SIZE = 500
+
+REWEIGHT_BATCH_SQL = text("""
+    UPDATE matches
+    SET score = :w_interest * pillar_scores[1]
+              + :w_availability * pillar_scores[2]
+              + :w_location * pillar_scores[3]
+              + :w_personality * pillar_scores[4],
+        score_version = :version
+    WHERE id IN (
+        SELECT id FROM matches
+        WHERE score_version <> :version AND pillar_scores IS NOT NULL
+        ORDER BY id
+        LIMIT :batch_size
+        FOR UPDATE SKIP LOCKED
+    )
+""")
+
+UPDATE_ROW_SQL = text("""
+    UPDATE matches SET score = :score, score_version = :version, pillar_scores = :pillars
+    WHERE id = :id
+""")
+
+def rollout_score_version(batch_size: int = BATCH_SIZE, pause: float = 0.0):
+    """
+    Moves every match row to the active scoring version (SCORE_VERSION) in
+    small committed batches, so the API keeps serving while it runs and the
+    job can be stopped and resumed at any point. Reads lazily rescore the
+    rows this has not reached yet.
+
+    1. Rows with cached pillar scores are re-weighted directly in SQL.
+    2. Legacy rows without them get their pillars computed from both profiles.
+    """
+    version = matching.ACTIVE_SCORE_VERSION
+    weights = matching.get_scoring_weights(version)
+    db = SessionLocal()
+    print(f"--- Rolling out scoring version {version}: {dict(weights._asdict())} ---")
+    try:
+        print("1. Re-weighting rows with cached pillar scores...")
+        reweighted = 0
+        while True:
+            result = db.execute(REWEIGHT_BATCH_SQL, {
+                "w_interest": weights.interest,
+                "w_availability": weights.availability,
+                "w_location": weights.location,
+                "w_personality": weights.personality,
+                "version": version,
+                "batch_size": batch_size,
+            })
+            db.commit()
+            if result.rowcount == 0:
+                break
+            reweighted += result.rowcount
+            print(f"   -> {reweighted} rows re-weighted")
+            if pause:
+                time.sleep(pause)
+
+        print("2. Computing pillar scores for legacy rows...")
+        recomputed = 0
+        while True:
+            rows = db.query(Match).filter(
+                Match.score_version != version,
+                Match.pillar_scores.is_(None)
+            ).order_by(Match.id).limit(batch_size).all()
+            if not rows:
+                break
+            user_ids = {r.user_id for r in rows} | {r.match_id for r in rows}
+            profiles = {p.user_id: scoring_view(p) for p in db.query(Profile).filter(Profile.user_id.in_(user_ids)).all()}
+            updates = []
+            for row in rows:
+                profile_a, profile_b = profiles.get(row.user_id), profiles.get(row.match_id)
+                if row.status in ("passed", "blocked") or not profile_a or not profile_b \
+                        or profile_a.embedding is None or profile_b.embedding is None:
+                    # Nothing meaningful to score; just stamp the version.
+                    updates.append({"id": row.id, "score": row.score, "version": version, "pillars": None})
+                    continue
+                pillars = matching.calculate_pillar_scores(profile_a, profile_b)
+                updates.append({
+                    "id": row.id,
+                    "score": matching.combine_pillar_scores(pillars, version),
+                    "version": version,
+                    "pillars": list(pillars),
+                })
+            db.execute(UPDATE_ROW_SQL, updates)
+            db.commit()
+            recomputed += len(updates)
+            print(f"   -> {recomputed} legacy rows processed")
+            if pause:
+                time.sleep(pause)
+
+        print(f"\n SUCCESS: {reweighted} re-weighted, {recomputed} legacy rows processed.")
+    except Exception as e:
+        print(f"\n An error occurred: {e}")
+        db.rollback()
+    finally:
+        db.close()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Incrementally move match scores to the active SCORE_VERSION.")
+    parser.add_argument("--batch-size", type=int, default=BATCH_SIZE)
+    parser.add_argument("--pause", type=float, default=0.0, help="Seconds to sleep between batches.")
+    args = parser.parse_args()
+    rollout_score_version(batch_size=args.batch_size, pause=args.pause)
@@ -0,0 +1,83 @@
+"""AdmissionGate: per-user limits, queue timeouts and the AIMD limit."""
+import asyncio
+
+import pytest
+from fastapi import HTTPException
+
+from app.admission import AdmissionGate
+
+
+def test_per_user_limit_rejects_with_429():
+    gate = AdmissionGate(max_concurrency=4, min_concurrency=1, per_user_limit=1)
+
+    async def main():
+        async with gate.slot("u1"):
+            with pytest.raises(HTTPException) as error:
+                await gate.acquire("u1")
+            return error.value
+
+    error = asyncio.run(main())
+    assert error.status_code == 429 and "Retry-After" in error.headers
+    assert gate._per_user == {} and gate.active == 0
+
+
+def test_queue_timeout_answers_503_and_forgets_the_user():
+    gate = AdmissionGate(max_concurrency=1, min_concurrency=1, per_user_limit=2, max_wait=0.01)
+
+    async def main():
+        async with gate.slot("u1"):
+            with pytest.raises(HTTPException) as error:
+                await gate.acquire("u2")
+            assert "u2" not in gate._per_user
+            return error.value
+
+    assert asyncio.run(main()).status_code == 503
+    assert gate._per_user == {} and gate.queued == 0 and gate.active == 0
+
+
+def test_cancelled_waiter_forgets_the_user():
+    gate = AdmissionGate(max_concurrency=1, min_concurrency=1, per_user_limit=2, max_wait=5)
+
+    async def main():
+        async with gate.slot("u1"):
+            waiter = asyncio.create_task(gate.acquire("u2"))
+            await asyncio.sleep(0)
+            waiter.cancel()
+            with pytest.raises(asyncio.CancelledError):
+                await waiter
+
+    asyncio.run(main())
+    assert gate._per_user == {} and gate.queued == 0 and gate.active == 0
+
+
+def test_waiters_are_served_round_robin_across_users():
+    gate = AdmissionGate(max_concurrency=1, min_concurrency=1, per_user_limit=3, max_wait=5)
+    order = []
+
+    async def turn(user_id: str):
+        async with gate.slot(user_id):
+            order.append(user_id)
+            await asyncio.sleep(0)
+
+    async def main():
+        async with gate.slot("holder"):
+            tasks = [asyncio.create_task(turn(user_id)) for user_id in ("a", "a", "b")]
+            await asyncio.sleep(0)
+        await asyncio.gather(*tasks)
+
+    asyncio.run(main())
+    assert order == ["a", "b", "a"]
+
+
+def test_limit_halves_on_429_and_grows_back_additively():
+    gate = AdmissionGate(max_concurrency=8, min_concurrency=2)
+    gate._on_upstream_response(429, None, None)
+    assert gate.limit == 4
+    gate._on_upstream_response(429, None, None)
+    gate._on_upstream_response(429, None, None)
+    assert gate.limit == 2
+    for _ in range(2):
+        gate._on_upstream_response(200, None, None)
+    assert gate.limit == 3
+    gate._on_upstream_response(200, 10, 1000)
+    assert gate.limit == 2
@@ -0,0 +1,37 @@
+"""make_etag / is_not_modified: the conditional GET helpers in app.main."""
+from starlette.requests import Request
+
+from app.main import is_not_modified, make_etag
+
+
+def request_with(if_none_match: str | None = None) -> Request:
+    headers = [(b"if-none-match", if_none_match.encode())] if if_none_match is not None else []
+    return Request({"type": "http", "method": "GET", "path": "/", "headers": headers})
+
+
+def test_make_etag_is_a_quoted_join_of_its_parts():
+    assert make_etag("p", 3) == '"p-3"'
+    assert make_etag("m", 7, 1, "ab") == '"m-7-1-ab"'
+    assert make_etag("p", 3) != make_etag("p", 4)
+
+
+def test_no_header_is_modified():
+    assert not is_not_modified(request_with(), make_etag("p", 1))
+
+
+def test_matching_tag_is_not_modified():
+    etag = make_etag("p", 1)
+    assert is_not_modified(request_with(etag), etag)
+
+
+def test_weak_and_listed_tags_match():
+    etag = make_etag("p", 1)
+    assert is_not_modified(request_with(f'"other", W/{etag}'), etag)
+
+
+def test_wildcard_matches_anything():
+    assert is_not_modified(request_with("*"), make_etag("p", 9))
+
+
+def test_stale_tag_is_modified():
+    assert not is_not_modified(request_with(make_etag("p", 1)), make_etag("p", 2))
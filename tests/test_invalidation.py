@@ -0,0 +1,48 @@
+"""Dispatch of invalidation payloads to registered handlers."""
+from collections import defaultdict
+
+import pytest
+
+from app import invalidation
+
+
+@pytest.fixture(autouse=True)
+def handlers(monkeypatch):
+    monkeypatch.setattr(invalidation, "_handlers", defaultdict(list))
+    monkeypatch.setattr(invalidation, "_resync_handlers", defaultdict(list))
+
+
+def test_payload_key_reaches_handlers_of_its_kind():
+    seen = []
+    invalidation.register("profile", lambda key: seen.append(("profile", key)))
+    invalidation.register("matches", lambda key: seen.append(("matches", key)))
+    invalidation.dispatch("profile:abc")
+    invalidation.dispatch("taxonomy")
+    assert seen == [("profile", "abc")]
+
+
+def test_kind_without_key_passes_none():
+    seen = []
+    invalidation.register("taxonomy", seen.append)
+    invalidation.dispatch("taxonomy")
+    assert seen == [None]
+
+
+def test_failing_handler_does_not_stop_the_others():
+    seen = []
+
+    def broken(key):
+        raise RuntimeError("boom")
+
+    invalidation.register("profile", broken)
+    invalidation.register("profile", seen.append)
+    invalidation.dispatch("profile:abc")
+    assert seen == ["abc"]
+
+
+def test_resync_calls_every_resync_handler():
+    calls = []
+    invalidation.register("profile", lambda key: None, resync=lambda: calls.append("profile"))
+    invalidation.register("taxonomy", lambda key: None, resync=lambda: calls.append("taxonomy"))
+    invalidation.resync()
+    assert sorted(calls) == ["profile", "taxonomy"]
@@ -0,0 +1,61 @@
+"""parallel_scoring agrees with matching.rank_candidates and reuses published matrices."""
+import numpy as np
+import pytest
+
+from app import crud, matching, parallel_scoring
+
+
+@pytest.fixture
+def pool(monkeypatch):
+    monkeypatch.setattr(parallel_scoring, "MATCH_SCORING_WORKERS", 2)
+    yield
+    parallel_scoring.shutdown_pool()
+
+
+def candidate(user_id: str, profile_data, seed: int, version: int = 1):
+    embedding = np.random.default_rng(seed).standard_normal(8).astype(np.float32)
+    return crud.CandidateProfile(user_id, profile_data, embedding, version, seed)
+
+
+def test_malformed_profiles_are_skipped_like_the_python_path(pool):
+    user = candidate("me", {"interest_ids": [1, 2], "availability": {"days": ["Mon"], "time_slots": ["am"]}}, 0)
+    candidates = [
+        candidate("ok", {"interest_ids": [1], "availability": {"days": ["Mon"], "time_slots": ["pm"]}}, 1),
+        candidate("no_interests", {"interest_ids": None, "availability": {"days": ["Mon"]}}, 2),
+        candidate("no_data", None, 3),
+        candidate("days_none", {"interest_ids": [2], "availability": {"days": None, "time_slots": ["am"]}}, 4),
+        candidate("no_availability", {"interest_ids": [2], "availability": {}}, 5),
+        candidate("empty", {}, 6),
+    ]
+    expected = matching.rank_candidates(user, candidates, limit=10)
+    weights = matching.get_scoring_weights()
+    with parallel_scoring.SharedCandidateMatrix(parallel_scoring.CandidateFeatures(candidates)) as matrix:
+        ranked = parallel_scoring.rank_users(matrix, [user], 10, weights, matching.calculate_location_score(None, None))[0]
+
+    assert [user_id for user_id, _, _ in ranked] == [user_id for user_id, _, _ in expected]
+    assert [score for _, score, _ in ranked] == pytest.approx([score for _, score, _ in expected], abs=1e-6)
+    assert {"no_interests", "no_data", "days_none"}.isdisjoint(user_id for user_id, _, _ in ranked)
+
+
+def test_published_matrix_is_reused_until_a_version_changes():
+    published = parallel_scoring.PublishedCandidates()
+    candidates = [candidate(f"u{i}", {"interest_ids": [i]}, i) for i in range(4)]
+    with published.use(candidates) as first:
+        with published.use(list(candidates)) as again:
+            assert again is first
+    changed = candidates[:3] + [candidates[3]._replace(version=2)]
+    with published.use(changed) as second:
+        assert second is not first
+        assert first.blocks == []
+    published.close()
+    assert second.blocks == []
+
+
+def test_replaced_matrix_stays_open_while_in_use():
+    published = parallel_scoring.PublishedCandidates()
+    candidates = [candidate(f"u{i}", {"interest_ids": [i]}, i) for i in range(3)]
+    with published.use(candidates) as first:
+        with published.use(candidates[:2]):
+            assert first.blocks
+    assert first.blocks == []
+    published.close()
@@ -0,0 +1,93 @@
+"""refresh_user_matches serializes refreshes on the session's own transaction."""
+import pytest
+
+from app import crud
+
+
+class FakeSession:
+    """Emulates the advisory lock and match_refresh_requests for one session."""
+
+    def __init__(self, lock_held_by_other: int = 0):
+        self.lock_held_by_other = lock_held_by_other
+        self.holding = False
+        self.requests = set()
+        self.inserts = 0
+        self.commits = 0
+
+    def execute(self, statement, params=None):
+        sql = str(statement)
+        user_id = (params or {}).get("user_id")
+        if "pg_try_advisory_xact_lock" in sql:
+            if self.lock_held_by_other:
+                self.lock_held_by_other -= 1
+                return Result(False)
+            self.holding = True
+            return Result(True)
+        if sql.startswith("INSERT INTO match_refresh_requests"):
+            self.inserts += 1
+            self.requests.add(user_id)
+            return Result(None)
+        if sql.startswith("DELETE FROM match_refresh_requests"):
+            present = user_id in self.requests
+            self.requests.discard(user_id)
+            return Result(1 if present else None)
+        if "EXISTS" in sql:
+            return Result(user_id in self.requests)
+        raise AssertionError(sql)
+
+    def commit(self):
+        self.commits += 1
+        self.holding = False
+
+
+class Result:
+    def __init__(self, value):
+        self.value = value
+
+    def scalar(self):
+        return self.value
+
+
+@pytest.fixture
+def refreshes(monkeypatch):
+    runs = []
+    monkeypatch.setattr(crud, "MATCH_REFRESH_LOCK", "advisory")
+    monkeypatch.setattr(crud, "_refresh_user_matches", lambda db, user_id, candidates: runs.append(db.holding))
+    return runs
+
+
+def test_free_lock_runs_without_recording_a_request(refreshes):
+    db = FakeSession()
+    crud.refresh_user_matches(db, "alice")
+    assert refreshes == [True]
+    assert db.inserts == 0
+    assert not db.holding
+
+
+def test_busy_lock_records_request_and_coalesces(refreshes):
+    db = FakeSession(lock_held_by_other=2)
+    crud.refresh_user_matches(db, "alice")
+    assert refreshes == []
+    assert db.requests == {"alice"}
+    assert not db.holding
+
+
+def test_lock_freed_after_recording_runs_once(refreshes):
+    db = FakeSession(lock_held_by_other=1)
+    crud.refresh_user_matches(db, "alice")
+    assert refreshes == [True]
+    assert db.requests == set()
+
+
+def test_request_recorded_mid_refresh_reruns(refreshes, monkeypatch):
+    db = FakeSession()
+
+    def refresh(session, user_id, candidates):
+        refreshes.append(session.holding)
+        if len(refreshes) == 1:
+            session.requests.add(user_id)
+
+    monkeypatch.setattr(crud, "_refresh_user_matches", refresh)
+    crud.refresh_user_matches(db, "alice")
+    assert refreshes == [True, True]
+    assert db.requests == set()
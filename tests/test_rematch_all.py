@@ -0,0 +1,83 @@
+"""The parallel and serial paths of scripts/rematch_all.py store the same matches."""
+import numpy as np
+import pytest
+
+from app import crud, hard_filters, parallel_scoring
+from app.pair_cache import pair_scores
+from app.uidset import UidSet
+from scripts import rematch_all
+
+DAYS = ["Mon", "Tue", "Wed", "Thu", "Fri", "Sat", "Sun"]
+SLOTS = ["morning", "afternoon", "evening"]
+
+
+def make_candidates(count: int, seed: int = 7) -> list:
+    rng = np.random.default_rng(seed)
+    candidates = []
+    for i in range(count):
+        embedding = rng.standard_normal(16).astype(np.float32)
+        profile_data = {
+            "interest_ids": sorted(rng.choice(12, size=rng.integers(1, 5), replace=False).tolist()),
+            "availability": {
+                "days": sorted(rng.choice(DAYS, size=rng.integers(1, 4), replace=False).tolist()),
+                "time_slots": sorted(rng.choice(SLOTS, size=rng.integers(1, 3), replace=False).tolist()),
+            } if i % 9 else {},
+            "meeting_style": [None, "either", "in-person", "virtual"][i % 4],
+            "social_intent": [None, "friendship", "networking"][i % 3],
+        }
+        candidates.append(crud.CandidateProfile(f"user{i:03d}", profile_data, embedding / np.linalg.norm(embedding), 1, i))
+    return candidates
+
+
+def make_exclusions(candidates: list, seed: int = 11) -> dict:
+    rng = np.random.default_rng(seed)
+    return {c.user_id: UidSet(rng.choice(len(candidates), size=5, replace=False).tolist()) for c in candidates}
+
+
+@pytest.fixture
+def stored(monkeypatch):
+    candidates = make_candidates(120)
+    by_id = {c.user_id: c for c in candidates}
+    exclusions = make_exclusions(candidates)
+    results = {}
+
+    def store(db, user_id, top_k):
+        results[user_id] = [(match_id, score) for match_id, score, _ in top_k]
+
+    monkeypatch.setattr(hard_filters, "MATCH_HARD_FILTERS", list(hard_filters.FILTERS))
+    monkeypatch.setattr(crud, "MATCH_REFRESH_LOCK", "off")
+    monkeypatch.setattr(crud, "get_user_profile", lambda db, user_id: by_id.get(user_id))
+    monkeypatch.setattr(crud, "scoring_view", lambda profile, storage=None: profile)
+    monkeypatch.setattr(crud, "get_excluded_uids", lambda db, user_id: exclusions[user_id])
+    monkeypatch.setattr(crud, "store_user_matches", store)
+    monkeypatch.setattr(rematch_all, "store_user_matches", store)
+    monkeypatch.setattr(parallel_scoring, "MATCH_SCORING_WORKERS", 2)
+    pair_scores.clear()
+
+    def run(path) -> dict:
+        results.clear()
+        path(None, candidates)
+        return dict(results)
+
+    yield run
+    parallel_scoring.shutdown_pool()
+
+
+def test_parallel_rematch_matches_serial(stored):
+    serial = stored(rematch_all.rematch_serial)
+    parallel = stored(rematch_all.rematch_parallel)
+
+    assert serial.keys() == parallel.keys()
+    assert any(serial.values())
+    for user_id, expected in serial.items():
+        assert [match_id for match_id, _ in parallel[user_id]] == [match_id for match_id, _ in expected], user_id
+        assert [score for _, score in parallel[user_id]] == pytest.approx([score for _, score in expected], abs=1e-5)
+
+
+def test_filter_mask_matches_allows():
+    candidates = make_candidates(60)
+    columns = hard_filters.FilterColumns([c.profile_data for c in candidates])
+    names = list(hard_filters.FILTERS)
+    for user in candidates:
+        expected = [hard_filters.allows(user.profile_data, c.profile_data, names) for c in candidates]
+        assert hard_filters.mask(user.profile_data, columns, names).tolist() == expected
@@ -0,0 +1,132 @@
+"""ThreadTurnCoordinator: coalescing, serialization and failure paths."""
+import asyncio
+
+import pytest
+from fastapi import HTTPException
+
+from app import thread_locks
+
+
+@pytest.fixture
+def coordinator(monkeypatch):
+    monkeypatch.setattr(thread_locks, "CHAT_LOCK_MODE", "local")
+    return thread_locks.ThreadTurnCoordinator()
+
+
+def test_retry_with_same_message_id_gets_original_result(coordinator):
+    calls = []
+
+    async def main():
+        release = asyncio.Event()
+
+        async def turn():
+            calls.append(1)
+            await release.wait()
+            return "reply"
+
+        first = asyncio.create_task(coordinator.run("t1", "m1", turn))
+        await asyncio.sleep(0)
+        retry = asyncio.create_task(coordinator.run("t1", "m1", turn))
+        await asyncio.sleep(0)
+        release.set()
+        return await asyncio.gather(first, retry)
+
+    assert asyncio.run(main()) == ["reply", "reply"]
+    assert len(calls) == 1
+    assert coordinator._states == {}
+
+
+def test_same_text_without_message_id_runs_twice_in_order(coordinator):
+    order = []
+
+    async def main():
+        def turn(name):
+            async def run():
+                order.append(f"{name} start")
+                await asyncio.sleep(0.01)
+                order.append(f"{name} end")
+                return name
+            return run
+
+        return await asyncio.gather(coordinator.run("t1", None, turn("a")), coordinator.run("t1", None, turn("b")))
+
+    assert asyncio.run(main()) == ["a", "b"]
+    assert order == ["a start", "a end", "b start", "b end"]
+
+
+def test_duplicate_receives_original_exception(coordinator):
+    async def main():
+        async def turn():
+            await asyncio.sleep(0.01)
+            raise ValueError("boom")
+
+        return await asyncio.gather(coordinator.run("t1", "m1", turn), coordinator.run("t1", "m1", turn),
+                                    return_exceptions=True)
+
+    first, retry = asyncio.run(main())
+    assert isinstance(first, ValueError) and isinstance(retry, ValueError)
+    assert coordinator._states == {}
+
+
+def test_lock_timeout_answers_409_and_releases_duplicates(coordinator, monkeypatch):
+    monkeypatch.setattr(thread_locks, "CHAT_LOCK_TIMEOUT", 0.05)
+
+    async def main():
+        release = asyncio.Event()
+
+        async def slow():
+            await release.wait()
+            return "slow"
+
+        async def quick():
+            return "quick"
+
+        running = asyncio.create_task(coordinator.run("t1", "m1", slow))
+        await asyncio.sleep(0)
+        waiting = asyncio.create_task(coordinator.run("t1", "m2", quick))
+        await asyncio.sleep(0)
+        duplicate = asyncio.create_task(coordinator.run("t1", "m2", quick))
+        results = await asyncio.wait_for(asyncio.gather(waiting, duplicate, return_exceptions=True), timeout=1)
+        release.set()
+        return results, await running
+
+    (waiting, duplicate), running = asyncio.run(main())
+    assert running == "slow"
+    for result in (waiting, duplicate):
+        assert isinstance(result, HTTPException) and result.status_code == 409
+
+
+def test_cancelled_original_does_not_hang_duplicates(coordinator):
+    async def main():
+        async def turn():
+            await asyncio.sleep(10)
+
+        original = asyncio.create_task(coordinator.run("t1", "m1", turn))
+        await asyncio.sleep(0)
+        duplicate = asyncio.create_task(coordinator.run("t1", "m1", turn))
+        await asyncio.sleep(0)
+        original.cancel()
+        return await asyncio.wait_for(asyncio.gather(duplicate, return_exceptions=True), timeout=1)
+
+    (result,) = asyncio.run(main())
+    assert isinstance(result, HTTPException) and result.status_code == 409
+    assert coordinator._states == {}
+
+
+def test_lock_failure_before_turn_reaches_duplicates(coordinator, monkeypatch):
+    @thread_locks.asynccontextmanager
+    async def failing_lock(thread_id, deadline):
+        await asyncio.sleep(0.01)
+        raise ConnectionError("database down")
+        yield
+
+    monkeypatch.setattr(thread_locks, "_cross_worker_lock", failing_lock)
+
+    async def main():
+        async def turn():
+            return "never"
+
+        return await asyncio.wait_for(asyncio.gather(
+            coordinator.run("t1", "m1", turn), coordinator.run("t1", "m1", turn), return_exceptions=True), timeout=1)
+
+    assert all(isinstance(result, ConnectionError) for result in asyncio.run(main()))